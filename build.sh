@@ -12,4 +12,8 @@ npm run build
 
 # Copy build files to server static folder
 mkdir -p ../server/static
-cp -r build/* ../server/static/
\ No newline at end of file
+cp -r build/* ../server/static/
+
+# Write .gz/.br next to the build files so the app can send them without compressing
+cd ../server
+flask --app app precompress-static
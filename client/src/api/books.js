@@ -1,11 +1,22 @@
-import { API_BASE_URL } from '../config/api';
+import { API_BASE_URL, authHeaders } from '../config/api';
 
 const API_BASE = `${API_BASE_URL}/api`;
 
+// The list is paged, so follow X-Next-Cursor until the last page to get the whole catalog
+const BOOKS_PAGE_SIZE = 500;
+
 export const fetchBooks = async () => {
-  const response = await fetch(`${API_BASE}/books`);
-  if (!response.ok) throw new Error(`Failed to fetch books: ${response.status} ${response.statusText}`);
-  return response.json();
+  const books = [];
+  let cursor = null;
+  do {
+    const params = new URLSearchParams({ limit: BOOKS_PAGE_SIZE });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${API_BASE}/books?${params}`);
+    if (!response.ok) throw new Error(`Failed to fetch books: ${response.status} ${response.statusText}`);
+    books.push(...await response.json());
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return books;
 };
 
 export const fetchBook = async (id) => {
@@ -27,10 +38,13 @@ export const fetchBook = async (id) => {
 
 export const getBook = fetchBook;
 
+// Resized, cached copy of book.image_url served by the API (size: small, medium or large)
+export const coverUrl = (book, size = 'medium') => `${API_BASE}/books/${book.id}/cover?size=${size}`;
+
 export const createBook = async (bookData) => {
   const response = await fetch(`${API_BASE}/books`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers: { 'Content-Type': 'application/json', ...authHeaders() },
     body: JSON.stringify(bookData)
   });
   if (!response.ok) {
@@ -43,7 +57,7 @@ export const createBook = async (bookData) => {
 export const updateBook = async (id, bookData) => {
   const response = await fetch(`${API_BASE}/books/${id}`, {
     method: 'PUT',
-    headers: { 'Content-Type': 'application/json' },
+    headers: { 'Content-Type': 'application/json', ...authHeaders() },
     body: JSON.stringify(bookData)
   });
   if (!response.ok) throw new Error('Failed to update book');
@@ -53,7 +67,7 @@ export const updateBook = async (id, bookData) => {
 export const patchBook = async (id, bookData) => {
   const response = await fetch(`${API_BASE}/books/${id}`, {
     method: 'PATCH',
-    headers: { 'Content-Type': 'application/json' },
+    headers: { 'Content-Type': 'application/json', ...authHeaders() },
     body: JSON.stringify(bookData)
   });
   if (!response.ok) throw new Error('Failed to patch book');
@@ -62,7 +76,8 @@ export const patchBook = async (id, bookData) => {
 
 export const deleteBook = async (id) => {
   const response = await fetch(`${API_BASE}/books/${id}`, {
-    method: 'DELETE'
+    method: 'DELETE',
+    headers: authHeaders()
   });
   if (!response.ok) throw new Error('Failed to delete book');
   return response.ok;
@@ -1,11 +1,18 @@
-import { API_BASE_URL } from '../config/api';
+import { API_BASE_URL, authHeaders } from '../config/api';
 const API_BASE = `${API_BASE_URL}/api`;
 
+const favoritesUrl = () => {
+  const userId = JSON.parse(localStorage.getItem('user'))?.id;
+  if (!userId) throw new Error('Not logged in');
+  return `${API_BASE}/users/${userId}/favorites`;
+};
+
 export const fetchFavorites = async () => {
   try {
-    const response = await fetch(`${API_BASE}/favorites`);
+    const response = await fetch(favoritesUrl());
     if (!response.ok) throw new Error('Failed to fetch favorites');
-    return response.json();
+    const books = await response.json();
+    return books.map(book => ({ book_id: book.id, book }));
   } catch (error) {
     // Fallback to localStorage
     const userId = JSON.parse(localStorage.getItem('user'))?.id || 'guest';
@@ -25,13 +32,15 @@ export const fetchFavorites = async () => {
 
 export const addToFavorites = async (bookId) => {
   try {
-    const response = await fetch(`${API_BASE}/favorites`, {
+    const response = await fetch(favoritesUrl(), {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
       body: JSON.stringify({ book_id: bookId })
     });
     if (!response.ok) throw new Error('Failed to add to favorites');
-    return response.json();
+    const result = await response.json();
+    if (result.already_favorited.length) throw new Error('Book already in favorites');
+    return { book_id: bookId };
   } catch (error) {
     // Fallback to localStorage
     const userId = JSON.parse(localStorage.getItem('user'))?.id || 'guest';
@@ -55,8 +64,9 @@ export const addToFavorites = async (bookId) => {
 
 export const removeFromFavorites = async (bookId) => {
   try {
-    const response = await fetch(`${API_BASE}/favorites/${bookId}`, {
-      method: 'DELETE'
+    const response = await fetch(`${favoritesUrl()}/${bookId}`, {
+      method: 'DELETE',
+      headers: authHeaders()
     });
     if (!response.ok) throw new Error('Failed to remove from favorites');
     return true;
@@ -72,7 +82,8 @@ export const removeFromFavorites = async (bookId) => {
 
 export const isFavorite = async (bookId) => {
   try {
-    const response = await fetch(`${API_BASE}/favorites/${bookId}`);
+    const response = await fetch(`${favoritesUrl()}/${bookId}`);
+    if (response.status !== 200 && response.status !== 404) throw new Error('Failed to check favorite');
     return response.ok;
   } catch (error) {
     // Fallback to localStorage
@@ -1,9 +1,9 @@
-import { API_BASE_URL } from '../config/api';
+import { API_BASE_URL, authHeaders } from '../config/api';
 const API_BASE = `${API_BASE_URL}/api`;
 
 export const fetchReadingList = async () => {
   try {
-    const response = await fetch(`${API_BASE}/reading-list`);
+    const response = await fetch(`${API_BASE}/reading-list`, { headers: authHeaders() });
     if (!response.ok) throw new Error('Failed to fetch reading list');
     return response.json();
   } catch (error) {
@@ -29,7 +29,7 @@ export const addToReadingList = async (bookId) => {
   try {
     const response = await fetch(`${API_BASE}/reading-list`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
       body: JSON.stringify({ book_id: bookId })
     });
     if (!response.ok) throw new Error('Failed to add to reading list');
@@ -59,7 +59,8 @@ export const addToReadingList = async (bookId) => {
 export const removeFromReadingList = async (itemId) => {
   try {
     const response = await fetch(`${API_BASE}/reading-list/${itemId}`, {
-      method: 'DELETE'
+      method: 'DELETE',
+      headers: authHeaders()
     });
     if (!response.ok) throw new Error('Failed to remove from reading list');
     return response.ok;
@@ -77,7 +78,7 @@ export const updateReadingStatus = async (itemId, status) => {
   try {
     const response = await fetch(`${API_BASE}/reading-list/${itemId}`, {
       method: 'PUT',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
       body: JSON.stringify({ status })
     });
     if (!response.ok) throw new Error('Failed to update reading status');
@@ -92,4 +93,16 @@ export const updateReadingStatus = async (itemId, status) => {
     localStorage.setItem(`readingList_${userId}`, JSON.stringify(updatedList));
     return updatedList.find(item => item.id === itemId);
   }
-};
\ No newline at end of file
+};
+
+// Applies many reading-list/review operations in one request and one transaction, e.g.
+// applyBatch(ids.map(id => ({ op: 'update', type: 'reading_list', id, status: 'read' })))
+export const applyBatch = async (operations, atomic = false) => {
+  const response = await fetch(`${API_BASE}/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', ...authHeaders() },
+    body: JSON.stringify({ operations, atomic })
+  });
+  if (!response.ok && response.status !== 400) throw new Error('Failed to apply changes');
+  return response.json();
+};
@@ -1,4 +1,4 @@
-import { API_BASE_URL } from '../config/api';
+import { API_BASE_URL, authHeaders } from '../config/api';
 const API_BASE = `${API_BASE_URL}/api`;
 
 export const fetchReviews = async (bookId) => {
@@ -17,7 +17,7 @@ export const createReview = async (bookId, reviewData) => {
   try {
     const response = await fetch(`${API_BASE}/books/${bookId}/reviews`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
       body: JSON.stringify(reviewData)
     });
     if (!response.ok) throw new Error('Failed to create review');
@@ -42,7 +42,7 @@ export const createReview = async (bookId, reviewData) => {
 export const updateReview = async (reviewId, reviewData) => {
   const response = await fetch(`${API_BASE}/reviews/${reviewId}`, {
     method: 'PUT',
-    headers: { 'Content-Type': 'application/json' },
+    headers: { 'Content-Type': 'application/json', ...authHeaders() },
     body: JSON.stringify(reviewData)
   });
   if (!response.ok) throw new Error('Failed to update review');
@@ -51,7 +51,8 @@ export const updateReview = async (reviewId, reviewData) => {
 
 export const deleteReview = async (reviewId) => {
   const response = await fetch(`${API_BASE}/reviews/${reviewId}`, {
-    method: 'DELETE'
+    method: 'DELETE',
+    headers: authHeaders()
   });
   if (!response.ok) throw new Error('Failed to delete review');
   return response.ok;
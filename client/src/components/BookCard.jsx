@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { fetchReviews } from '../api/reviews';
+import { coverUrl } from '../api/books';
 import { addToReadingList } from '../api/readingList';
 import { addToFavorites, removeFromFavorites, isFavorite } from '../api/favorites';
 import { useToast } from '../context/ToastContext';
@@ -132,7 +133,8 @@ function BookCard({ book }) {
       <div className="book-image">
         {book.image_url ? (
           <img 
-            src={book.image_url}
+            src={coverUrl(book)}
+            loading="lazy"
             alt={book.title}
             onLoad={() => console.log('Image loaded:', book.image_url)}
             onError={(e) => {
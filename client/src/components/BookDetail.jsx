@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
-import { fetchBook } from '../api/books';
+import { fetchBook, coverUrl } from '../api/books';
 import { fetchReviews } from '../api/reviews';
 import { addToReadingList } from '../api/readingList';
 import { addToFavorites, removeFromFavorites, isFavorite } from '../api/favorites';
@@ -92,7 +92,7 @@ function BookDetail() {
       <div className="book-header">
         <div className="book-cover">
           {book.image_url ? (
-            <img src={book.image_url} alt={book.title} />
+            <img src={coverUrl(book, 'large')} alt={book.title} />
           ) : (
             <div className="default-cover">
               <div className="cover-icon">📚</div>
@@ -1,3 +1,9 @@
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'https://book-club254-gpaw.onrender.com';
 
-export { API_BASE_URL };
\ No newline at end of file
+// Bearer token issued by /api/login, sent with every request that acts as the user
+const authHeaders = () => {
+  const token = localStorage.getItem('token');
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
+export { API_BASE_URL, authHeaders };
\ No newline at end of file
@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
-import { API_BASE_URL } from '../config/api';
+import { API_BASE_URL, authHeaders } from '../config/api';
 
 const AuthContext = createContext();
 
@@ -46,6 +46,7 @@ export const AuthProvider = ({ children }) => {
     
     setUser(data.user);
     localStorage.setItem('user', JSON.stringify(data.user));
+    localStorage.setItem('token', data.token);
     return data;
   };
 
@@ -64,12 +65,14 @@ export const AuthProvider = ({ children }) => {
       throw new Error(data.error || 'Signup failed');
     }
     
-    setUser(data);
-    localStorage.setItem('user', JSON.stringify(data));
+    // Log straight in so the new account gets a token
+    await login(userData.email, userData.password);
     return { user: data };
   };
 
   const logout = () => {
+    fetch(`${API_BASE_URL}/api/logout`, { method: 'POST', headers: authHeaders() }).catch(() => {});
+    localStorage.removeItem('token');
     setUser(null);
     setUserPreferences(null);
     localStorage.removeItem('user');
@@ -1,57 +1,100 @@
 import os
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_restful import Api
 from flask_cors import CORS
 from config import Config
 from models import db
+from commands import register_commands
+from cache import init_cache
+from database import init_database
+from metrics import init_metrics
+from ratelimit import init_rate_limiting
+from static_assets import init_static
+from jobs import init_jobs
+from tenancy import init_tenancy
 
-migrate = Migrate()
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
-def create_app():
-    app = Flask(__name__, static_folder='static', static_url_path='')
+# Response headers the React client (served from another origin in development) may read
+EXPOSED_HEADERS = [
+    'X-Next-Cursor', 'Link', 'ETag', 'X-DB-Queries', 'X-DB-Time-Ms', 'X-DB-Pool-Wait-Ms', 'X-Profile-Id',
+    'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'Retry-After'
+]
+
+def create_app(migrations=None):
+    """Build the app without touching the database; the schema comes from migrations.
+    
+    Flask-Migrate pulls in Alembic, which adds ~200ms to every worker boot, so it is
+    only registered for the flask CLI or when migrations=True (init_db.py, seed.py).
+    """
+    app = Flask(__name__, static_folder=None)
     app.config.from_object(Config)
+    if app.config['PROXY_COUNT']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'])
     
     db.init_app(app)
-    migrate.init_app(app, db)
-    CORS(app)
-    
-    # Serve React app
-    @app.route('/')
-    def serve():
-        return app.send_static_file('index.html')
-    
-    @app.errorhandler(404)
-    def not_found(e):
-        return app.send_static_file('index.html')
+    init_database(app, db)
+    init_metrics(app, db)
+    init_rate_limiting(app)
+    init_tenancy(app)
+    init_jobs(app)
+    if migrations is None:
+        migrations = os.environ.get('FLASK_RUN_FROM_CLI') == 'true'
+    if migrations:
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=MIGRATIONS_DIR)
+    init_cache(app)
+    CORS(app, expose_headers=EXPOSED_HEADERS)
+    register_commands(app)
+    init_static(app)
     
     api = Api(app)
     
-    from resources.books import BookResource, BookListResource
+    from resources.books import (
+        BookResource, BookListResource, BookSearchResource, BookBulkResource, BookExportResource
+    )
     from resources.reviews import ReviewResource, ReviewListResource
     from resources.reading_list import ReadingListResource, ReadingListItemResource
-    from resources.users import UserResource, UserListResource, LoginResource
+    from resources.users import UserResource, UserListResource, LoginResource, LogoutResource
+    from resources.recommendations import SimilarBooksResource, UserRecommendationsResource
+    from resources.metrics import DatabaseMetricsResource
+    from resources.batch import BatchResource
+    from resources.favorites import UserFavoritesResource, UserFavoriteResource, MostFavoritedResource
+    from resources.feed import FeedResource, FollowResource
+    from resources.covers import BookCoverResource
+    from resources.clubs import ClubListResource, ClubResource, ClubMembersResource, ClubMemberResource
     
     api.add_resource(BookListResource, '/api/books')
+    api.add_resource(BookSearchResource, '/api/books/search')
+    api.add_resource(MostFavoritedResource, '/api/books/most-favorited')
+    api.add_resource(BookBulkResource, '/api/books/bulk')
+    api.add_resource(BookExportResource, '/api/books/export')
     api.add_resource(BookResource, '/api/books/<int:id>')
     api.add_resource(ReviewListResource, '/api/books/<int:book_id>/reviews')
+    api.add_resource(SimilarBooksResource, '/api/books/<int:id>/similar')
+    api.add_resource(BookCoverResource, '/api/books/<int:id>/cover')
     api.add_resource(ReviewResource, '/api/reviews/<int:id>')
     api.add_resource(ReadingListResource, '/api/reading-list')
     api.add_resource(ReadingListItemResource, '/api/reading-list/<int:id>')
     api.add_resource(UserListResource, '/api/users')
     api.add_resource(UserResource, '/api/users/<int:id>')
+    api.add_resource(UserRecommendationsResource, '/api/users/<int:id>/recommendations')
+    api.add_resource(UserFavoritesResource, '/api/users/<int:id>/favorites')
+    api.add_resource(UserFavoriteResource, '/api/users/<int:id>/favorites/<int:book_id>')
+    api.add_resource(FollowResource, '/api/users/<int:id>/follow')
+    api.add_resource(FeedResource, '/api/feed')
+    api.add_resource(ClubListResource, '/api/clubs')
+    api.add_resource(ClubResource, '/api/clubs/<int:id>')
+    api.add_resource(ClubMembersResource, '/api/clubs/<int:id>/members')
+    api.add_resource(ClubMemberResource, '/api/clubs/<int:id>/members/<int:user_id>')
     api.add_resource(LoginResource, '/api/login')
+    api.add_resource(LogoutResource, '/api/logout')
+    api.add_resource(DatabaseMetricsResource, '/api/metrics/db')
+    api.add_resource(BatchResource, '/api/batch')
     
     return app
 
-# Create app instance for gunicorn
-app = create_app()
-
-# Initialize database tables
-with app.app_context():
-    db.create_all()
-
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
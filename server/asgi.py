@@ -0,0 +1,289 @@
+"""ASGI entry point for high-concurrency read traffic.
+
+    uvicorn asgi:app --workers 4
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker -w 4
+
+The read-heavy book and review GETs are served natively with an async engine, so a
+slow client or query parks a coroutine rather than a whole worker. They share the
+response cache (keys, entries and ETags) with the Flask resources, so writes made
+through Flask invalidate them as usual. Rate limits and load shedding are checked
+here too, with the same limiter as the Flask routes. Every other request, and any read
+that would not return a plain 200/304, is handed to the Flask app unchanged. Needs
+requirements-async.txt.
+"""
+import asyncio
+import json
+import os
+from urllib.parse import parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import NotFound, MethodNotAllowed
+from werkzeug.http import parse_accept_header, parse_etags
+from werkzeug.routing import Map, Rule
+from app import create_app, EXPOSED_HEADERS
+from auth import verify_token
+from metrics import IN_FLIGHT
+from models import db, Book, Club, Review
+from cache import get_cache
+from database import configure_sqlite
+from generations import DatabaseGenerations
+from http_cache import book_generation, book_key, book_list_key, book_version, cache_entry, make_etag, reviews_key
+from ratelimit import SQLiteBucketStore, bucket_key, get_rate_limiter, rate_limit_headers
+from resources.books import book_list_statement, book_list_page
+from serialization import negotiate
+from streaming import NDJSON_MIMETYPE
+from tenancy import CLUB_HEADER, KNOWN_CLUB_TTL, club_scope, known_club_key, parse_club_id
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+}
+
+ROUTES = Map([
+    Rule('/api/books', endpoint='book_list', methods=['GET']),
+    Rule('/api/books/<int:id>', endpoint='book_detail', methods=['GET']),
+    Rule('/api/books/<int:book_id>/reviews', endpoint='review_list', methods=['GET']),
+])
+
+class Delegate(Exception):
+    """Raised by a handler to let the Flask app answer the request instead."""
+
+def async_database_url(url):
+    override = os.environ.get('ASYNC_DATABASE_URL')
+    if override:
+        return override
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        raise RuntimeError(f'No async driver configured for {url.drivername}; set ASYNC_DATABASE_URL')
+    return url.set(drivername=driver)
+
+class Request:
+    def __init__(self, scope):
+        self.path = scope['path']
+        self.args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+    
+    def if_none_match(self):
+        return parse_etags(self.headers.get('if-none-match'))
+    
+    def remote_addr(self, scope, proxy_count):
+        # What ProxyFix gives Flask: the address the trusted proxies saw
+        forwarded = [part.strip() for part in self.headers.get('x-forwarded-for', '').split(',')]
+        if proxy_count and len(forwarded) >= proxy_count and forwarded[-proxy_count]:
+            return forwarded[-proxy_count]
+        return scope['client'][0] if scope.get('client') else None
+    
+    def user_id(self):
+        # The bucket only needs to know who signed the request; revoked tokens are
+        # rejected by the endpoints that act as a user, and these reads don't
+        scheme, _, token = self.headers.get('authorization', '').partition(' ')
+        claims = verify_token(token.strip()) if scheme.lower() == 'bearer' else None
+        return claims['sub'] if claims else None
+
+class AsyncReads:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        
+        with flask_app.app_context():
+            url = db.engine.url
+        options = {} if url.drivername.startswith('sqlite') else flask_app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        self.engine = create_async_engine(async_database_url(url), **options)
+        if self.engine.dialect.name == 'sqlite':
+            configure_sqlite(flask_app, self.engine.sync_engine)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return await self.wsgi(scope, receive, send)
+        
+        try:
+            rule, values = ROUTES.bind('').match(scope['path'], method=scope['method'], return_rule=True)
+        except (NotFound, MethodNotAllowed):
+            return await self.wsgi(scope, receive, send)
+        
+        request = Request(scope)
+        # Streaming responses stay on the Flask side
+        if NDJSON_MIMETYPE in request.headers.get('accept', ''):
+            return await self.wsgi(scope, receive, send)
+        
+        raw_club = request.headers.get(CLUB_HEADER.lower()) or request.args.get('club_id')
+        club_id = parse_club_id(raw_club, self.flask_app.config['DEFAULT_CLUB_ID'])
+        # Counted like a Flask request, so load shedding sees every request this worker holds
+        IN_FLIGHT.inc()
+        try:
+            with self.flask_app.app_context():
+                limited, rate_limit = await self.limit(scope, request, f'GET {rule.rule}')
+                if limited is not None:
+                    return await self.respond_json(send, *limited)
+                # The async session runs the same tenancy hooks, so queries are scoped as in Flask
+                if club_id is None or not await self.club_exists(club_id):
+                    raise Delegate()
+                await self.load_generations(rule.endpoint, values, club_id)
+                with club_scope(club_id):
+                    status, entry = await getattr(self, rule.endpoint)(request, **values)
+                await self.respond(send, request, status, entry, rate_limit)
+                return
+        except Delegate:
+            pass
+        finally:
+            IN_FLIGHT.dec()
+        # Flask checks the limits again, so a delegated read costs two tokens; these are
+        # the unknown-club, bad-argument and missing-book cases
+        await self.wsgi(scope, receive, send)
+    
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    async def limit(self, scope, request, route):
+        """ratelimit.RateLimiter for a native read: (429/503 response or None, rate limit or None)."""
+        limiter = get_rate_limiter(self.flask_app)
+        shed = limiter.shed()
+        if shed is not None:
+            return shed, None
+        client = bucket_key(request.user_id(), request.remote_addr(scope, self.flask_app.config['PROXY_COUNT']))
+        if isinstance(limiter.store, SQLiteBucketStore):
+            # Waits on a file lock shared with the other workers; keep it off the event loop
+            return await asyncio.to_thread(limiter.take, route, client)
+        return limiter.take(route, client)
+    
+    async def club_exists(self, club_id):
+        """tenancy.club_exists over the async engine; unknown clubs get their 404 from Flask."""
+        cache = get_cache()
+        if cache.get(known_club_key(club_id)):
+            return True
+        async with self.session() as session:
+            found = await session.scalar(select(Club.id).where(Club.id == club_id))
+        if found is None:
+            return False
+        cache.set(known_club_key(club_id), True, ttl=KNOWN_CLUB_TTL)
+        return True
+    
+    async def load_generations(self, endpoint, values, club_id):
+        """Read the cache generations this endpoint's keys use over the async engine, so
+        building the keys doesn't query the database from the event loop."""
+        generations = self.flask_app.extensions['cache_generations']
+        if not isinstance(generations, DatabaseGenerations):
+            return
+        if endpoint == 'book_list':
+            names = ['books']
+        else:
+            names = ['book-details', book_generation(values.get('id', values.get('book_id')), club_id)]
+        async with self.session() as session:
+            generations.remember(names, (await session.execute(generations.query(names))).all())
+    
+    async def cached(self, request, key, build, version=None, current_version=None):
+        """The async counterpart of http_cache.cached_json; returns (status, entry)."""
+        cache = get_cache()
+        entry = cache.get(key)
+        
+        if entry is None and current_version is not None and request.if_none_match():
+            etag = await current_version()
+            if etag is not None and request.if_none_match().contains(make_etag(etag)):
+                return 304, {'etag': make_etag(etag)}
+        
+        if entry is None:
+            payload, headers = await build()
+            entry, size = cache_entry(payload, headers, version)
+            cache.set(key, entry, size=size)
+        
+        if request.if_none_match().contains(entry['etag']):
+            return 304, entry
+        return 200, entry
+    
+    async def book_list(self, request):
+        return await self.cached(request, book_list_key(request.path, request.args),
+                                 lambda: self.build_book_list(request))
+    
+    async def build_book_list(self, request):
+        try:
+            statement, fields, limit = book_list_statement(request.args)
+        except ValueError:
+            raise Delegate()
+        async with self.session() as session:
+            rows = (await session.execute(statement.limit(limit + 1))).all()
+        payload, _, headers = book_list_page(rows, fields, limit, request.args, request.path)
+        return payload, headers
+    
+    async def book_detail(self, request, id):
+        async def build():
+            async with self.session() as session:
+                book = await session.get(Book, id)
+            if book is None:
+                raise Delegate()
+            return book.to_dict(), {}
+        
+        async def current_version():
+            async with self.session() as session:
+                row = (await session.execute(select(Book.updated_at).where(Book.id == id))).first()
+            return book_version(id, row.updated_at) if row else None
+        
+        return await self.cached(
+            request, book_key(id), build,
+            version=lambda payload: book_version(id, payload['updated_at']),
+            current_version=current_version
+        )
+    
+    async def review_list(self, request, book_id):
+        async def build():
+            async with self.session() as session:
+                reviews = (await session.scalars(select(Review).where(Review.book_id == book_id))).all()
+            return [review.to_dict() for review in reviews], {}
+        return await self.cached(request, reviews_key(book_id), build)
+    
+    async def respond_json(self, send, payload, status, headers):
+        body = json.dumps(payload).encode()
+        headers = [
+            ('content-type', 'application/json'),
+            ('content-length', str(len(body))),
+            ('access-control-allow-origin', '*'),
+            ('access-control-expose-headers', ', '.join(EXPOSED_HEADERS)),
+        ] + [(k.lower(), v) for k, v in headers.items()]
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+    
+    async def respond(self, send, request, status, entry, rate_limit=None):
+        headers = [
+            ('etag', f'"{entry["etag"]}"'),
+            ('cache-control', 'no-cache'),
+            ('access-control-allow-origin', '*'),
+            ('access-control-expose-headers', ', '.join(EXPOSED_HEADERS)),
+        ]
+        if rate_limit:
+            headers.extend((k.lower(), v) for k, v in rate_limit_headers(*rate_limit).items())
+        body = b''
+        if status == 200:
+            variants = entry['variants']
+            encoding = negotiate(variants, parse_accept_header(request.headers.get('accept-encoding')))
+            body = variants[encoding] if encoding else entry['body']
+            headers.append(('content-type', 'application/json'))
+            headers.append(('content-length', str(len(body))))
+            if encoding:
+                headers.append(('content-encoding', encoding))
+            if variants:
+                headers.append(('vary', 'Accept-Encoding'))
+            headers.extend((k.lower(), v) for k, v in entry['headers'].items())
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+app = AsyncReads(create_app())
@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, request
+from sqlalchemy import delete, select
+from models import db, RevokedToken
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _sign(payload):
+    key = current_app.config['SECRET_KEY'].encode()
+    return _b64encode(hmac.new(key, payload.encode(), hashlib.sha256).digest())
+
+def issue_token(user):
+    now = int(time.time())
+    claims = {
+        'sub': user.id,
+        'name': user.username,
+        'iat': now,
+        'exp': now + current_app.config['TOKEN_TTL'],
+        'jti': secrets.token_urlsafe(8)
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    return f'{payload}.{_sign(payload)}'
+
+def verify_token(token):
+    """Return the claims of a correctly signed, unexpired token, or None; revocation is not checked."""
+    try:
+        payload, signature = token.split('.')
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get('exp', 0) <= time.time():
+        return None
+    return claims
+
+def decode_token(token):
+    """Return the claims of a valid, unexpired, unrevoked token, or None.
+    
+    The only database access is a primary-key lookup in revoked_tokens.
+    """
+    claims = verify_token(token)
+    if claims is None:
+        return None
+    if db.session.scalar(select(RevokedToken.jti).where(RevokedToken.jti == str(claims.get('jti')))):
+        return None
+    return claims
+
+def revoke_token(claims):
+    """Revoke a token for every worker; not in the response cache, whose LRU would evict it."""
+    # Entries only need to outlive the token itself, which keeps the table small
+    now = datetime.utcnow()
+    db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+    db.session.add(RevokedToken(jti=claims['jti'], expires_at=datetime.utcfromtimestamp(claims['exp'])))
+    db.session.commit()
+
+def current_claims():
+    if 'token_claims' not in g:
+        header = request.headers.get('Authorization', '')
+        scheme, _, token = header.partition(' ')
+        g.token_claims = decode_token(token.strip()) if scheme.lower() == 'bearer' else None
+    return g.token_claims
+
+def current_user_id():
+    claims = current_claims()
+    return claims['sub'] if claims else None
+
+def login_required(method):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        if current_claims() is None:
+            return {'error': 'Authentication required'}, 401, {'WWW-Authenticate': 'Bearer'}
+        return method(*args, **kwargs)
+    return wrapper
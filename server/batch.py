@@ -0,0 +1,214 @@
+from collections import defaultdict
+from sqlalchemy import delete, select, update
+from models import db, ActivityEvent, Book, Review, ReadingListItem
+from ratings import apply_rating_change
+from feed import record_events, REVIEW, READING_LIST_ADD, READING_LIST_STATUS
+from tasks import schedule_recommendations
+
+MAX_OPERATIONS = 500
+STATUS_MAX_LENGTH = 20
+KINDS = ('reading_list', 'review')
+ACTIONS = ('create', 'update', 'delete')
+
+class BatchResult:
+    def __init__(self, count):
+        self.results = [None] * count
+        self.failed = 0
+    
+    def ok(self, index, status, id=None):
+        self.results[index] = {'index': index, 'status': status, 'id': id}
+    
+    def error(self, index, status, message):
+        self.failed += 1
+        self.results[index] = {'index': index, 'status': status, 'error': message}
+    
+    def to_dict(self):
+        return {
+            'applied': len(self.results) - self.failed,
+            'failed': self.failed,
+            'results': self.results
+        }
+
+def parse_rating(value):
+    try:
+        rating = int(value)
+    except (TypeError, ValueError):
+        return None
+    return rating if 1 <= rating <= 5 else None
+
+def parse_id(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+def validate_status(value):
+    return isinstance(value, str) and 0 < len(value) <= STATUS_MAX_LENGTH
+
+def shape_error(op):
+    """Why op is not an operation at all, or None; checked before its ids are used as keys."""
+    if not isinstance(op, dict):
+        return 'Each operation must be an object'
+    if op.get('type') not in KINDS or op.get('op') not in ACTIONS:
+        return 'op must be create, update or delete and type reading_list or review'
+    for field in ('id', 'book_id'):
+        if op.get(field) is not None and parse_id(op[field]) is None:
+            return f'{field} must be an integer'
+    return None
+
+def apply_batch(user_id, operations, atomic=False):
+    """Apply reading-list and review operations for one user in a single transaction.
+    
+    Rows are loaded with one SELECT per table and written with bulk statements, so the
+    cost is a handful of round trips however many operations there are. Invalid
+    operations are reported and skipped, or abort the whole batch when atomic is set.
+    Returns (BatchResult, ids of books whose cached reviews/ratings changed).
+    """
+    result = BatchResult(len(operations))
+    valid = []
+    for index, op in enumerate(operations):
+        error = shape_error(op)
+        if error:
+            result.error(index, 400, error)
+        else:
+            valid.append((index, op))
+    
+    def ids_for(kind, ops):
+        return {parse_id(op.get('id')) for _, op in valid
+                if op['type'] == kind and op['op'] in ops} - {None}
+    
+    items = {row.id: row for row in db.session.execute(
+        select(ReadingListItem.id, ReadingListItem.book_id)
+        .where(ReadingListItem.id.in_(ids_for('reading_list', ('update', 'delete'))),
+               ReadingListItem.user_id == user_id)
+    )}
+    reviews = {row.id: row for row in db.session.execute(
+        select(Review.id, Review.book_id, Review.rating)
+        .where(Review.id.in_(ids_for('review', ('update', 'delete'))), Review.user_id == user_id)
+    )}
+    new_book_ids = {parse_id(op.get('book_id')) for _, op in valid if op['op'] == 'create'} - {None}
+    known_books = set(db.session.scalars(select(Book.id).where(Book.id.in_(new_book_ids))))
+    listed_books = set(db.session.scalars(
+        select(ReadingListItem.book_id)
+        .where(ReadingListItem.user_id == user_id, ReadingListItem.book_id.in_(new_book_ids))
+    ))
+    reviewed_books = set(db.session.scalars(
+        select(Review.book_id).where(Review.user_id == user_id, Review.book_id.in_(new_book_ids))
+    ))
+    
+    item_updates, item_deletes, new_items = [], [], []
+    review_updates, review_deletes, new_reviews = [], [], []
+    rating_changes = defaultdict(lambda: [0, 0])
+    touched = set()
+    
+    for index, op in valid:
+        kind, action = op['type'], op['op']
+        target = parse_id(op.get('id'))
+        
+        # Statements are grouped by kind, so a second operation on the same row
+        # would not run in the order it was written
+        key = (kind, target if action != 'create' else ('book', op.get('book_id')))
+        if key in touched:
+            result.error(index, 409, 'Conflicts with an earlier operation in this batch')
+            continue
+        
+        if kind == 'reading_list' and action == 'create':
+            book_id = parse_id(op.get('book_id'))
+            status = op.get('status', 'want_to_read')
+            if book_id is None or not validate_status(status):
+                result.error(index, 400, 'book_id and a valid status are required')
+            elif book_id not in known_books:
+                result.error(index, 404, f'Book {book_id} does not exist')
+            elif book_id in listed_books:
+                result.error(index, 400, 'Book already in reading list')
+            else:
+                new_items.append((index, ReadingListItem(book_id=book_id, user_id=user_id, status=status)))
+        elif kind == 'reading_list' and action in ('update', 'delete'):
+            if target not in items:
+                result.error(index, 404, 'Reading list item not found')
+            elif action == 'delete':
+                item_deletes.append(target)
+                result.ok(index, 204, target)
+            elif not validate_status(op.get('status')):
+                result.error(index, 400, 'A valid status is required')
+            else:
+                item_updates.append({'id': target, 'status': op['status']})
+                result.ok(index, 200, target)
+        elif kind == 'review' and action == 'create':
+            book_id = parse_id(op.get('book_id'))
+            rating = parse_rating(op.get('rating'))
+            if book_id is None or rating is None or not isinstance(op.get('comment'), str):
+                result.error(index, 400, 'book_id, a rating between 1 and 5 and a comment are required')
+            elif book_id not in known_books:
+                result.error(index, 404, f'Book {book_id} does not exist')
+            elif book_id in reviewed_books:
+                result.error(index, 400, 'You have already reviewed this book')
+            else:
+                new_reviews.append((index, Review(book_id=book_id, user_id=user_id, rating=rating,
+                                                  comment=op['comment'])))
+                rating_changes[book_id][0] += rating
+                rating_changes[book_id][1] += 1
+        else:
+            # A review update or delete; shape_error() ruled out every other combination
+            review = reviews.get(target)
+            if review is None:
+                result.error(index, 404, 'Review not found')
+            elif action == 'delete':
+                review_deletes.append(target)
+                rating_changes[review.book_id][0] -= review.rating
+                rating_changes[review.book_id][1] -= 1
+                result.ok(index, 204, target)
+            else:
+                values = {'id': target}
+                if 'rating' in op:
+                    values['rating'] = parse_rating(op['rating'])
+                    if values['rating'] is None:
+                        result.error(index, 400, 'Rating must be between 1 and 5')
+                        continue
+                    rating_changes[review.book_id][0] += values['rating'] - review.rating
+                if 'comment' in op:
+                    values['comment'] = str(op['comment'])
+                review_updates.append(values)
+                result.ok(index, 200, target)
+        
+        if result.results[index] is None or result.results[index]['status'] < 400:
+            touched.add(key)
+    
+    if atomic and result.failed:
+        for index, entry in enumerate(result.results):
+            if entry is None or entry['status'] < 400:
+                result.error(index, 424, 'Not applied because another operation failed')
+        db.session.rollback()
+        return result, set()
+    
+    # Bulk UPDATE by primary key: one executemany per set of changed columns
+    if item_updates:
+        db.session.execute(update(ReadingListItem), item_updates)
+    if review_updates:
+        db.session.execute(update(Review), review_updates)
+    if item_deletes:
+        db.session.execute(delete(ReadingListItem).where(ReadingListItem.id.in_(item_deletes)),
+                           execution_options={'synchronize_session': False})
+    if review_deletes:
+        db.session.execute(delete(Review).where(Review.id.in_(review_deletes)),
+                           execution_options={'synchronize_session': False})
+    db.session.add_all([item for _, item in new_items] + [review for _, review in new_reviews])
+    for book_id, (rating_delta, count_delta) in rating_changes.items():
+        if rating_delta or count_delta:
+            apply_rating_change(book_id, rating_delta, count_delta)
+    record_events(
+        [ActivityEvent(user_id=user_id, kind=READING_LIST_ADD, book_id=item.book_id, status=item.status)
+         for _, item in new_items] +
+        [ActivityEvent(user_id=user_id, kind=READING_LIST_STATUS, book_id=items[values['id']].book_id,
+                       status=values['status']) for values in item_updates] +
+        [ActivityEvent(user_id=user_id, kind=REVIEW, book_id=review.book_id, rating=review.rating)
+         for _, review in new_reviews]
+    )
+    if any(rating_delta or count_delta for rating_delta, count_delta in rating_changes.values()):
+        schedule_recommendations()
+    db.session.flush()
+    for index, row in new_items + new_reviews:
+        result.ok(index, 201, row.id)
+    db.session.commit()
+    
+    changed_books = {reviews[id].book_id for id in review_deletes}
+    changed_books |= {reviews[values['id']].book_id for values in review_updates}
+    changed_books |= {review.book_id for _, review in new_reviews}
+    return result, changed_books
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Scripted load test of the REST API, with results to compare against a baseline.
+
+Loads a synthetic dataset (benchmarks.dataset) into a temporary database, then runs
+each scenario from --concurrency threads for --duration seconds, against the app
+in-process (Flask test client) and over HTTP to a local gunicorn:
+
+    browse        pages of the book list (plain, by genre, by rating), following cursors
+    detail        a book and then its reviews, popular books picked more often
+    login         password logins by random readers
+    reading_list  add a book, change its status, list, remove it (one reader per thread)
+
+Results are JSON: per target and scenario, requests, errors, throughput,
+p50/p95/p99 latency and database queries per request (from X-DB-Queries). With
+--baseline the new run is compared against a stored result; --compare compares two
+stored results without running. Either prints every metric and exits 1 if any
+regressed: latency up or throughput down by more than --threshold percent, half a
+query or more per request added, or the error rate up by more than a point.
+The app's own settings apply except that rate limiting is off; set
+CACHE_BACKEND=null to time uncached reads.
+
+Usage (from the server directory):
+    python -m benchmarks.api_suite --output before.json
+    python -m benchmarks.api_suite --baseline before.json --output after.json
+    python -m benchmarks.api_suite --compare before.json after.json
+"""
+import argparse
+import collections
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import secrets
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.async_load import SERVER_DIR, free_port, percentile, wait_for
+from benchmarks.dataset import BENCH_PASSWORD, reader_email
+
+TARGETS = ('inprocess', 'gunicorn')
+BROWSE_PATHS = ('/api/books?limit=20', '/api/books?limit=20&sort=rating', '/api/books?limit=20&genre={genre}')
+BROWSE_PAGES = 3
+# An error rate this much higher than the baseline's (0.01 = one percentage point) is a regression
+ERROR_RATE_SLACK = 0.01
+# Queries are counted, not timed, so they need no noise allowance beyond rounding
+QUERY_SLACK = 0.5
+
+class InProcessClient:
+    """Requests through the Flask test client, without a server or sockets."""
+    def __init__(self, app):
+        self.client = app.test_client()
+    
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.headers, response.get_data()
+    
+    def close(self):
+        pass
+
+class HTTPClient:
+    """Requests over one keep-alive connection to a local server."""
+    def __init__(self, port):
+        self.port = port
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+            return response.status, response.headers, response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+            return None, {}, b''
+    
+    def close(self):
+        self.connection.close()
+
+class Recorder:
+    """One thread's samples: latency and query count of each successful request."""
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.errors = collections.Counter()
+    
+    def call(self, client, method, path, expect=200, body=None, headers=None):
+        """Time one request; returns (headers, body), or None if the status was not expect."""
+        start = time.perf_counter()
+        status, response_headers, content = client.request(method, path, body, headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        if status != expect:
+            self.errors[f'{method} {status or "connection error"}'] += 1
+            return None
+        self.latencies.append(elapsed)
+        if response_headers.get('X-DB-Queries') is not None:
+            self.queries.append(int(response_headers['X-DB-Queries']))
+        return response_headers, content
+
+def browse(client, recorder, rng, state):
+    path = rng.choice(BROWSE_PATHS).format(genre=quote(rng.choice(state['genres'])))
+    page = path
+    for _ in range(BROWSE_PAGES):
+        result = recorder.call(client, 'GET', page)
+        if result is None or not result[0].get('X-Next-Cursor'):
+            return
+        page = f"{path}&cursor={quote(result[0]['X-Next-Cursor'])}"
+
+def detail(client, recorder, rng, state):
+    book_id = rng.choices(state['book_ids'], cum_weights=state['popularity'])[0]
+    if recorder.call(client, 'GET', f'/api/books/{book_id}') is not None:
+        recorder.call(client, 'GET', f'/api/books/{book_id}/reviews')
+
+def login(client, recorder, rng, state):
+    body = {'email': reader_email(rng.randint(1, state['users'])), 'password': BENCH_PASSWORD}
+    recorder.call(client, 'POST', '/api/login', body=body)
+
+def reading_list(client, recorder, rng, state):
+    headers = state['headers']
+    book_id = rng.choice(state['book_ids'])
+    created = recorder.call(client, 'POST', '/api/reading-list', 201, {'book_id': book_id}, headers)
+    if created is None:
+        return
+    path = f"/api/reading-list/{json.loads(created[1])['id']}"
+    recorder.call(client, 'PATCH', path, body={'status': 'reading'}, headers=headers)
+    recorder.call(client, 'GET', '/api/reading-list', headers=headers)
+    recorder.call(client, 'DELETE', path, 204, headers=headers)
+
+SCENARIOS = {'browse': browse, 'detail': detail, 'login': login, 'reading_list': reading_list}
+# Scenarios whose threads each log in as their own reader before the clock starts
+AUTHENTICATED = {'reading_list'}
+
+def drive(make_client, name, dataset, concurrency, duration):
+    """Run one scenario; returns the threads' recorders and the measured seconds."""
+    scenario = SCENARIOS[name]
+    ready = threading.Barrier(concurrency + 1)
+    stop = threading.Event()
+    recorders = [Recorder() for _ in range(concurrency)]
+    
+    def worker(index):
+        client = make_client()
+        rng = random.Random(index)
+        state = dict(dataset, headers={})
+        try:
+            if name in AUTHENTICATED:
+                body = {'email': reader_email(index + 1), 'password': BENCH_PASSWORD}
+                status, _, content = client.request('POST', '/api/login', body)
+                if status == 200:
+                    state['headers'] = {'Authorization': f"Bearer {json.loads(content)['token']}"}
+            ready.wait()
+            while not stop.is_set():
+                scenario(client, recorders[index], rng, state)
+        finally:
+            client.close()
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return recorders, time.perf_counter() - start
+
+def summarize(recorders, elapsed):
+    latencies = [ms for recorder in recorders for ms in recorder.latencies]
+    queries = [count for recorder in recorders for count in recorder.queries]
+    errors = sum((recorder.errors for recorder in recorders), collections.Counter())
+    summary = {
+        'requests': len(latencies) + errors.total(),
+        'errors': errors.total(),
+        'error_statuses': dict(errors),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': None,
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+    }
+    if latencies:
+        summary['latency_ms'] = {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'mean': round(statistics.fmean(latencies), 2),
+        }
+    return summary
+
+def run_scenarios(make_client, dataset, args):
+    results = {}
+    for name in args.scenarios:
+        if args.warmup:
+            drive(make_client, name, dataset, args.concurrency, args.warmup)
+        results[name] = summarize(*drive(make_client, name, dataset, args.concurrency, args.duration))
+    return results
+
+def run_target(target, app, database_url, dataset, args):
+    if target == 'inprocess':
+        return run_scenarios(lambda: InProcessClient(app), dataset, args)
+    port = free_port()
+    command = ['gunicorn', '-w', str(args.workers), '-b', f'127.0.0.1:{port}', 'app:create_app()']
+    server = subprocess.Popen(command, cwd=SERVER_DIR, env=dict(os.environ, DATABASE_URL=database_url),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        return run_scenarios(lambda: HTTPClient(port), dataset, args)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+def error_rate(summary):
+    return summary['errors'] / summary['requests'] if summary['requests'] else 0.0
+
+def compare(baseline, current, threshold):
+    """Rows of (target, scenario, metric, before, after, regressed) for every shared scenario."""
+    limit = threshold / 100
+    rows = []
+    for target, scenarios in current['targets'].items():
+        for name, after in scenarios.items():
+            before = baseline['targets'].get(target, {}).get(name)
+            if before is None:
+                continue
+            checks = []
+            if before['latency_ms'] and after['latency_ms']:
+                for key in ('p50', 'p95', 'p99'):
+                    old, new = before['latency_ms'][key], after['latency_ms'][key]
+                    checks.append((f'{key} ms', old, new, new > old * (1 + limit)))
+            old, new = before['throughput_rps'], after['throughput_rps']
+            checks.append(('req/s', old, new, new < old * (1 - limit)))
+            old, new = before['queries_per_request'], after['queries_per_request']
+            if old is not None and new is not None:
+                checks.append(('queries/req', old, new, new >= old + QUERY_SLACK))
+            old, new = error_rate(before), error_rate(after)
+            checks.append(('error rate', round(old, 4), round(new, 4), new > old + ERROR_RATE_SLACK))
+            rows.extend((target, name) + check for check in checks)
+    return rows
+
+def print_summary(target, results):
+    print(f"{target:<10}{'scenario':<14}{'requests':>9}{'errors':>8}{'req/s':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for name, summary in results.items():
+        latency = summary['latency_ms'] or {'p50': float('nan'), 'p95': float('nan'), 'p99': float('nan')}
+        queries = summary['queries_per_request']
+        print(f"{'':<10}{name:<14}{summary['requests']:>9}{summary['errors']:>8}{summary['throughput_rps']:>9.1f}"
+              f"{latency['p50']:>9.2f}{latency['p95']:>9.2f}{latency['p99']:>9.2f}"
+              f"{queries if queries is not None else '-':>9}")
+
+def report(baseline, current, threshold):
+    """Print the comparison; returns True if anything regressed."""
+    rows = compare(baseline, current, threshold)
+    print(f"{'target':<10}{'scenario':<14}{'metric':<13}{'baseline':>10}{'current':>10}{'change':>9}")
+    for target, name, metric, old, new, regressed in rows:
+        change = f'{(new - old) / old * 100:+.1f}%' if old else '-'
+        print(f"{target:<10}{name:<14}{metric:<13}{old:>10}{new:>10}{change:>9}"
+              f"{'  REGRESSION' if regressed else ''}")
+    regressions = sum(row[-1] for row in rows)
+    print(f'{regressions} regression(s) at a {threshold:g}% threshold' if regressions else
+          f'No regressions at a {threshold:g}% threshold')
+    return regressions > 0
+
+def git_commit():
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR,
+                            capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', default=','.join(TARGETS), help='Comma-separated: inprocess, gunicorn.')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenario names.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads per scenario.')
+    parser.add_argument('--duration', type=float, default=5, help='Measured seconds per scenario.')
+    parser.add_argument('--warmup', type=float, default=1, help='Unmeasured seconds before each scenario.')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes.')
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--reviews', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--baseline', help='Compare the results against this stored result.')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two stored results without running anything.')
+    parser.add_argument('--threshold', type=float, default=20, help='Allowed change in percent.')
+    args = parser.parse_args()
+    
+    if args.compare:
+        with open(args.compare[0]) as baseline, open(args.compare[1]) as current:
+            sys.exit(1 if report(json.load(baseline), json.load(current), args.threshold) else 0)
+    
+    args.targets = args.targets.split(',')
+    args.scenarios = args.scenarios.split(',')
+    for name in args.targets:
+        if name not in TARGETS:
+            parser.error(f'unknown target {name!r}')
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario {name!r}')
+    if AUTHENTICATED & set(args.scenarios) and args.users < args.concurrency:
+        parser.error('--users must be at least --concurrency: each thread edits its own reading list')
+    
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bookclub-bench-'), 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['RATE_LIMIT_ENABLED'] = 'false'
+    os.environ['DB_TIMING_HEADERS'] = 'true'
+    # Every gunicorn worker must accept the tokens the others issue
+    os.environ.setdefault('SECRET_KEY', secrets.token_hex(32))
+    
+    from flask_migrate import upgrade
+    from app import create_app
+    from benchmarks.dataset import generate
+    from seed import SAMPLE_BOOKS
+    
+    app = create_app(migrations=True)
+    with app.app_context():
+        upgrade()
+        counts = generate(args.books, args.users, args.reviews, args.seed)
+    dataset = {
+        'users': args.users,
+        'book_ids': range(1, args.books + 1),
+        # Same Zipf-like skew as the generated reviews: book k is viewed about 1/k as often as book 1
+        'popularity': list(itertools.accumulate(1 / rank for rank in range(1, args.books + 1))),
+        'genres': sorted({book['genre'] for book in SAMPLE_BOOKS}),
+    }
+    
+    results = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'database': 'sqlite',
+            'dataset': counts,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'workers': args.workers,
+            'cache_backend': os.environ.get('CACHE_BACKEND', 'memory'),
+        },
+        'targets': {},
+    }
+    for target in args.targets:
+        results['targets'][target] = run_target(target, app, database_url, dataset, args)
+        print_summary(target, results['targets'][target])
+    
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f'Wrote {args.output}')
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            sys.exit(1 if report(json.load(baseline), results, args.threshold) else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Compare throughput and tail latency of the sync (gunicorn) and async (uvicorn) servers.
+
+Seeds a database, starts each server on it in turn with the same number of worker
+processes, and drives book and review reads from many concurrent keep-alive clients.
+The response cache is disabled so every request reaches the database. Needs
+requirements-async.txt.
+
+Usage (from the server directory):
+    python -m benchmarks.async_load --clients 64 --workers 2 --duration 10
+"""
+import argparse
+import http.client
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def seed(books, reviews_per_book):
+    from app import create_app
+    from models import db, Book, Club, User, Review
+    
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Club), [{'id': 1, 'name': 'Book Club', 'slug': 'default'}])
+        db.session.execute(db.insert(User), [
+            {'username': f'reader{i}', 'email': f'reader{i}@example.com', 'password_hash': 'x'}
+            for i in range(reviews_per_book)
+        ])
+        db.session.execute(db.insert(Book), [
+            {'club_id': 1, 'title': f'Book {i}', 'author': f'Author {i % 100}', 'genre': 'Fiction',
+             'description': 'x' * 300}
+            for i in range(books)
+        ])
+        db.session.execute(db.insert(Review), [
+            {'club_id': 1, 'book_id': b, 'user_id': u, 'rating': 1 + (b + u) % 5, 'comment': 'A fine read.'}
+            for b in range(1, books + 1) for u in range(1, reviews_per_book + 1)
+        ])
+        db.session.commit()
+
+def wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+def drive(port, books, clients, duration):
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    
+    def client(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while not stop.is_set():
+            book_id = rng.randint(1, books)
+            path = f'/api/books/{book_id}' if rng.random() < 0.5 else f'/api/books/{book_id}/reviews'
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+            except (OSError, http.client.HTTPException):
+                errors.append('connection')
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+    
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--reviews-per-book', type=int, default=10)
+    args = parser.parse_args()
+    
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bookclub-bench-'), 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    seed(args.books, args.reviews_per_book)
+    
+    modes = (
+        ('sync gunicorn', ['gunicorn', '-w', str(args.workers), 'app:create_app()']),
+        ('async uvicorn', ['uvicorn', 'asgi:app', '--workers', str(args.workers), '--log-level', 'warning']),
+    )
+    
+    print(f'{args.clients} clients, {args.workers} workers, {args.duration:g}s per mode')
+    print(f"{'mode':<16}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, command in modes:
+        port = free_port()
+        bind = ['-b', f'127.0.0.1:{port}'] if command[0] == 'gunicorn' else ['--port', str(port)]
+        env = dict(os.environ, DATABASE_URL=database_url, CACHE_BACKEND='null', DB_TIMING_HEADERS='false',
+                   RATE_LIMIT_ENABLED='false')
+        server = subprocess.Popen(command + bind, cwd=SERVER_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for(port)
+            latencies, errors = drive(port, args.books, args.clients, args.duration)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        if not latencies:
+            print(f'{name:<16}{"no successful requests":>40}{len(errors):>8}')
+            continue
+        print(f'{name:<16}{len(latencies):>10}{len(latencies) / args.duration:>10.0f}'
+              f'{statistics.median(latencies):>10.2f}{percentile(latencies, 99):>10.2f}{len(errors):>8}')
+
+if __name__ == '__main__':
+    main()
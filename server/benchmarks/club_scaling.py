@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Per-club book list latency as the number of clubs on one database grows.
+
+Every club has the same number of books, inserted interleaved the way concurrent
+clubs would add them, so a club's rows are spread across the whole table. For each
+club count the same list requests are timed in-process (random club per request,
+response cache off), first with the club_id-leading indexes and then with the
+pre-club single-column ones. With club_id leading, a page reads only the requesting
+club's rows and stays flat; without it, SQLite walks everyone's rows to fill a page.
+
+Usage (from the server directory):
+    python -m benchmarks.club_scaling --clubs 1,10,100,1000 --books-per-club 100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GENRES = ('Fiction', 'Fantasy', 'Mystery', 'Romance', 'Science Fiction', 'Thriller', 'History', 'Poetry')
+CASES = (
+    ('first page', '/api/books?limit=20'),
+    ('genre', '/api/books?genre=Fantasy&limit=20'),
+    ('by rating', '/api/books?sort=rating&limit=20'),
+)
+CLUB_INDEXES = ('ix_books_club_id_id', 'ix_books_club_id_genre_id', 'ix_books_club_id_author_id',
+                'ix_books_club_id_average_rating_id', 'ix_books_club_id_favorite_count_id')
+GLOBAL_INDEXES = (
+    'CREATE INDEX ix_books_genre ON books (genre)',
+    'CREATE INDEX ix_books_author ON books (author)',
+    'CREATE INDEX ix_books_average_rating_id ON books (average_rating, id)',
+    'CREATE INDEX ix_books_favorite_count_id ON books (favorite_count, id)',
+)
+
+def load(db, clubs, books_per_club, seed=42):
+    from models import Book, Club
+    rng = random.Random(seed)
+    db.session.execute(db.insert(Club), [{'id': i, 'name': f'Club {i}', 'slug': f'club-{i}'}
+                                         for i in range(1, clubs + 1)])
+    batch = []
+    for n in range(clubs * books_per_club):
+        rating = round(rng.uniform(1, 5), 2)
+        batch.append({
+            'club_id': n % clubs + 1,
+            'title': f'Book {n}',
+            'author': f'Author {rng.randint(1, 500)}',
+            'genre': rng.choice(GENRES),
+            'description': 'A synthetic book.',
+            'rating_sum': 0, 'rating_count': 0, 'average_rating': rating, 'favorite_count': 0,
+        })
+        if len(batch) == 5000:
+            db.session.execute(db.insert(Book), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Book), batch)
+    db.session.commit()
+
+def use_global_indexes(db):
+    with db.engine.begin() as connection:
+        for name in CLUB_INDEXES:
+            connection.exec_driver_sql(f'DROP INDEX {name}')
+        for statement in GLOBAL_INDEXES:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql('ANALYZE')
+
+def time_requests(client, path, clubs, requests, rng):
+    samples = []
+    for _ in range(requests):
+        headers = {'X-Club-Id': str(rng.randint(1, clubs))}
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clubs', default='1,10,100,1000', help='Comma-separated club counts.')
+    parser.add_argument('--books-per-club', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per case.')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='bookclub-bench-')
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    # Time the queries, not the response cache or the rate limiter
+    os.environ['CACHE_BACKEND'] = 'null'
+    os.environ['RATE_LIMIT_ENABLED'] = 'false'
+    os.environ['DB_TIMING_HEADERS'] = 'false'
+    
+    from app import create_app
+    from models import db
+    
+    app = create_app()
+    client = app.test_client()
+    print(f"{'clubs':>6}{'books':>9}  {'case':<12}{'club index p50/p95 ms':>24}{'global index p50/p95 ms':>26}")
+    for clubs in [int(n) for n in args.clubs.split(',')]:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            load(db, clubs, args.books_per_club)
+        results = {}
+        for layout in ('club', 'global'):
+            if layout == 'global':
+                with app.app_context():
+                    use_global_indexes(db)
+            for name, path in CASES:
+                client.get(path, headers={'X-Club-Id': '1'})
+                results[name, layout] = time_requests(client, path, clubs, args.requests, random.Random(clubs))
+        for name, _ in CASES:
+            club, flat = results[name, 'club'], results[name, 'global']
+            print(f'{clubs:>6}{clubs * args.books_per_club:>9}  {name:<12}'
+                  f'{club[0]:>15.2f} / {club[1]:<6.2f}{flat[0]:>17.2f} / {flat[1]:<6.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Synthetic data for load tests: seed.py's sample catalog extended to any size.
+
+The sample books and the demo user come first, then generated books, readers and
+reviews, all in the default club. Review popularity is skewed (a few books get most
+reviews), like real traffic. Every generated reader's password is BENCH_PASSWORD,
+hashed once and shared, so loading 10k users does not take 10k slow hashes; logging
+in still pays the full hashing cost. Rows go in with batched Core inserts.
+
+Usage (from the server directory; DATABASE_URL must point at an empty database):
+    python -m benchmarks.dataset --books 10000 --users 1000 --reviews 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_PASSWORD = 'bench-password'
+BATCH_SIZE = 5000
+WORDS = ('silent', 'river', 'glass', 'empire', 'garden', 'night', 'winter', 'crown', 'letter', 'storm',
+         'shadow', 'harbor', 'orchard', 'mirror', 'lantern', 'island', 'iron', 'summer', 'road', 'stars')
+COMMENTS = ('Could not put it down.', 'Slow start, great ending.', 'Not for me.', 'A new favorite.',
+            'Beautifully written.', 'The middle dragged a bit.', 'Would read again.')
+
+def reader_email(n):
+    """Email of generated reader n (1-based); they all log in with BENCH_PASSWORD."""
+    return f'reader{n}@example.com'
+
+def insert_batches(db, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(db.insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+
+def generate_books(count, club_id, rng):
+    from seed import SAMPLE_BOOKS
+    genres = sorted({book['genre'] for book in SAMPLE_BOOKS})
+    authors = [f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}son' for _ in range(max(1, count // 20))]
+    for n in range(count):
+        if n < len(SAMPLE_BOOKS):
+            yield dict(SAMPLE_BOOKS[n], club_id=club_id)
+            continue
+        words = rng.sample(WORDS, 8)
+        yield {
+            'club_id': club_id,
+            'title': f'The {words[0].title()} {words[1].title()}',
+            'author': rng.choice(authors),
+            'genre': rng.choice(genres),
+            'description': ' '.join(words) + '. ' + rng.choice(COMMENTS),
+            # No cover URL: a load test should not hit an external image host
+            'image_url': None,
+        }
+
+def review_counts(count, books, users):
+    """Reviews per book: Zipf-like, so book k gets about 1/k as many as book 1.
+    
+    A user reviews a book at most once, so popular books are capped at one review
+    per user and the overflow goes to the next books down the list.
+    """
+    weights = [1 / rank for rank in range(1, books + 1)]
+    total = sum(weights)
+    counts = [min(users, int(count * weight / total)) for weight in weights]
+    short = min(count, books * users) - sum(counts)
+    while short > 0:
+        for index in range(books):
+            if short and counts[index] < users:
+                counts[index] += 1
+                short -= 1
+    return counts
+
+def generate_reviews(count, books, users, club_id, rng):
+    for book_id, reviews in enumerate(review_counts(count, books, users), start=1):
+        for user_id in rng.sample(range(1, users + 1), reviews):
+            yield {
+                'club_id': club_id,
+                'book_id': book_id,
+                'user_id': user_id,
+                'rating': rng.choices((1, 2, 3, 4, 5), (1, 2, 4, 6, 5))[0],
+                'comment': rng.choice(COMMENTS),
+            }
+
+def generate(books, users, reviews, seed=42):
+    """Fill the (migrated, empty) database in the current app context; returns the row counts.
+    
+    User 1 is seed.py's demo user; readers 1..users are users 2..users + 1.
+    """
+    from flask import current_app
+    from models import db, Book, ClubMembership, Review, User
+    from passwords import hash_password
+    from ratings import rebuild_ratings
+    from tenancy import club_scope
+    
+    rng = random.Random(seed)
+    club_id = current_app.config['DEFAULT_CLUB_ID']
+    password_hash = hash_password(BENCH_PASSWORD)
+    demo = {'username': 'demo', 'email': 'demo@example.com', 'password_hash': hash_password('password123')}
+    insert_batches(db, User, [demo] + [
+        {'username': f'reader{n}', 'email': reader_email(n), 'password_hash': password_hash}
+        for n in range(1, users + 1)
+    ])
+    insert_batches(db, ClubMembership, (
+        {'club_id': club_id, 'user_id': user_id, 'role': 'owner' if user_id == 1 else 'member'}
+        for user_id in range(1, users + 2)
+    ))
+    insert_batches(db, Book, generate_books(books, club_id, rng))
+    insert_batches(db, Review, generate_reviews(reviews, books, users + 1, club_id, rng))
+    db.session.commit()
+    with club_scope(club_id):
+        rebuild_ratings()
+    return {
+        'books': db.session.query(Book).count(),
+        'users': db.session.query(User).count(),
+        'reviews': db.session.query(Review).count(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--reviews', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    from flask_migrate import upgrade
+    from app import create_app
+    from models import db, User
+    
+    app = create_app(migrations=True)
+    with app.app_context():
+        upgrade()
+        if db.session.query(User).first() is not None:
+            sys.exit(f'{db.engine.url} already has data; point DATABASE_URL at an empty database')
+        start = time.perf_counter()
+        counts = generate(args.books, args.users, args.reviews, args.seed)
+        print(f"Loaded {counts['books']} books, {counts['users']} users and {counts['reviews']} reviews "
+              f'into {db.engine.url} in {time.perf_counter() - start:.1f}s')
+
+if __name__ == '__main__':
+    main()
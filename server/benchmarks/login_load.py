@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Measure catalog browse latency while a burst of logins is hashing passwords.
+
+Runs the app on a local threaded server once with inline hashing and once with the
+hashing process pool, and prints browse latency percentiles for both.
+
+Usage (from the server directory):
+    python -m benchmarks.login_load --login-threads 8 --duration 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def run_scenario(args):
+    from werkzeug.serving import make_server
+    from app import create_app
+    from models import db, Book, Club
+    
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Club), [{'id': 1, 'name': 'Book Club', 'slug': 'default'}])
+        db.session.execute(db.insert(Book), [
+            {'club_id': 1, 'title': f'Book {i}', 'author': 'Author', 'genre': 'Fiction', 'description': 'x' * 200}
+            for i in range(200)
+        ])
+        db.session.commit()
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    base = f'http://127.0.0.1:{server.server_port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    post_json(f'{base}/api/users', {'username': 'bench', 'email': 'bench@example.com', 'password': 'secret'})
+    
+    stop = threading.Event()
+    login_statuses = []
+    
+    def login_loop(worker):
+        attempt = 0
+        while not stop.is_set():
+            attempt += 1
+            # Wrong passwords always miss the verified-credentials cache, so every one is hashed
+            login_statuses.append(post_json(f'{base}/api/login', {
+                'email': 'bench@example.com', 'password': f'wrong-{worker}-{attempt}'
+            }))
+    
+    browse_ms = []
+    
+    def browse_loop():
+        while not stop.is_set():
+            start = time.perf_counter()
+            with urllib.request.urlopen(f'{base}/api/books?limit=50&fields=id,title') as response:
+                response.read()
+            browse_ms.append((time.perf_counter() - start) * 1000)
+    
+    threads = [threading.Thread(target=login_loop, args=(i,)) for i in range(args.login_threads)]
+    threads.append(threading.Thread(target=browse_loop))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    
+    print(json.dumps({
+        'browse_requests': len(browse_ms),
+        'browse_p50_ms': round(statistics.median(browse_ms), 2),
+        'browse_p99_ms': round(percentile(browse_ms, 99), 2),
+        'logins': len(login_statuses),
+        'logins_shed': login_statuses.count(503),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--pool-workers', type=int, default=2)
+    parser.add_argument('--scenario', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.scenario:
+        run_scenario(args)
+        return
+    
+    print(f"{'mode':<14}{'browse reqs':>12}{'p50 ms':>10}{'p99 ms':>10}{'logins':>8}{'shed':>6}")
+    for mode, workers in (('inline', 0), ('process pool', args.pool_workers)):
+        env = dict(os.environ, PASSWORD_HASH_WORKERS=str(workers), RATE_LIMIT_ENABLED='false',
+                   DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.login_load', '--scenario',
+             '--login-threads', str(args.login_threads), '--duration', str(args.duration)],
+            env=env, capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        print(f"{mode:<14}{result['browse_requests']:>12}{result['browse_p50_ms']:>10}"
+              f"{result['browse_p99_ms']:>10}{result['logins']:>8}{result['logins_shed']:>6}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare full-text search latency against a naive LIKE scan.
+
+Usage (from the server directory):
+    python -m benchmarks.search_latency --books 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SYLLABLES = ('ka', 'lo', 'mir', 'then', 'dra', 'vel', 'os', 'tur', 'ith', 'nor',
+             'sa', 'ben', 'ul', 'gor', 'ria', 'pha', 'es', 'wyn', 'dal', 'cor')
+
+def build_vocabulary(rng, size=8000):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def generate_books(count, vocabulary, seed=42):
+    rng = random.Random(seed)
+    # Zipf-like word frequencies, like real prose: a few common words, a long tail of rare ones
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    for _ in range(count):
+        words = rng.choices(vocabulary, weights, k=46)
+        yield {
+            'title': ' '.join(words[:3]).title(),
+            'author': ' '.join(words[3:5]).title(),
+            'genre': rng.choice(('Fiction', 'Fantasy', 'Mystery', 'Romance')),
+            'description': ' '.join(words[5:]),
+        }
+
+def build_queries(vocabulary):
+    common, mid, rare = vocabulary[50], vocabulary[800], vocabulary[5000]
+    return (rare, mid, f'{mid} {rare}', f'{common} {mid}', rare[:-1], 'nosuchword')
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='bookclub-bench-')
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    
+    from app import create_app
+    from models import db, Book, Club
+    from search import search_books, like_search
+    from tenancy import club_scope
+    
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Club), [{'id': 1, 'name': 'Book Club', 'slug': 'default'}])
+        print(f'Loading {args.books} books into {db.engine.url} ...')
+        vocabulary = build_vocabulary(random.Random(7))
+        batch = []
+        for row in generate_books(args.books, vocabulary):
+            batch.append(dict(row, club_id=1))
+            if len(batch) == 5000:
+                db.session.execute(db.insert(Book), batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(Book), batch)
+        db.session.commit()
+        
+        print(f"{'query':<28}{'index ms':>12}{'LIKE ms':>12}{'speedup':>10}")
+        with club_scope(1):
+            for q in build_queries(vocabulary):
+                indexed = timed(lambda: search_books(q, args.limit), args.repeat)
+                naive = timed(lambda: like_search(q, args.limit, 0), args.repeat)
+                print(f'{q:<28}{indexed:>12.2f}{naive:>12.2f}{naive / indexed:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Compare list serialization throughput: ORM objects + to_dict() against plain rows.
+
+Usage (from the server directory):
+    python -m benchmarks.serialization_throughput --books 5000 --page 500
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--page', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='bookclub-bench-')
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    
+    from app import create_app
+    from models import db, Book, Club
+    from resources.books import BOOK_FIELDS
+    import serialization
+    
+    app = create_app()
+    with app.test_request_context():
+        db.create_all()
+        db.session.execute(db.insert(Club), [{'id': 1, 'name': 'Book Club', 'slug': 'default'}])
+        db.session.execute(db.insert(Book), [{
+            'club_id': 1, 'title': f'Book {i}', 'author': f'Author {i % 300}', 'genre': 'Fiction',
+            'description': 'A long enough description to look like a real blurb. ' * 4,
+            'image_url': f'https://example.com/covers/{i}.jpg'
+        } for i in range(args.books)])
+        db.session.commit()
+        
+        columns = [getattr(Book, f) for f in BOOK_FIELDS]
+        
+        def orm_to_dict():
+            db.session.expunge_all()
+            books = Book.query.order_by(Book.id).limit(args.page).all()
+            return json.dumps([book.to_dict() for book in books]).encode()
+        
+        def rows_stdlib():
+            rows = db.session.query(*columns).order_by(Book.id).limit(args.page).all()
+            return json.dumps(serialization.records(rows, BOOK_FIELDS),
+                              default=serialization._default, separators=(',', ':')).encode()
+        
+        def rows_fast():
+            rows = db.session.query(*columns).order_by(Book.id).limit(args.page).all()
+            return serialization.dumps(serialization.records(rows, BOOK_FIELDS))
+        
+        def rows_fast_gzip():
+            return gzip.compress(rows_fast(), compresslevel=app.config['COMPRESS_GZIP_LEVEL'])
+        
+        scenarios = [
+            ('ORM + to_dict + json', orm_to_dict),
+            ('rows + json', rows_stdlib),
+            (f"rows + {'orjson' if serialization.orjson else 'json (orjson missing)'}", rows_fast),
+            ('rows + fast + gzip', rows_fast_gzip),
+        ]
+        
+        print(f'{args.page} of {args.books} books per response, median of {args.repeat} runs')
+        print(f"{'path':<34}{'ms':>9}{'rows/s':>12}{'bytes':>10}{'speedup':>9}")
+        baseline = None
+        for name, fn in scenarios:
+            size = len(fn())
+            seconds = timed(fn, args.repeat)
+            baseline = baseline or seconds
+            print(f'{name:<34}{seconds * 1000:>9.2f}{args.page / seconds:>12.0f}{size:>10}{baseline / seconds:>8.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Report import time, app-factory time and gunicorn worker boot time.
+
+Usage (from the server directory):
+    python -m benchmarks.startup --repeat 5 --workers 4
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_FACTORY = '''
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+print(imported - start, time.perf_counter() - imported)
+'''
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def time_to_first_response(env, workers, preload):
+    """Seconds from starting gunicorn until it answers its first request."""
+    port = free_port()
+    command = ['gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:create_app()']
+    if preload:
+        command.insert(1, '--preload')
+    start = time.perf_counter()
+    server = subprocess.Popen(command, cwd=SERVER_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(server.stderr.read())
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/books?limit=1', timeout=5) as response:
+                    response.read()
+                return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bookclub-bench-'), 'bench.db')}"
+    env = dict(os.environ, DATABASE_URL=database_url)
+    subprocess.run([sys.executable, 'init_db.py'], cwd=SERVER_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    
+    imports, factories = [], []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, '-c', MEASURE_FACTORY], cwd=SERVER_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout.split()
+        imports.append(float(output[0]) * 1000)
+        factories.append(float(output[1]) * 1000)
+    
+    print(f'median of {args.repeat} runs')
+    print(f'{"import app":<36}{statistics.median(imports):>10.1f} ms')
+    print(f'{"create_app()":<36}{statistics.median(factories):>10.1f} ms')
+    for preload in (False, True):
+        boots = [time_to_first_response(env, args.workers, preload) * 1000 for _ in range(args.repeat)]
+        label = f'gunicorn -w {args.workers}{" --preload" if preload else ""} first response'
+        print(f'{label:<36}{statistics.median(boots):>10.1f} ms')
+
+if __name__ == '__main__':
+    main()
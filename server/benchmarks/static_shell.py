@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Requests per second one worker can serve for the SPA shell and static assets.
+
+Writes a build-like static folder (a 20 KB index.html and a fingerprinted bundle),
+precompresses it, and times the same requests in-process against the old handlers
+(send_static_file for / and every 404) and static_assets, each on a bare Flask app.
+One thread, no network: the numbers are the Python cost per request, so they are
+the ceiling for one sync worker; the byte counts show what goes over the wire.
+
+Usage (from the server directory):
+    python -m benchmarks.static_shell --duration 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ASSET = 'static/js/main.5e1f2a9c.js'
+
+def write_build(folder):
+    os.makedirs(os.path.join(folder, 'static', 'js'))
+    with open(os.path.join(folder, 'index.html'), 'w') as f:
+        f.write(f'<!doctype html><html><head><script defer src="/{ASSET}"></script></head><body>'
+                + '<div id="root"></div><!-- padding -->' * 500 + '</body></html>')
+    with open(os.path.join(folder, ASSET), 'w') as f:
+        f.write(''.join(f'function f{i}(a){{return a*{i}+"{i}"}}\n' for i in range(20000)))
+
+def legacy_app(folder):
+    """The handlers create_app used before static_assets."""
+    from flask import Flask
+    app = Flask(__name__, static_folder=folder, static_url_path='')
+    
+    @app.route('/')
+    def serve():
+        return app.send_static_file('index.html')
+    
+    @app.errorhandler(404)
+    def not_found(e):
+        return app.send_static_file('index.html')
+    
+    return app
+
+def current_app(folder):
+    # A bare app as well, so the comparison is not skewed by the metrics and rate-limit hooks
+    from flask import Flask
+    from static_assets import init_static
+    app = Flask(__name__, static_folder=None)
+    app.config.update(STATIC_FOLDER=folder)
+    init_static(app)
+    return app
+
+def requests_per_second(client, path, headers, duration):
+    response = client.get(path, headers=headers)
+    size, status = len(response.get_data()), response.status_code
+    count = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            client.get(path, headers=headers).close()
+        count += 50
+    return count / duration, status, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=3)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='bookclub-bench-')
+    folder = os.path.join(workdir, 'static')
+    write_build(folder)
+    
+    from static_assets import precompress_folder
+    precompress_folder(folder, 1024)
+    apps = (('legacy', legacy_app(folder)), ('current', current_app(folder)))
+    shell_etag = apps[1][1].test_client().get('/').headers['ETag']
+    
+    cases = (
+        ('shell /', '/', {}),
+        ('client route, gzip', '/books/42', {'Accept-Encoding': 'gzip'}),
+        ('shell revalidation', '/', {'If-None-Match': shell_etag}),
+        ('hashed bundle, gzip', f'/{ASSET}', {'Accept-Encoding': 'gzip'}),
+    )
+    print(f"{'request':<22}{'app':<9}{'req/s':>9}{'status':>8}{'bytes':>9}")
+    for name, path, headers in cases:
+        for label, app in apps:
+            rps, status, size = requests_per_second(app.test_client(), path, headers, args.duration)
+            print(f'{name:<22}{label:<9}{rps:>9.0f}{status:>8}{size:>9}')
+
+if __name__ == '__main__':
+    main()
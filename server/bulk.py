@@ -0,0 +1,256 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import insert, select, tuple_
+from tenancy import current_club_id
+from models import db, Book, Review, User
+from ratings import rebuild_ratings
+
+FORMATS = ('csv', 'ndjson')
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+BOOK_IMPORT_COLUMNS = ('title', 'author', 'genre', 'description', 'image_url')
+BOOK_EXPORT_COLUMNS = ('id', 'title', 'author', 'genre', 'description', 'image_url', 'created_at')
+REVIEW_IMPORT_COLUMNS = ('book_id', 'user_id', 'rating', 'comment')
+REVIEW_EXPORT_COLUMNS = ('id', 'book_id', 'user_id', 'rating', 'comment', 'created_at')
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+    
+    def add_error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+    
+    def to_dict(self):
+        return {
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors
+        }
+
+def format_from_content_type(content_type):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return 'ndjson'
+    return None
+
+def format_from_filename(filename):
+    if filename.endswith('.csv'):
+        return 'csv'
+    if filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+def read_records(stream, fmt):
+    """Yield (row_number, record_or_None, error_or_None) without reading the whole input."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row_number, record in enumerate(reader, start=1):
+            yield row_number, record, None
+    else:
+        for row_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield row_number, None, 'Invalid JSON'
+                continue
+            if not isinstance(record, dict):
+                yield row_number, None, 'Each line must be a JSON object'
+                continue
+            yield row_number, record, None
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def as_int(value):
+    """An integer from NDJSON, or a CSV field holding one; None for anything else."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+def validate_book(record):
+    row = {}
+    for field in ('title', 'author', 'genre', 'description'):
+        value = record.get(field)
+        if value is None or (isinstance(value, str) and value.strip() == ''):
+            return None, f'{field} is required'
+        # NDJSON can hold numbers, lists or objects where a string belongs
+        if not isinstance(value, str):
+            return None, f'{field} must be a string'
+        row[field] = value
+    image_url = record.get('image_url') or None
+    if image_url is not None and not isinstance(image_url, str):
+        return None, 'image_url must be a string'
+    row['image_url'] = image_url
+    
+    column_lengths = {'title': 200, 'author': 100, 'genre': 50, 'image_url': 500}
+    for field, max_length in column_lengths.items():
+        if row[field] is not None and len(row[field]) > max_length:
+            return None, f'{field} must be at most {max_length} characters'
+    return row, None
+
+def validate_review(record):
+    row = {field: as_int(record.get(field)) for field in ('book_id', 'user_id', 'rating')}
+    if None in row.values():
+        return None, 'book_id, user_id and rating must be integers'
+    if row['rating'] < 1 or row['rating'] > 5:
+        return None, 'Rating must be between 1 and 5'
+    if not record.get('comment'):
+        return None, 'comment is required'
+    if not isinstance(record['comment'], str):
+        return None, 'comment must be a string'
+    row['comment'] = record['comment']
+    return row, None
+
+def copy_rows(table, columns, rows):
+    # COPY is the fastest way into Postgres; it runs on the session's connection
+    # so it is part of the same transaction as the rest of the chunk.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    
+    dbapi_connection = db.session.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+            buffer
+        )
+
+def insert_rows(model, columns, rows):
+    if not rows:
+        return
+    now = datetime.utcnow()
+    # Core inserts skip tenancy.py's stamping, so the club is filled in here
+    club_id = current_club_id()
+    if club_id is None:
+        raise RuntimeError('Bulk imports need a club; run them inside tenancy.club_scope()')
+    # COPY skips the models' Python-side defaults too, so the timestamps are set here for both paths
+    stamped = ('created_at', 'updated_at') if hasattr(model, 'updated_at') else ('created_at',)
+    for row in rows:
+        row.update(dict.fromkeys(stamped, now), club_id=club_id)
+    columns = columns + stamped + ('club_id',)
+    
+    if db.session.get_bind().dialect.name == 'postgresql':
+        copy_rows(model.__table__, columns, rows)
+    else:
+        db.session.execute(insert(model.__table__), rows)
+
+def import_books(records, chunk_size=CHUNK_SIZE):
+    result = ImportResult()
+    for chunk in chunked(records, chunk_size):
+        rows = []
+        for row_number, record, error in chunk:
+            if error is None:
+                row, error = validate_book(record)
+            if error:
+                result.add_error(row_number, error)
+            else:
+                rows.append(row)
+        
+        insert_rows(Book, BOOK_IMPORT_COLUMNS, rows)
+        db.session.commit()
+        result.inserted += len(rows)
+    return result
+
+def import_reviews(records, chunk_size=CHUNK_SIZE):
+    result = ImportResult()
+    for chunk in chunked(records, chunk_size):
+        candidates = []
+        for row_number, record, error in chunk:
+            if error is None:
+                row, error = validate_review(record)
+            if error:
+                result.add_error(row_number, error)
+            else:
+                candidates.append((row_number, row))
+        
+        # Check foreign keys and the one-review-per-user constraint for the whole
+        # chunk up front, so one bad row can't abort the batch insert.
+        book_ids = {row['book_id'] for _, row in candidates}
+        user_ids = {row['user_id'] for _, row in candidates}
+        known_books = set(db.session.scalars(select(Book.id).where(Book.id.in_(book_ids))))
+        known_users = set(db.session.scalars(select(User.id).where(User.id.in_(user_ids))))
+        pairs = {(row['book_id'], row['user_id']) for _, row in candidates}
+        taken = set(db.session.execute(
+            select(Review.book_id, Review.user_id)
+            .where(tuple_(Review.book_id, Review.user_id).in_(pairs))
+        ).all()) if pairs else set()
+        
+        rows = []
+        for row_number, row in candidates:
+            pair = (row['book_id'], row['user_id'])
+            if row['book_id'] not in known_books:
+                result.add_error(row_number, f"Book {row['book_id']} does not exist")
+            elif row['user_id'] not in known_users:
+                result.add_error(row_number, f"User {row['user_id']} does not exist")
+            elif pair in taken:
+                result.add_error(row_number, 'User has already reviewed this book')
+            else:
+                taken.add(pair)
+                rows.append(row)
+        
+        insert_rows(Review, REVIEW_IMPORT_COLUMNS, rows)
+        if rows:
+            # Commits the reviews and their rating aggregates together
+            rebuild_ratings(sorted({row['book_id'] for row in rows}))
+        else:
+            db.session.commit()
+        result.inserted += len(rows)
+    return result
+
+def export_rows(model, columns, fmt, chunk_size=CHUNK_SIZE):
+    """Yield the table as CSV or NDJSON text, holding at most one chunk of rows in memory."""
+    statement = select(*[getattr(model, c) for c in columns]) \
+        .order_by(model.id).execution_options(yield_per=chunk_size)
+    rows = db.session.execute(statement)
+    
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    
+    for partition in rows.partitions():
+        for row in partition:
+            values = [v.isoformat() if isinstance(v, datetime) else v for v in row]
+            if fmt == 'csv':
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, values))))
+                buffer.write('\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_books(fmt):
+    return export_rows(Book, BOOK_EXPORT_COLUMNS, fmt)
+
+def export_reviews(fmt):
+    return export_rows(Review, REVIEW_EXPORT_COLUMNS, fmt)
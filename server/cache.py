@@ -0,0 +1,171 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+class MemoryCache:
+    """Per-process LRU cache bounded by entry count and total size, with per-entry TTL."""
+    
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl=None, size=1):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+    
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+    
+    def incr(self, key, initial):
+        with self._lock:
+            entry = self._entries.get(key)
+            value = initial if entry is None else entry[2] + 1
+            if entry is not None:
+                self._remove(key)
+            self._entries[key] = (None, 1, value)
+            self._bytes += 1
+            return value
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+class RedisCache:
+    """Shared cache for all workers; eviction is left to the server's maxmemory policy."""
+    
+    def __init__(self, url, default_ttl=60, prefix='bookclub:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND=redis requires the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+    
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+    
+    def set(self, key, value, ttl=None, size=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+    
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+    
+    def incr(self, key, initial):
+        self.client.set(self.prefix + key, initial - 1, nx=True)
+        return self.client.incr(self.prefix + key)
+    
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+class NullCache:
+    def get(self, key):
+        return None
+    
+    def set(self, key, value, ttl=None, size=None):
+        pass
+    
+    def delete(self, key):
+        pass
+    
+    def incr(self, key, initial):
+        return initial
+    
+    def clear(self):
+        pass
+
+class CacheGenerations:
+    """Generations stored in the cache itself; right when every process shares the cache."""
+    
+    def __init__(self, cache):
+        self.cache = cache
+    
+    def get(self, names):
+        values = []
+        for name in names:
+            # Seeding from the clock means an evicted counter can never come back
+            # with a value that old keys were built from
+            value = self.cache.get(f'gen:{name}')
+            if value is None:
+                value = self.cache.incr(f'gen:{name}', time.time_ns())
+            values.append(value)
+        return values
+    
+    def bump(self, names):
+        for name in names:
+            self.cache.incr(f'gen:{name}', time.time_ns())
+
+def create_cache(config):
+    backend = config['CACHE_BACKEND']
+    if backend == 'memory':
+        return MemoryCache(
+            max_entries=config['CACHE_MAX_ENTRIES'],
+            max_bytes=config['CACHE_MAX_BYTES'],
+            default_ttl=config['CACHE_DEFAULT_TTL']
+        )
+    if backend == 'redis':
+        return RedisCache(config['CACHE_URL'], default_ttl=config['CACHE_DEFAULT_TTL'])
+    if backend == 'null':
+        return NullCache()
+    raise ValueError(f'Unknown CACHE_BACKEND {backend!r}')
+
+def init_cache(app):
+    cache = app.extensions['cache'] = create_cache(app.config)
+    if isinstance(cache, MemoryCache):
+        # Other processes can't see this cache, so invalidations go through the database.
+        # Imported here because models imports passwords, which imports this module.
+        from generations import DatabaseGenerations
+        app.extensions['cache_generations'] = DatabaseGenerations()
+    else:
+        app.extensions['cache_generations'] = CacheGenerations(cache)
+
+def get_cache():
+    return current_app.extensions['cache']
+
+def generations(*names):
+    # A namespace's generation is part of every key in it, so bumping it drops the
+    # whole namespace at once, in every process that builds keys from it
+    return current_app.extensions['cache_generations'].get(names)
+
+def generation(name):
+    return generations(name)[0]
+
+def bump_generation(*names):
+    current_app.extensions['cache_generations'].bump(names)
@@ -0,0 +1,119 @@
+import os
+import click
+from ratings import rebuild_ratings
+from favorites import rebuild_favorite_counts
+from http_cache import invalidate_catalog
+from recommendations import build_recommendations, TOP_K
+from query_plans import check_query_plans
+from static_assets import precompress_folder
+from tenancy import club_scope
+import bulk
+
+STDIO_NAMES = ('-', '<stdin>', '<stdout>')
+
+def resolve_format(fmt, filename):
+    fmt = fmt or bulk.format_from_filename(filename)
+    if fmt is None and filename in STDIO_NAMES:
+        fmt = 'ndjson'
+    if fmt is None:
+        raise click.UsageError('Could not infer the format from the file name, pass --format')
+    return fmt
+
+def run_import(importer, file, fmt, club_id):
+    with club_scope(club_id):
+        result = importer(bulk.read_records(file, resolve_format(fmt, file.name)))
+    invalidate_catalog()
+    for error in result.errors:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(f'Inserted {result.inserted} rows, {result.failed} failed')
+
+def run_export(exporter, file, fmt, club_id):
+    with club_scope(club_id):
+        for chunk in exporter(resolve_format(fmt, file.name)):
+            file.write(chunk)
+
+def register_commands(app):
+    @app.cli.command('rebuild-ratings')
+    @click.option('--book-id', 'book_ids', type=int, multiple=True, help='Only rebuild these books.')
+    def rebuild_ratings_command(book_ids):
+        """Recompute the denormalized rating aggregates on books from reviews."""
+        count = rebuild_ratings(list(book_ids) or None)
+        invalidate_catalog()
+        click.echo(f'Rebuilt ratings for {count} books')
+    
+    @app.cli.command('rebuild-favorite-counts')
+    def rebuild_favorite_counts_command():
+        """Recompute books.favorite_count from the user_books table."""
+        count = rebuild_favorite_counts()
+        invalidate_catalog()
+        click.echo(f'Rebuilt favorite counts for {count} books')
+    
+    @app.cli.command('precompress-static')
+    def precompress_static_command():
+        """Write .gz/.br variants of the static build for the app to serve as-is."""
+        folder = app.config['STATIC_FOLDER'] or os.path.join(app.root_path, 'static')
+        count = precompress_folder(folder, app.config['COMPRESS_MIN_BYTES'])
+        click.echo(f'Wrote {count} compressed files in {folder}')
+    
+    @app.cli.command('build-recommendations')
+    @click.option('--top-k', type=int, default=TOP_K, show_default=True,
+                  help='Neighbors kept per book and recommendations kept per user.')
+    def build_recommendations_command(top_k):
+        """Precompute similar books and per-user recommendations from reviews and favorites."""
+        similarities, recommendations = build_recommendations(top_k)
+        click.echo(f'Stored {similarities} book neighbors and {recommendations} user recommendations')
+    
+    @app.cli.command('check-query-plans')
+    @click.option('--verbose', is_flag=True, help='Print every statement and plan, not only failures.')
+    def check_query_plans_command(verbose):
+        """Call every endpoint, EXPLAIN the SQL it sends, and fail on plans that read too much."""
+        failures = 0
+        for name, sql, plan, problems in check_query_plans(app):
+            if problems:
+                failures += 1
+            if problems or verbose:
+                click.echo(f"{'FAIL' if problems else 'ok  '} {name}")
+                click.echo(f"       {' '.join(sql.split())}")
+                for line in plan:
+                    click.echo(f"       {'>> ' if line.strip() in problems else ''}{line}")
+        if failures:
+            raise click.ClickException(f'{failures} statements scan a whole table or a whole club')
+        click.echo('Every endpoint statement uses a selective index')
+    
+    format_option = click.option('--format', 'fmt', type=click.Choice(bulk.FORMATS),
+                                 help='Defaults to the file extension.')
+    import_club_option = click.option('--club-id', type=int, default=app.config['DEFAULT_CLUB_ID'],
+                                      show_default=True, help='Club the rows are imported into.')
+    export_club_option = click.option('--club-id', type=int, help='Only export this club (default: every club).')
+    
+    @app.cli.command('import-books')
+    @click.argument('file', type=click.File('r', encoding='utf-8'))
+    @format_option
+    @import_club_option
+    def import_books_command(file, fmt, club_id):
+        """Bulk load books from a CSV or NDJSON file ('-' for stdin)."""
+        run_import(bulk.import_books, file, fmt, club_id)
+    
+    @app.cli.command('import-reviews')
+    @click.argument('file', type=click.File('r', encoding='utf-8'))
+    @format_option
+    @import_club_option
+    def import_reviews_command(file, fmt, club_id):
+        """Bulk load reviews from a CSV or NDJSON file ('-' for stdin)."""
+        run_import(bulk.import_reviews, file, fmt, club_id)
+    
+    @app.cli.command('export-books')
+    @click.argument('file', type=click.File('w', encoding='utf-8'), default='-')
+    @format_option
+    @export_club_option
+    def export_books_command(file, fmt, club_id):
+        """Stream all books to a CSV or NDJSON file (stdout by default)."""
+        run_export(bulk.export_books, file, fmt, club_id)
+    
+    @app.cli.command('export-reviews')
+    @click.argument('file', type=click.File('w', encoding='utf-8'), default='-')
+    @format_option
+    @export_club_option
+    def export_reviews_command(file, fmt, club_id):
+        """Stream all reviews to a CSV or NDJSON file (stdout by default)."""
+        run_export(bulk.export_reviews, file, fmt, club_id)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
@@ -12,4 +13,109 @@ class Config:
         database_url = database_url.replace('postgres://', 'postgresql://', 1)
     
     SQLALCHEMY_DATABASE_URI = database_url or 'sqlite:///bookclub.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Pool sizing is per worker process: keep workers * (size + overflow) under the server's limit
+    if SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+    else:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+        }
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    
+    # Adds X-DB-* timing headers to every response
+    DB_TIMING_HEADERS = os.environ.get('DB_TIMING_HEADERS', 'true').lower() == 'true'
+    
+    # JSON list responses at least this large are also sent gzip/brotli-compressed
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+    
+    # The React build served by the app (server/static by default); build.sh precompresses it
+    STATIC_FOLDER = os.environ.get('STATIC_FOLDER')
+    
+    # Cover thumbnails (/api/books/<id>/cover) are cached on local disk, bounded by size
+    COVER_CACHE_DIR = os.environ.get('COVER_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bookclub-covers'))
+    COVER_CACHE_MAX_BYTES = int(os.environ.get('COVER_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    COVER_FETCH_TIMEOUT = float(os.environ.get('COVER_FETCH_TIMEOUT', 10))
+    COVER_MAX_SOURCE_BYTES = int(os.environ.get('COVER_MAX_SOURCE_BYTES', 10 * 1024 * 1024))
+    COVER_MAX_AGE = int(os.environ.get('COVER_MAX_AGE', 86400))
+    COVER_ERROR_TTL = int(os.environ.get('COVER_ERROR_TTL', 300))
+    # Cover fetches and image checks refuse addresses that aren't globally routable;
+    # comma-separated networks listed here (e.g. an internal image host) are let through
+    OUTBOUND_ALLOWED_NETWORKS = os.environ.get('OUTBOUND_ALLOWED_NETWORKS', '')
+    
+    # Token-bucket rate limits per client (user id when signed in, else IP address).
+    # 'memory' keeps buckets per worker; 'sqlite' shares them across workers on one host.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+    RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH', '/tmp/bookclub-ratelimit.db')
+    RATE_LIMITS = os.environ.get('RATE_LIMITS', '; '.join([
+        'POST /api/login=10/minute',
+        'POST /api/users=5/minute',
+        'POST /api/books=30/minute',
+        'POST /api/books/bulk=5/minute',
+        'POST /api/batch=60/minute',
+        'GET /api/books=300/minute',
+        'GET /api/users=60/minute',
+        'GET /api/books/export=5/minute',
+        'default=600/minute',
+    ]))
+    # Number of reverse proxies in front of the app whose X-Forwarded-For can be trusted
+    PROXY_COUNT = int(os.environ.get('PROXY_COUNT', 0))
+    
+    # Load shedding: answer 503 while a worker is overloaded (0 disables each check)
+    LOAD_SHED_MAX_IN_FLIGHT = int(os.environ.get('LOAD_SHED_MAX_IN_FLIGHT', 0))
+    LOAD_SHED_MAX_POOL_WAIT_MS = float(os.environ.get('LOAD_SHED_MAX_POOL_WAIT_MS', 0))
+    
+    # Sampling profiler, switched on per request with an X-Profile header
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', 5))
+    PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES', 50))
+    
+    # Lifetime of the signed bearer tokens issued by /api/login, in seconds
+    TOKEN_TTL = int(os.environ.get('TOKEN_TTL', 7 * 24 * 3600))
+    
+    # Response cache: 'memory' (per worker LRU), 'redis' (shared, needs CACHE_URL) or 'null'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_URL = os.environ.get('CACHE_URL')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 60))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    # Seconds the most-favorited leaderboard is served before it is recomputed
+    LEADERBOARD_TTL = int(os.environ.get('LEADERBOARD_TTL', 300))
+    
+    # Clubs: requests without an X-Club-Id header (or ?club_id=) use this club
+    DEFAULT_CLUB_ID = int(os.environ.get('DEFAULT_CLUB_ID', 1))
+    
+    # Activity feed: events kept per user timeline, trimmed once every FEED_TRIM_EVERY events
+    FEED_TIMELINE_LENGTH = int(os.environ.get('FEED_TIMELINE_LENGTH', 500))
+    FEED_TRIM_EVERY = int(os.environ.get('FEED_TRIM_EVERY', 50))
+    FEED_PAGE_MAX = int(os.environ.get('FEED_PAGE_MAX', 100))
+    
+    # Background jobs run in worker.py ('worker') or in a thread inside each web process ('thread')
+    JOB_RUNNER = os.environ.get('JOB_RUNNER', 'worker')
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 1))
+    # A job still running after this long is assumed lost with its worker and run again
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 600))
+    JOB_BACKOFF_SECONDS = float(os.environ.get('JOB_BACKOFF_SECONDS', 10))
+    JOB_BACKOFF_MAX_SECONDS = float(os.environ.get('JOB_BACKOFF_MAX_SECONDS', 3600))
+    JOB_RETENTION_HOURS = int(os.environ.get('JOB_RETENTION_HOURS', 168))
+    # Review and favorite changes rebuild recommendations at most once per window
+    RECOMMENDATIONS_REFRESH_SECONDS = int(os.environ.get('RECOMMENDATIONS_REFRESH_SECONDS', 3600))
+    
+    # Password hashing runs in a process pool so a login burst can't starve other requests.
+    # PASSWORD_HASH_WORKERS=0 hashes inline; PASSWORD_HASH_CONCURRENCY caps hashes in flight
+    # per worker, and requests that wait longer than PASSWORD_HASH_QUEUE_TIMEOUT get a 503.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 4))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2))
+    PASSWORD_CACHE_TTL = int(os.environ.get('PASSWORD_CACHE_TTL', 300))
+    PASSWORD_CACHE_MAX_ENTRIES = int(os.environ.get('PASSWORD_CACHE_MAX_ENTRIES', 10000))
\ No newline at end of file
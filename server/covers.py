@@ -0,0 +1,220 @@
+"""Book cover thumbnails, fetched from the origin once and kept in a disk cache.
+
+Files are content-addressed: objects/<sha256 of the bytes> holds a source image or a
+thumbnail, and refs/<sha256 of url, size and format> names the object for a request.
+Identical images behind different URLs share one object, and the object name is the
+ETag. Hits touch the object's mtime; once the cache passes COVER_CACHE_MAX_BYTES the
+least recently used objects are deleted.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from flask import current_app
+from cache import get_cache
+from outbound import UnsafeURL, open_url
+
+SIZES = {'small': (160, 240), 'medium': (320, 480), 'large': (640, 960)}
+FORMATS = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+# Bump when the resizing changes, so old thumbnails are not served for new requests
+RENDER_VERSION = 1
+MAX_SOURCE_PIXELS = 40_000_000
+
+class CoverUnavailable(Exception):
+    """The origin could not provide a usable image; status is the HTTP status to answer with."""
+    
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+class CoverCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+        # One fetch or render per ref at a time in this process
+        self._key_locks = {}
+    
+    def _path(self, kind, name):
+        return os.path.join(self.directory, kind, name[:2], name)
+    
+    def _write(self, kind, name, data):
+        path = self._path(kind, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers in other workers never see a partial file
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp, path)
+        return path
+    
+    def lookup(self, ref):
+        """(open file, object name) for ref, or None; marks the object as recently used.
+        
+        An open file stays readable even if another worker evicts the object meanwhile.
+        """
+        try:
+            with open(self._path('refs', ref)) as f:
+                name = f.read().strip()
+            file = open(self._path('objects', name), 'rb')
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        os.utime(file.fileno())
+        return file, name
+    
+    def store(self, ref, data):
+        name = sha256(data)
+        path = self._path('objects', name)
+        if not os.path.exists(path):
+            self._write('objects', name, data)
+        file = open(path, 'rb')
+        self._write('refs', ref, name.encode())
+        self._grow(len(data))
+        return file, name
+    
+    def get_or_create(self, ref, build):
+        found = self.lookup(ref)
+        if found is not None:
+            return found
+        with self._lock:
+            key_lock = self._key_locks.setdefault(ref, threading.Lock())
+        with key_lock:
+            try:
+                found = self.lookup(ref)
+                if found is None:
+                    found = self.store(ref, build())
+                return found
+            finally:
+                with self._lock:
+                    self._key_locks.pop(ref, None)
+    
+    def _grow(self, size):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._objects())
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._size = self._evict(int(self.max_bytes * 0.9))
+    
+    def _objects(self):
+        root = os.path.join(self.directory, 'objects')
+        for folder, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+    
+    def _evict(self, target):
+        """Delete least recently used objects until the cache is under target bytes."""
+        objects = sorted(self._objects(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in objects)
+        for path, size, _ in objects:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        # Refs to deleted objects are misses anyway; drop them so they do not pile up
+        for folder, _, files in os.walk(os.path.join(self.directory, 'refs')):
+            for name in files:
+                path = os.path.join(folder, name)
+                try:
+                    with open(path) as f:
+                        target_name = f.read().strip()
+                    if not os.path.exists(self._path('objects', target_name)):
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return total
+
+_caches = {}
+
+def get_cover_cache():
+    config = current_app.config
+    key = (config['COVER_CACHE_DIR'], config['COVER_CACHE_MAX_BYTES'])
+    if key not in _caches:
+        _caches[key] = CoverCache(*key)
+    return _caches[key]
+
+def fetch_source(url):
+    config = current_app.config
+    if not url.startswith(('http://', 'https://')):
+        raise CoverUnavailable('Cover URL is not http(s)', 404)
+    request = urllib.request.Request(url, headers={'User-Agent': 'bookclub-covers'})
+    try:
+        with open_url(request, timeout=config['COVER_FETCH_TIMEOUT']) as response:
+            data = response.read(config['COVER_MAX_SOURCE_BYTES'] + 1)
+    except UnsafeURL:
+        raise CoverUnavailable('Cover URL points at an internal address', 404)
+    except urllib.error.HTTPError as e:
+        raise CoverUnavailable(f'Cover origin answered {e.code}', 404 if e.code in (404, 410) else 502)
+    except (urllib.error.URLError, OSError):
+        raise CoverUnavailable('Cover origin is unreachable')
+    if len(data) > config['COVER_MAX_SOURCE_BYTES']:
+        raise CoverUnavailable('Cover image is too large')
+    return data
+
+def render(source, size, fmt):
+    from PIL import Image  # Pillow is only needed once a thumbnail is actually rendered
+    
+    try:
+        image = Image.open(io.BytesIO(source))
+        if image.width * image.height > MAX_SOURCE_PIXELS:
+            raise CoverUnavailable('Cover image is too large')
+        # Lets the JPEG decoder downscale while decoding, which is much cheaper
+        image.draft('RGB', (SIZES[size][0] * 2, SIZES[size][1] * 2))
+        image.thumbnail(SIZES[size], Image.LANCZOS)
+    except (OSError, Image.DecompressionBombError):
+        raise CoverUnavailable('Cover is not a readable image')
+    
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if fmt == 'jpeg' or not has_alpha:
+        if has_alpha:
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    else:
+        image = image.convert('RGBA')
+    out = io.BytesIO()
+    if fmt == 'webp':
+        image.save(out, 'WEBP', quality=80, method=4)
+    else:
+        image.save(out, 'JPEG', quality=82, optimize=True, progressive=True)
+    return out.getvalue()
+
+def cover_thumbnail(url, size, fmt):
+    """Return (open file, etag) of the thumbnail, fetching and rendering it on a miss."""
+    cache = get_cover_cache()
+    ref = sha256(f'{RENDER_VERSION}\n{url}\n{size}\n{fmt}'.encode())
+    # Remember failures for a while, so a broken cover does not hit the origin on every view
+    error_key = f'cover-error:{sha256(url.encode())}'
+    error = get_cache().get(error_key)
+    if error is not None:
+        raise CoverUnavailable(*error)
+    
+    def build():
+        source_ref = sha256(f'source\n{url}'.encode())
+        source, _ = cache.get_or_create(source_ref, lambda: fetch_source(url))
+        with source:
+            return render(source.read(), size, fmt)
+    
+    try:
+        return cache.get_or_create(ref, build)
+    except CoverUnavailable as e:
+        get_cache().set(error_key, (str(e), e.status), ttl=current_app.config['COVER_ERROR_TTL'])
+        raise
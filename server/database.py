@@ -0,0 +1,109 @@
+import threading
+import time
+from flask import g, has_request_context
+from sqlalchemy import event
+
+class DatabaseTotals:
+    """Process-wide counters behind the metrics endpoint."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.max_pool_wait_seconds = 0.0
+    
+    def add_request(self, queries, query_seconds, pool_wait_seconds):
+        with self._lock:
+            self.requests += 1
+            self.queries += queries
+            self.query_seconds += query_seconds
+            self.pool_wait_seconds += pool_wait_seconds
+            self.max_pool_wait_seconds = max(self.max_pool_wait_seconds, pool_wait_seconds)
+    
+    def to_dict(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'queries': self.queries,
+                'query_time_ms': round(self.query_seconds * 1000, 3),
+                'pool_wait_ms': round(self.pool_wait_seconds * 1000, 3),
+                'max_pool_wait_ms': round(self.max_pool_wait_seconds * 1000, 3)
+            }
+
+totals = DatabaseTotals()
+
+def request_stats():
+    if 'db_stats' not in g:
+        g.db_stats = {'queries': 0, 'query_seconds': 0.0, 'pool_wait_seconds': 0.0}
+    return g.db_stats
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if has_request_context():
+        stats = request_stats()
+        stats['queries'] += 1
+        stats['query_seconds'] += elapsed
+
+def _time_pool_checkout(pool):
+    # The pool has no "checkout requested" event, so time the call that waits for a connection
+    connect = pool.connect
+    
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            if has_request_context():
+                request_stats()['pool_wait_seconds'] += time.perf_counter() - start
+    
+    pool.connect = timed_connect
+
+def configure_sqlite(app, engine):
+    journal_mode = app.config['SQLITE_JOURNAL_MODE']
+    busy_timeout = app.config['SQLITE_BUSY_TIMEOUT_MS']
+    
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed while a writer commits; busy_timeout makes a second
+        # writer wait for the lock instead of failing with "database is locked"
+        cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        if journal_mode.upper() == 'WAL':
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+def pool_status(engine):
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    return status
+
+def init_database(app, db):
+    # Engines are created by db.init_app without connecting, so this does no I/O
+    with app.app_context():
+        engine = db.engine
+    
+    if engine.dialect.name == 'sqlite':
+        configure_sqlite(app, engine)
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    _time_pool_checkout(engine.pool)
+    event.listen(engine, 'engine_disposed', lambda engine: _time_pool_checkout(engine.pool))
+    
+    @app.after_request
+    def record_database_stats(response):
+        stats = request_stats()
+        totals.add_request(stats['queries'], stats['query_seconds'], stats['pool_wait_seconds'])
+        if app.config['DB_TIMING_HEADERS']:
+            response.headers['X-DB-Queries'] = str(stats['queries'])
+            response.headers['X-DB-Time-Ms'] = f"{stats['query_seconds'] * 1000:.2f}"
+            response.headers['X-DB-Pool-Wait-Ms'] = f"{stats['pool_wait_seconds'] * 1000:.2f}"
+        return response
@@ -0,0 +1,69 @@
+from sqlalchemy import delete, func, insert, select, update
+from models import db, Book, user_books
+from tasks import schedule_recommendations
+
+MAX_BOOK_IDS = 500
+
+def favorite_book_ids(user_id, book_ids):
+    # Joined to books so that only the current club's favorites are seen
+    return set(db.session.scalars(
+        select(user_books.c.book_id).join(Book, Book.id == user_books.c.book_id)
+        .where(user_books.c.user_id == user_id, user_books.c.book_id.in_(book_ids))
+    ))
+
+def change_counts(book_ids, delta):
+    # Relative UPDATE, so concurrent favorites of the same book don't overwrite each other.
+    # Callers have already picked the books, which may be in any club.
+    db.session.execute(
+        update(Book).where(Book.id.in_(book_ids))
+        .values(favorite_count=Book.favorite_count + delta)
+        .execution_options(synchronize_session=False, all_clubs=True)
+    )
+
+def add_favorites(user_id, book_ids):
+    """Favorite several books at once; returns (added, already favorited, unknown book ids)."""
+    book_ids = set(book_ids)
+    existing = set(db.session.scalars(select(Book.id).where(Book.id.in_(book_ids))))
+    already = favorite_book_ids(user_id, existing)
+    added = sorted(existing - already)
+    if added:
+        db.session.execute(insert(user_books), [{'user_id': user_id, 'book_id': b} for b in added])
+        change_counts(added, 1)
+        schedule_recommendations()
+    db.session.commit()
+    return added, sorted(already), sorted(book_ids - existing)
+
+def remove_favorites(user_id, book_ids):
+    """Unfavorite several books at once; returns the ids that were favorited."""
+    removed = sorted(favorite_book_ids(user_id, set(book_ids)))
+    if removed:
+        db.session.execute(
+            delete(user_books)
+            .where(user_books.c.user_id == user_id, user_books.c.book_id.in_(removed))
+        )
+        change_counts(removed, -1)
+        schedule_recommendations()
+    db.session.commit()
+    return removed
+
+def release_user_favorites(user_id):
+    """Remove a user's favorites in every club, and their counts, before the user is deleted."""
+    removed = list(db.session.scalars(select(user_books.c.book_id).where(user_books.c.user_id == user_id)))
+    if removed:
+        change_counts(removed, -1)
+        # Deleting the user only clears favorite_books as loaded, i.e. in the current club
+        db.session.execute(delete(user_books).where(user_books.c.user_id == user_id))
+    return removed
+
+def rebuild_favorite_counts():
+    favorite_count = select(func.count()).select_from(user_books) \
+        .where(user_books.c.book_id == Book.id).scalar_subquery()
+    result = db.session.execute(
+        update(Book).values(favorite_count=favorite_count).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+def most_favorited(limit):
+    return Book.query.filter(Book.favorite_count > 0) \
+        .order_by(Book.favorite_count.desc(), Book.id.desc()).limit(limit).all()
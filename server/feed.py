@@ -0,0 +1,110 @@
+from flask import current_app
+from sqlalchemy import delete, insert, literal, select, union_all
+from models import db, ActivityEvent, Book, Follow, TimelineEntry, User
+
+REVIEW = 'review'
+READING_LIST_ADD = 'reading_list_add'
+READING_LIST_STATUS = 'reading_list_status'
+
+def record_events(events):
+    """Store activity events and fan them out to the actor's and followers' timelines.
+    
+    Runs inside the caller's transaction, so an event exists exactly when the write it
+    describes was committed. Each batch costs one INSERT per table however many
+    followers there are.
+    """
+    if not events:
+        return
+    db.session.add_all(events)
+    db.session.flush()
+    event_ids = [event.id for event in events]
+    
+    followers = select(Follow.follower_id, ActivityEvent.id) \
+        .join(ActivityEvent, ActivityEvent.user_id == Follow.followed_id) \
+        .where(ActivityEvent.id.in_(event_ids))
+    own = select(ActivityEvent.user_id, ActivityEvent.id).where(ActivityEvent.id.in_(event_ids))
+    db.session.execute(
+        insert(TimelineEntry).from_select(['user_id', 'event_id'], union_all(followers, own))
+    )
+    
+    # Trimming costs a scan per timeline, so do it every few events rather than every time
+    trim_every = current_app.config['FEED_TRIM_EVERY']
+    if any(event_id % trim_every == 0 for event_id in event_ids):
+        readers = select(Follow.follower_id).where(Follow.followed_id.in_({e.user_id for e in events}))
+        trim_timelines(db.session.scalars(readers).all() + [e.user_id for e in events])
+
+def trim_timelines(user_ids):
+    length = current_app.config['FEED_TIMELINE_LENGTH']
+    for user_id in set(user_ids):
+        oldest_kept = select(TimelineEntry.event_id) \
+            .where(TimelineEntry.user_id == user_id) \
+            .order_by(TimelineEntry.event_id.desc()) \
+            .offset(length - 1).limit(1).scalar_subquery()
+        db.session.execute(
+            delete(TimelineEntry)
+            .where(TimelineEntry.user_id == user_id, TimelineEntry.event_id < oldest_kept)
+        )
+
+def follow(follower_id, followed_id):
+    """Returns False if already following. Backfills the followed user's recent activity."""
+    if db.session.get(Follow, (follower_id, followed_id)) is not None:
+        return False
+    db.session.add(Follow(follower_id=follower_id, followed_id=followed_id))
+    recent = select(literal(follower_id), ActivityEvent.id) \
+        .where(ActivityEvent.user_id == followed_id) \
+        .order_by(ActivityEvent.id.desc()) \
+        .limit(current_app.config['FEED_TIMELINE_LENGTH'])
+    db.session.execute(insert(TimelineEntry).from_select(['user_id', 'event_id'], recent))
+    return True
+
+def unfollow(follower_id, followed_id):
+    """Returns False if not following. Removes the unfollowed user's events from the timeline."""
+    deleted = db.session.execute(
+        delete(Follow).where(Follow.follower_id == follower_id, Follow.followed_id == followed_id)
+    ).rowcount
+    if not deleted:
+        return False
+    db.session.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.user_id == follower_id,
+            TimelineEntry.event_id.in_(select(ActivityEvent.id).where(ActivityEvent.user_id == followed_id))
+        )
+    )
+    return True
+
+def forget_user(user_id):
+    """Remove a user's follows, timeline and events before the user is deleted."""
+    events = select(ActivityEvent.id).where(ActivityEvent.user_id == user_id)
+    db.session.execute(delete(Follow).where((Follow.follower_id == user_id) | (Follow.followed_id == user_id)))
+    db.session.execute(delete(TimelineEntry).where(
+        (TimelineEntry.user_id == user_id) | TimelineEntry.event_id.in_(events)
+    ))
+    db.session.execute(delete(ActivityEvent).where(ActivityEvent.user_id == user_id))
+
+def forget_book(book_id):
+    """Remove the events about a book before the book is deleted."""
+    events = select(ActivityEvent.id).where(ActivityEvent.book_id == book_id)
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.event_id.in_(events)))
+    db.session.execute(delete(ActivityEvent).where(ActivityEvent.book_id == book_id))
+
+def feed_page(user_id, limit, before=None):
+    """Up to limit events from a user's timeline, newest first, older than event id before."""
+    statement = select(ActivityEvent, User.username, Book.title) \
+        .join(TimelineEntry, TimelineEntry.event_id == ActivityEvent.id) \
+        .join(User, User.id == ActivityEvent.user_id) \
+        .join(Book, Book.id == ActivityEvent.book_id) \
+        .where(TimelineEntry.user_id == user_id)
+    if before is not None:
+        statement = statement.where(TimelineEntry.event_id < before)
+    rows = db.session.execute(statement.order_by(TimelineEntry.event_id.desc()).limit(limit)).all()
+    return [{
+        'id': event.id,
+        'kind': event.kind,
+        'user_id': event.user_id,
+        'username': username,
+        'book_id': event.book_id,
+        'book_title': title,
+        'rating': event.rating,
+        'status': event.status,
+        'created_at': event.created_at.isoformat() if event.created_at else None
+    } for event, username, title in rows]
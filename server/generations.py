@@ -0,0 +1,47 @@
+"""Cache generations kept in the database, for the per-process memory cache.
+
+Each response cache key includes the generation of its namespace (see cache.generation),
+so bumping a generation invalidates every key built from it. A MemoryCache lives in one
+process, so its generations can't: a write handled by another web worker, the CLI or
+the job worker would never reach it. The counters live in the cache_generations table
+instead, read at most once per request and bumped in a transaction of their own.
+"""
+from flask import g
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, CacheGeneration
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE; others update, then insert if no row
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+class DatabaseGenerations:
+    def get(self, names):
+        # Remembered for the rest of the request, so a page with several keys costs one query
+        known = g.setdefault('cache_generations', {})
+        missing = [name for name in names if name not in known]
+        if missing:
+            self.remember(missing, db.session.execute(self.query(missing)).all())
+        return [known[name] for name in names]
+    
+    def query(self, names):
+        return select(CacheGeneration.name, CacheGeneration.value).where(CacheGeneration.name.in_(names))
+    
+    def remember(self, names, rows):
+        """Keep the (name, value) rows of query(names) for this request (asgi.py runs the query itself)."""
+        rows = dict(rows)
+        # A namespace nothing has invalidated yet has no row
+        g.setdefault('cache_generations', {}).update({name: rows.get(name, 0) for name in names})
+    
+    def bump(self, names):
+        # Its own transaction, so a bump never commits the caller's work; call it after the commit
+        with db.engine.begin() as connection:
+            make_insert = UPSERT_INSERTS.get(connection.dialect.name)
+            for name in names:
+                if make_insert is not None:
+                    connection.execute(make_insert(CacheGeneration).values(name=name, value=1).on_conflict_do_update(
+                        index_elements=['name'], set_={'value': CacheGeneration.value + 1}
+                    ))
+                elif not connection.execute(update(CacheGeneration).where(CacheGeneration.name == name)
+                                            .values(value=CacheGeneration.value + 1)).rowcount:
+                    connection.execute(CacheGeneration.__table__.insert().values(name=name, value=1))
+        g.pop('cache_generations', None)
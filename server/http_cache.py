@@ -0,0 +1,100 @@
+import hashlib
+from datetime import datetime
+from flask import Response, request
+from cache import get_cache, generation, generations, bump_generation
+from serialization import dumps, compress, encoded_response
+from tenancy import current_club_id
+
+def make_etag(value):
+    if isinstance(value, str):
+        value = value.encode()
+    return hashlib.sha1(value).hexdigest()
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def normalize(result):
+    if not isinstance(result, tuple):
+        return result, 200, {}
+    payload, status = result[0], result[1]
+    headers = result[2] if len(result) > 2 else {}
+    return payload, status, dict(headers)
+
+def cache_entry(payload, headers, version=None):
+    body = dumps(payload)
+    etag = make_etag(version(payload) if version else body)
+    # Compressed once per cache fill rather than on every hit
+    variants = compress(body)
+    entry = {'etag': etag, 'body': body, 'variants': variants, 'headers': headers}
+    return entry, len(body) + sum(len(v) for v in variants.values())
+
+def cached_json(key, build, version=None, current_version=None, ttl=None):
+    """Serve a JSON GET through the response cache with a strong ETag.
+    
+    build() returns a flask_restful style result; only 200s are cached. version(payload)
+    derives the ETag from the row version instead of hashing the body, and
+    current_version() looks that version up cheaply so a conditional GET can be
+    answered with 304 on a cache miss without loading or serializing the row. ttl
+    overrides CACHE_DEFAULT_TTL for this entry.
+    """
+    cache = get_cache()
+    entry = cache.get(key)
+    
+    if entry is None and current_version is not None and request.if_none_match:
+        etag = current_version()
+        if etag is not None and request.if_none_match.contains(make_etag(etag)):
+            return not_modified(make_etag(etag))
+    
+    if entry is None:
+        payload, status, headers = normalize(build())
+        if status != 200:
+            return payload, status, headers
+        entry, size = cache_entry(payload, headers, version)
+        cache.set(key, entry, ttl=ttl, size=size)
+    
+    if request.if_none_match.contains(entry['etag']):
+        return not_modified(entry['etag'])
+    
+    response = encoded_response(entry['body'], entry['variants'], headers=entry['headers'])
+    response.set_etag(entry['etag'])
+    # Let browsers keep the body but revalidate it with If-None-Match on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def book_version(book_id, updated_at):
+    if isinstance(updated_at, datetime):
+        updated_at = updated_at.isoformat()
+    return f"book:{book_id}:{updated_at or ''}"
+
+# Keys include the club the entry was built for, so one club's cached rows are never
+# served to another; club_id defaults to the current request's club
+
+def book_generation(book_id, club_id):
+    return f'book:{club_id}:{book_id}'
+
+def book_key(book_id, club_id=None):
+    club_id = club_id or current_club_id()
+    catalog, book = generations('book-details', book_generation(book_id, club_id))
+    return f'book:{catalog}:{book}:{club_id}:{book_id}'
+
+def book_list_key(path=None, args=None, club_id=None):
+    args = request.args if args is None else args
+    query = '&'.join(f'{k}={v}' for k, v in sorted(args.items(multi=True)))
+    return f"books:{generation('books')}:{club_id or current_club_id()}:{path or request.path}?{query}"
+
+def reviews_key(book_id, club_id=None):
+    club_id = club_id or current_club_id()
+    catalog, book = generations('book-details', book_generation(book_id, club_id))
+    return f'reviews:{catalog}:{book}:{club_id}:{book_id}'
+
+def invalidate_book(book_id, club_id=None):
+    # A generation per book rather than deleting its keys, so processes with their
+    # own cache drop their copies too
+    bump_generation(book_generation(book_id, club_id or current_club_id()), 'books')
+
+def invalidate_catalog():
+    bump_generation('book-details')
+    bump_generation('books')
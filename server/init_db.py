@@ -3,20 +3,25 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from flask_migrate import upgrade
 from app import create_app
-from models import Book, User, Review, db
+from models import Book, User, Review, ClubMembership, db
+from tenancy import club_scope
 
 def init_database():
-    app = create_app()
-    with app.app_context():
-        # Create tables
-        db.create_all()
+    app = create_app(migrations=True)
+    club_id = app.config['DEFAULT_CLUB_ID']
+    with app.app_context(), club_scope(club_id):
+        # Create or update the schema
+        upgrade()
         
         # Create sample user
         if not User.query.first():
             user = User(username='demo', email='demo@example.com')
             user.set_password('password123')  # Default password for demo user
             db.session.add(user)
+            db.session.flush()
+            db.session.add(ClubMembership(club_id=club_id, user_id=user.id, role='owner'))
             db.session.commit()
         
         # Create sample books with images
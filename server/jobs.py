@@ -0,0 +1,216 @@
+"""Durable background jobs, stored in the jobs table of the app's own database.
+
+Handlers call enqueue() before their commit, so a job exists exactly when the write
+that asked for it does. worker.py (or a thread per web process with
+JOB_RUNNER=thread) claims due jobs, runs the task registered under the job's name,
+and retries failures with exponential backoff.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Job
+from metrics import registry, Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+JOB_BUCKETS = (0.01, 0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600)
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING; others check for the key first
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+JOBS = Counter(registry, 'bookclub_jobs_total', 'Job runs by task and outcome.', ('task', 'outcome'))
+JOB_WAIT = Histogram(registry, 'bookclub_job_wait_seconds', 'Time from a job being due to a worker starting it.',
+                     ('task',), JOB_BUCKETS)
+JOB_DURATION = Histogram(registry, 'bookclub_job_duration_seconds', 'Time spent running a job.',
+                         ('task',), JOB_BUCKETS)
+QUEUE_DEPTH = Gauge(registry, 'bookclub_job_queue_depth', 'Jobs in the queue table by status.', ('status',))
+QUEUE_AGE = Gauge(registry, 'bookclub_job_oldest_due_seconds', 'How long the oldest due job has been waiting.')
+
+TASKS = {}
+
+class JobFailed(Exception):
+    """Raise from a task to fail the job without further retries."""
+
+def task(name, max_attempts=5):
+    """Register a function as the task run for jobs named name; its kwargs are the payload."""
+    def register(function):
+        TASKS[name] = (function, max_attempts)
+        return function
+    return register
+
+def enqueue(name, payload=None, idempotency_key=None, delay=0):
+    """Add a job in the caller's transaction. Returns False if idempotency_key was already used."""
+    if name not in TASKS:
+        raise LookupError(f'Unknown task {name!r}')
+    now = datetime.utcnow()
+    values = {
+        'task': name,
+        'payload': json.dumps(payload or {}),
+        'idempotency_key': idempotency_key,
+        'status': QUEUED,
+        'attempts': 0,
+        'max_attempts': TASKS[name][1],
+        'run_at': now + timedelta(seconds=delay),
+        'created_at': now
+    }
+    if idempotency_key is None:
+        db.session.execute(insert(Job).values(**values))
+        return True
+    make_insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if make_insert is None:
+        if db.session.scalar(select(Job.id).where(Job.idempotency_key == idempotency_key)) is not None:
+            return False
+        db.session.execute(insert(Job).values(**values))
+        return True
+    statement = make_insert(Job).values(**values).on_conflict_do_nothing(index_elements=['idempotency_key'])
+    return db.session.execute(statement).rowcount == 1
+
+def due_clause(now):
+    return ((Job.status == QUEUED) & (Job.run_at <= now)) | ((Job.status == RUNNING) & (Job.locked_until < now))
+
+def claim_job():
+    """Take the next due job for this worker and commit the claim, or return None."""
+    now = datetime.utcnow()
+    due = due_clause(now)
+    # SKIP LOCKED lets PostgreSQL workers pass over each other's candidates; the guarded
+    # UPDATE below is what makes the claim safe everywhere
+    candidates = db.session.scalars(
+        select(Job.id).where(due).order_by(Job.run_at).limit(10).with_for_update(skip_locked=True)
+    ).all()
+    for job_id in candidates:
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, due).values(
+                status=RUNNING, attempts=Job.attempts + 1, started_at=now,
+                locked_until=now + timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+            )
+        ).rowcount
+        if claimed:
+            db.session.commit()
+            return db.session.get(Job, job_id)
+    db.session.commit()
+    return None
+
+def backoff(attempts):
+    config = current_app.config
+    delay = min(config['JOB_BACKOFF_MAX_SECONDS'], config['JOB_BACKOFF_SECONDS'] * 2 ** (attempts - 1))
+    # Jitter, so jobs that failed together do not all retry together
+    return delay * random.uniform(0.5, 1)
+
+def run_job(job):
+    """Run a claimed job and record the outcome."""
+    job_id, name, attempts, max_attempts = job.id, job.task, job.attempts, job.max_attempts
+    JOB_WAIT.observe(max(0.0, (job.started_at - job.run_at).total_seconds()), name)
+    function = TASKS.get(name, (None,))[0]
+    start = time.perf_counter()
+    try:
+        if function is None:
+            raise JobFailed(f'Unknown task {name!r}')
+        if attempts > max_attempts:
+            # Reclaimed after a worker died during its last allowed attempt
+            raise JobFailed('Lease expired on the final attempt')
+        function(**json.loads(job.payload))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        retry = attempts < max_attempts and not isinstance(e, JobFailed)
+        now = datetime.utcnow()
+        values = {'status': QUEUED if retry else FAILED, 'locked_until': None,
+                  'last_error': traceback.format_exc(limit=5)[-4000:]}
+        if retry:
+            values['run_at'] = now + timedelta(seconds=backoff(attempts))
+        else:
+            values['finished_at'] = now
+        db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.session.commit()
+        JOBS.inc(name, 'retried' if retry else 'failed')
+        logger.warning('Job %s (%s) attempt %s/%s failed: %s', job_id, name, attempts, max_attempts, e)
+    else:
+        db.session.execute(update(Job).where(Job.id == job_id).values(
+            status=DONE, finished_at=datetime.utcnow(), locked_until=None, last_error=None
+        ))
+        db.session.commit()
+        JOBS.inc(name, 'done')
+    finally:
+        JOB_DURATION.observe(time.perf_counter() - start, name)
+
+def prune_jobs():
+    """Delete finished jobs past JOB_RETENTION_HOURS; failed jobs are kept for inspection."""
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config['JOB_RETENTION_HOURS'])
+    deleted = db.session.execute(delete(Job).where(Job.status == DONE, Job.finished_at < cutoff)).rowcount
+    db.session.commit()
+    return deleted
+
+class Worker:
+    """Claims and runs jobs one at a time until stopped."""
+    
+    def __init__(self, app):
+        self.app = app
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._stop = threading.Event()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def run(self, once=False):
+        """Run until stop(), or with once=True until no job is due."""
+        config = self.app.config
+        next_prune = 0
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    if time.monotonic() >= next_prune:
+                        prune_jobs()
+                        next_prune = time.monotonic() + 600
+                    job = claim_job()
+                    if job is not None:
+                        run_job(job)
+                        continue
+                except Exception:
+                    # Usually the database being unreachable; back off and try again
+                    db.session.rollback()
+                    logger.exception('Job worker %s failed to claim or record a job', self.name)
+            if once:
+                return
+            self._stop.wait(config['JOB_POLL_SECONDS'])
+
+def queue_gauges(app):
+    def depth():
+        with app.app_context():
+            rows = db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all()
+        counts = dict.fromkeys((QUEUED, RUNNING, FAILED), 0)
+        counts.update(rows)
+        return [((status,), count) for status, count in counts.items()]
+    
+    def oldest_due():
+        now = datetime.utcnow()
+        with app.app_context():
+            oldest = db.session.scalar(select(func.min(Job.run_at)).where(Job.status == QUEUED, Job.run_at <= now))
+        return [((), (now - oldest).total_seconds() if oldest else 0)]
+    
+    QUEUE_DEPTH.function = depth
+    QUEUE_AGE.function = oldest_due
+
+def init_jobs(app):
+    import tasks  # registers the task functions
+    queue_gauges(app)
+    if app.config['JOB_RUNNER'] != 'thread':
+        return
+    
+    # Threads do not survive a fork, so start one per worker process on its first request
+    started = {}
+    
+    @app.before_request
+    def start_job_thread():
+        if started.get('pid') != os.getpid():
+            started['pid'] = os.getpid()
+            threading.Thread(target=Worker(app).run, daemon=True, name='job-worker').start()
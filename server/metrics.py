@@ -0,0 +1,253 @@
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter as StackCounter, OrderedDict
+from contextlib import contextmanager
+from flask import Response, abort, g, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+class Metric:
+    kind = None
+    
+    def __init__(self, registry, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        registry.append(self)
+    
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+class Counter(Metric):
+    kind = 'counter'
+    
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in items
+        ]
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+class Gauge(Counter):
+    kind = 'gauge'
+    
+    def __init__(self, registry, name, help, labelnames=(), function=None):
+        super().__init__(registry, name, help, labelnames)
+        self.function = function
+    
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+    
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+    
+    def render(self):
+        if self.function is not None:
+            # Sampled at scrape time, e.g. pool usage that is owned by something else
+            for labels, value in self.function():
+                self.set(value, *labels)
+        return super().render()
+
+class Histogram(Metric):
+    kind = 'histogram'
+    
+    def __init__(self, registry, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(buckets)
+    
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+    
+    def render(self):
+        with self._lock:
+            items = [(labels, (list(counts), count, total)) for labels, (counts, count, total) in self._values.items()]
+        lines = self.header()
+        for labels, (counts, count, total) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            le = _format_labels(self.labelnames, labels, [('le', '+Inf')])
+            lines.append(f'{self.name}_bucket{le} {count}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+        return lines
+
+registry = []
+
+REQUESTS = Counter(registry, 'bookclub_http_requests_total', 'HTTP requests by route and status.',
+                   ('method', 'route', 'status'))
+LATENCY = Histogram(registry, 'bookclub_http_request_duration_seconds', 'Time spent handling a request.',
+                    ('method', 'route'))
+REQUEST_SIZE = Histogram(registry, 'bookclub_http_request_size_bytes', 'Request body size.',
+                         ('method', 'route'), SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram(registry, 'bookclub_http_response_size_bytes',
+                          'Response body size (streamed responses are not counted).',
+                          ('method', 'route'), SIZE_BUCKETS)
+IN_FLIGHT = Gauge(registry, 'bookclub_http_requests_in_flight', 'Requests currently being handled.')
+EXCEPTIONS = Counter(registry, 'bookclub_http_exceptions_total', 'Unhandled exceptions by route.',
+                     ('route',))
+DB_QUERIES = Histogram(registry, 'bookclub_db_queries_per_request', 'SQL statements executed per request.',
+                       ('route',), QUERY_BUCKETS)
+DB_TIME = Histogram(registry, 'bookclub_db_time_seconds_per_request', 'Time spent in SQL per request.',
+                    ('route',))
+DB_POOL_WAIT = Histogram(registry, 'bookclub_db_pool_wait_seconds', 'Time waiting for a pooled connection.',
+                         ('route',))
+POOL = Gauge(registry, 'bookclub_db_pool_connections', 'Connection pool usage by state.', ('state',))
+HOT_PATH = Histogram(registry, 'bookclub_hot_path_seconds', 'Time spent in instrumented sections.',
+                     ('section',))
+
+@contextmanager
+def hot_path(section):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        HOT_PATH.observe(time.perf_counter() - start, section)
+
+def render_metrics():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+class SamplingProfiler:
+    """Samples one thread's stack on a timer; output is in collapsed-stack (flamegraph) format."""
+    
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = StackCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_filename.rsplit("/", 1)[-1]}:{code.co_name}:{frame.f_lineno}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+    
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+def init_metrics(app, db):
+    from database import request_stats, pool_status
+    
+    profiles = OrderedDict()
+    profiles_lock = threading.Lock()
+    
+    def pool_gauge():
+        with app.app_context():
+            status = pool_status(db.engine)
+        return [((key,), value) for key, value in status.items() if key != 'class']
+    
+    POOL.function = pool_gauge
+    
+    def route():
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+    
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        IN_FLIGHT.inc()
+        if app.config['PROFILING_ENABLED'] and request.headers.get('X-Profile'):
+            g.profiler = SamplingProfiler(threading.get_ident(), app.config['PROFILING_INTERVAL_MS'] / 1000)
+            g.profiler.start()
+    
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' not in g:
+            return response
+        labels = (request.method, route())
+        LATENCY.observe(time.perf_counter() - g.metrics_start, *labels)
+        REQUESTS.inc(request.method, route(), str(response.status_code))
+        REQUEST_SIZE.observe(request.content_length or 0, *labels)
+        if not response.is_streamed:
+            RESPONSE_SIZE.observe(response.calculate_content_length() or 0, *labels)
+        
+        stats = request_stats()
+        DB_QUERIES.observe(stats['queries'], route())
+        DB_TIME.observe(stats['query_seconds'], route())
+        DB_POOL_WAIT.observe(stats['pool_wait_seconds'], route())
+        
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            profile_id = uuid.uuid4().hex[:12]
+            with profiles_lock:
+                profiles[profile_id] = profiler.collapsed()
+                while len(profiles) > app.config['PROFILING_MAX_PROFILES']:
+                    profiles.popitem(last=False)
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+    
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        if g.pop('metrics_start', None) is None:
+            return
+        IN_FLIGHT.dec()
+        if exc is not None:
+            EXCEPTIONS.inc(route())
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+    
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+    
+    @app.route('/metrics/profiles/<profile_id>')
+    def profile(profile_id):
+        with profiles_lock:
+            collapsed = profiles.get(profile_id)
+        if collapsed is None:
+            abort(404)
+        return Response(collapsed, mimetype='text/plain')
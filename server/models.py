@@ -1,15 +1,53 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import declared_attr
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password, needs_rehash
 
 db = SQLAlchemy()
 
 # Many-to-many association table
 user_books = db.Table('user_books',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('book_id', db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    db.Column('book_id', db.Integer, db.ForeignKey('books.id'), primary_key=True),
+    # The primary key covers user -> books; this covers book -> users
+    db.Index('ix_user_books_book_id_user_id', 'book_id', 'user_id')
 )
 
+class ClubScoped:
+    """Rows that belong to one club; tenancy.py scopes queries on them to the current club."""
+    
+    @declared_attr
+    def club_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=False)
+
+class Club(db.Model):
+    __tablename__ = 'clubs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(50), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'slug': self.slug,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class ClubMembership(db.Model):
+    __tablename__ = 'club_memberships'
+    
+    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    role = db.Column(db.String(20), nullable=False, default='member')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        # The primary key covers a club's members; this covers a user's clubs
+        db.Index('ix_club_memberships_user_id_club_id', 'user_id', 'club_id'),
+    )
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -25,10 +63,13 @@ class User(db.Model):
     reading_list_items = db.relationship('ReadingListItem', backref='user', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.id, self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -38,7 +79,7 @@ class User(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
-class Book(db.Model):
+class Book(ClubScoped, db.Model):
     __tablename__ = 'books'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -48,6 +89,23 @@ class Book(db.Model):
     description = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(500), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Denormalized review aggregates, kept up to date by ratings.apply_rating_change
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    average_rating = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    # Number of users with this book in favorite_books, kept up to date by favorites.py
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Every list query is filtered to one club, so each index leads with club_id and a
+    # page reads only that club's rows however many other clubs there are
+    __table_args__ = (
+        db.Index('ix_books_club_id_id', 'club_id', 'id'),
+        db.Index('ix_books_club_id_genre_id', 'club_id', 'genre', 'id'),
+        db.Index('ix_books_club_id_author_id', 'club_id', 'author', 'id'),
+        db.Index('ix_books_club_id_average_rating_id', 'club_id', 'average_rating', 'id'),
+        db.Index('ix_books_club_id_favorite_count_id', 'club_id', 'favorite_count', 'id'),
+    )
     
     reviews = db.relationship('Review', backref='book', lazy=True, cascade='all, delete-orphan')
     reading_list_items = db.relationship('ReadingListItem', backref='book', lazy=True, cascade='all, delete-orphan')
@@ -60,10 +118,14 @@ class Book(db.Model):
             'genre': self.genre,
             'description': self.description,
             'image_url': self.image_url,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'average_rating': self.average_rating,
+            'rating_count': self.rating_count,
+            'favorite_count': self.favorite_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
-class Review(db.Model):
+class Review(ClubScoped, db.Model):
     __tablename__ = 'reviews'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -72,7 +134,12 @@ class Review(db.Model):
     rating = db.Column(db.Integer, nullable=False)
     __table_args__ = (
         db.CheckConstraint('rating >= 1 AND rating <= 5', name='rating_range'),
-        db.UniqueConstraint('book_id', 'user_id', name='unique_user_book_review')
+        db.UniqueConstraint('book_id', 'user_id', name='unique_user_book_review'),
+        # User first: deleting a user deletes their reviews in every club
+        db.Index('ix_reviews_user_id_club_id', 'user_id', 'club_id'),
+        # Reviews by book; without it SQLite answers "book_id = ? AND club_id = ?"
+        # from the club_id/user_id index and reads every review in the club
+        db.Index('ix_reviews_club_id_book_id', 'club_id', 'book_id')
     )
     comment = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -87,7 +154,7 @@ class Review(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
-class ReadingListItem(db.Model):
+class ReadingListItem(ClubScoped, db.Model):
     __tablename__ = 'reading_list_items'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -95,6 +162,11 @@ class ReadingListItem(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     status = db.Column(db.String(20), default='want_to_read')
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        # User first, like reviews: deleting a user deletes their lists in every club
+        db.Index('ix_reading_list_items_user_id_club_id_book_id', 'user_id', 'club_id', 'book_id'),
+        db.Index('ix_reading_list_items_book_id', 'book_id')
+    )
     
     def to_dict(self):
         return {
@@ -104,4 +176,99 @@ class ReadingListItem(db.Model):
             'book': self.book.to_dict(),
             'status': self.status,
             'added_at': self.added_at.isoformat() if self.added_at else None
-        }
\ No newline at end of file
+        }
+
+class BookSimilarity(db.Model):
+    __tablename__ = 'book_similarities'
+    
+    # Precomputed by recommendations.build_recommendations; rank 1 is the closest neighbor
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    similar_book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+class UserRecommendation(db.Model):
+    __tablename__ = 'user_recommendations'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+class Follow(db.Model):
+    __tablename__ = 'follows'
+    
+    follower_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    followed_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        # The primary key covers "who do I follow"; fan-out needs "who follows this user"
+        db.Index('ix_follows_followed_id_follower_id', 'followed_id', 'follower_id'),
+    )
+
+class ActivityEvent(db.Model):
+    __tablename__ = 'activity_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
+    rating = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_activity_events_user_id_id', 'user_id', 'id'),
+        # Deleting a book deletes its events
+        db.Index('ix_activity_events_book_id', 'book_id'),
+    )
+
+class TimelineEntry(db.Model):
+    __tablename__ = 'timeline_entries'
+    
+    # One row per reader per event, written by feed.record_events; the primary key is the
+    # index a feed page is read from
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('activity_events.id', ondelete='CASCADE'), primary_key=True)
+    __table_args__ = (
+        # Deleting events (with their book or their user) deletes them from every timeline
+        db.Index('ix_timeline_entries_event_id', 'event_id'),
+    )
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    # Enqueuing a key that is already in the table is a no-op (see jobs.enqueue)
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # A running job whose lease has expired belongs to a worker that died; it is claimed again
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+class RevokedToken(db.Model):
+    """A logged-out bearer token, kept until it would have expired anyway (see auth.py)."""
+    __tablename__ = 'revoked_tokens'
+    
+    jti = db.Column(db.String(64), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (
+        db.Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
+
+class CacheGeneration(db.Model):
+    """A response cache namespace's generation, when the cache itself is per process (see generations.py)."""
+    __tablename__ = 'cache_generations'
+    
+    name = db.Column(db.String(200), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,95 @@
+"""HTTP requests to URLs that users supply (book covers), kept off internal addresses.
+
+The server fetches a book's image_url itself, so without a check anyone who can add a
+book could make it call the cloud metadata endpoint or a service on localhost. Each
+connection, including every redirect hop, resolves the host, rejects every address that
+is not globally routable, and connects to the address it checked, so DNS can't
+swap in an internal one between the check and the connect. Networks listed in
+OUTBOUND_ALLOWED_NETWORKS are let through. Proxies from the environment are not used.
+"""
+import http.client
+import ipaddress
+import socket
+import urllib.parse
+import urllib.request
+from flask import current_app
+
+SCHEMES = ('http', 'https')
+
+class UnsafeURL(ValueError):
+    """The URL is not http(s), or its host resolves to an internal address."""
+
+def parse_networks(value):
+    return [ipaddress.ip_network(part.strip()) for part in (value or '').split(',') if part.strip()]
+
+def is_public(address, allowed_networks=()):
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    if any(ip in network for network in allowed_networks):
+        return True
+    # is_global also rules out shared (carrier-grade NAT), benchmarking and documentation
+    # ranges that is_private misses; it doesn't cover multicast
+    return ip.is_global and not ip.is_multicast
+
+def check_scheme(url):
+    if urllib.parse.urlsplit(url).scheme not in SCHEMES:
+        raise UnsafeURL(f'{url} is not an http(s) URL')
+
+def public_connection(connection_class, allowed_networks):
+    """A connection_class factory whose connections only reach public addresses."""
+    def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, **kwargs):
+        host, port = address
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        for *_, sockaddr in addresses:
+            if not is_public(sockaddr[0], allowed_networks):
+                raise UnsafeURL(f'{host} resolves to the internal address {sockaddr[0]}')
+        error = None
+        for *_, sockaddr in addresses:
+            try:
+                # A numeric address: connects where we checked, without resolving again
+                return socket.create_connection(sockaddr[:2], timeout, source_address)
+            except OSError as e:
+                error = e
+        raise error
+    
+    def connect(*args, **kwargs):
+        connection = connection_class(*args, **kwargs)
+        connection._create_connection = create_connection
+        return connection
+    return connect
+
+class PublicHTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, allowed_networks):
+        super().__init__()
+        self.connection = public_connection(http.client.HTTPConnection, allowed_networks)
+    
+    def http_open(self, req):
+        return self.do_open(self.connection, req)
+
+class PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, allowed_networks):
+        super().__init__()
+        self.connection = public_connection(http.client.HTTPSConnection, allowed_networks)
+    
+    def https_open(self, req):
+        return self.do_open(self.connection, req, context=self._context)
+
+class PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        try:
+            check_scheme(urllib.parse.urljoin(req.full_url, newurl))
+        except UnsafeURL:
+            fp.close()
+            raise
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+def open_url(request, timeout):
+    """urlopen() for a user-supplied URL; raises UnsafeURL instead of reaching an internal address."""
+    check_scheme(request.full_url)
+    networks = parse_networks(current_app.config['OUTBOUND_ALLOWED_NETWORKS'])
+    opener = urllib.request.OpenerDirector()
+    for handler in (PublicHTTPHandler(networks), PublicHTTPSHandler(networks), PublicRedirectHandler(),
+                    urllib.request.HTTPDefaultErrorHandler(), urllib.request.HTTPErrorProcessor()):
+        opener.add_handler(handler)
+    return opener.open(request, timeout=timeout)
@@ -0,0 +1,116 @@
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+from cache import MemoryCache
+
+# Werkzeug methods from weakest to strongest; a hash is never rehashed to an earlier one
+METHOD_STRENGTH = ('pbkdf2', 'scrypt')
+
+class HashingBusy(Exception):
+    """Raised when the hashing concurrency cap is reached and no slot frees up in time."""
+
+_lock = threading.Lock()
+_state = {'pid': None, 'executor': None, 'slots': None, 'verified': None}
+# Cache keys are HMACs under a per-process random key, so a memory dump never
+# contains anything that can be checked against a password offline.
+_cache_key = os.urandom(32)
+
+def _process_state():
+    # Each gunicorn worker gets its own pool; state inherited over fork is discarded
+    config = current_app.config
+    with _lock:
+        if _state['pid'] != os.getpid():
+            _state['pid'] = os.getpid()
+            _state['executor'] = None
+            _state['slots'] = threading.BoundedSemaphore(config['PASSWORD_HASH_CONCURRENCY'])
+            _state['verified'] = MemoryCache(
+                max_entries=config['PASSWORD_CACHE_MAX_ENTRIES'],
+                default_ttl=config['PASSWORD_CACHE_TTL']
+            )
+        if _state['executor'] is None and config['PASSWORD_HASH_WORKERS'] > 0:
+            # spawn, not fork: forking a threaded server process can deadlock the child
+            _state['executor'] = ProcessPoolExecutor(
+                max_workers=config['PASSWORD_HASH_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return _state
+
+def _discard_executor(executor):
+    with _lock:
+        # Another thread may already have replaced it
+        if _state['executor'] is executor:
+            _state['executor'] = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _run(fn, *args):
+    state = _process_state()
+    if not state['slots'].acquire(timeout=current_app.config['PASSWORD_HASH_QUEUE_TIMEOUT']):
+        raise HashingBusy()
+    try:
+        # A pool whose worker died (OOM killer, crash) fails every call; replace it once,
+        # and if the new one breaks too, hash inline rather than fail the login
+        for _ in range(2):
+            executor = _process_state()['executor']
+            if executor is None:
+                break
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                _discard_executor(executor)
+        return fn(*args)
+    finally:
+        state['slots'].release()
+
+def hash_password(password):
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+def _verified_key(user_id, password_hash, password):
+    # The stored hash is part of the key, so changing the password invalidates the entry
+    message = f'{user_id}\0{password_hash}\0{password}'.encode()
+    return hmac.new(_cache_key, message, hashlib.sha256).hexdigest()
+
+def verify_password(user_id, password_hash, password):
+    state = _process_state()
+    key = _verified_key(user_id, password_hash, password)
+    if state['verified'].get(key):
+        return True
+    if not _run(check_password_hash, password_hash, password):
+        return False
+    state['verified'].set(key, True)
+    return True
+
+def parse_method(method):
+    """(name, hash name, costs) of a Werkzeug method such as 'pbkdf2:sha256:600000', defaults filled in.
+    
+    Returns None for a method Werkzeug no longer supports (the plain digests of older releases).
+    """
+    name, *args = method.split(':')
+    try:
+        if name == 'scrypt' and len(args) in (0, 3):
+            # n, r and p; Werkzeug's defaults when the method gives none
+            return name, None, tuple(map(int, args)) if args else (2 ** 15, 8, 1)
+        if name == 'pbkdf2' and len(args) <= 2:
+            hash_name = args[0] if args else 'sha256'
+            return name, hash_name, (int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS,)
+    except ValueError:
+        pass
+    return None
+
+def needs_rehash(password_hash):
+    """Whether a stored hash is weaker than PASSWORD_HASH_METHOD; never true for a stronger one."""
+    wanted = parse_method(current_app.config['PASSWORD_HASH_METHOD'])
+    stored = parse_method(password_hash.split('$', 1)[0])
+    if wanted is None or stored == wanted:
+        return False
+    if stored is None:
+        return True
+    if stored[0] != wanted[0]:
+        return METHOD_STRENGTH.index(wanted[0]) > METHOD_STRENGTH.index(stored[0])
+    # Same method: only ever raise costs (a different digest is taken at equal or higher cost)
+    return all(w >= s for w, s in zip(wanted[2], stored[2]))
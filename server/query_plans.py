@@ -0,0 +1,256 @@
+"""EXPLAIN the SQL that every endpoint actually sends, and flag plans that read too much.
+
+check_query_plans() calls each endpoint through the test client, in a throwaway club
+with a few rows of its own, while recording the statements that reach the database,
+then EXPLAINs every SELECT, UPDATE and DELETE among them. All of it happens in one
+transaction that is rolled back at the end (commits inside become savepoints), and
+the response cache is bypassed, so it is safe to run against a live database.
+
+A plan fails when it scans a whole table, or when its only index constraint on a
+club-scoped table (books, reviews, reading lists) is club_id: that reads every row in
+the club to find a few, and looks fine on a small club. Endpoints that page through a club in index order, or stream all of it, are
+listed in CLUB_WALKS and may do the latter.
+"""
+import contextlib
+import contextvars
+import json
+import re
+import secrets
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.util import ScopedRegistry
+from cache import CacheGenerations, NullCache
+from models import db, Club, ClubScoped
+
+PASSWORD = 'query-plan-check'
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+# These read a club's books in index order and stop at a LIMIT (or stream them all)
+CLUB_WALKS = {
+    'GET /api/books',
+    'GET /api/books?sort=rating',
+    'GET /api/books/export',
+}
+# These list a whole table by design
+FULL_SCANS = {
+    'GET /api/users': {'users'},
+    'GET /api/clubs': {'clubs'},
+}
+SQLITE_CLUB_ONLY = re.compile(r'^SEARCH \S+ USING (?:COVERING )?INDEX \S+ \(club_id=\?\)$')
+POSTGRES_CLUB_ONLY = re.compile(r'^\(+(?:\w+\.)?club_id = [^()]+\)+$')
+
+def exercise_endpoints(call, club_id, tag):
+    """Call every endpoint once, in an order where each finds the rows it needs."""
+    from jobs import claim_job
+    from resources.books import encode_cursor
+    
+    club = {'X-Club-Id': str(club_id)}
+    
+    def sign_up(name):
+        email = f'{tag}-{name}@example.com'
+        user = call('POST /api/users', 'POST', '/api/users', 201, headers=club,
+                    json={'username': f'{tag}-{name}', 'email': email, 'password': PASSWORD}).json
+        token = call('POST /api/login', 'POST', '/api/login', 200,
+                     json={'email': email, 'password': PASSWORD}).json['token']
+        return user['id'], {**club, 'Authorization': f'Bearer {token}'}
+    
+    reader_id, reader = sign_up('reader')
+    friend_id, friend = sign_up('friend')
+    book_ids = [
+        call('POST /api/books', 'POST', '/api/books', 201, headers=reader, json={
+            'title': f'Plan {n}', 'author': f'{tag} Author', 'genre': f'{tag} Genre', 'description': 'Plans.'
+        }).json['id']
+        for n in range(3)
+    ]
+    book = book_ids[0]
+    
+    review = call('POST /api/books/<id>/reviews', 'POST', f'/api/books/{book}/reviews', 201, headers=reader,
+                  json={'rating': 4, 'comment': 'Good'}).json['id']
+    call('POST /api/books/<id>/reviews (duplicate)', 'POST', f'/api/books/{book}/reviews', 400, headers=reader,
+         json={'rating': 4, 'comment': 'Again'})
+    item = call('POST /api/reading-list', 'POST', '/api/reading-list', 201, headers=reader,
+                json={'book_id': book}).json['id']
+    call('POST /api/reading-list (duplicate)', 'POST', '/api/reading-list', 400, headers=reader,
+         json={'book_id': book})
+    call('POST /api/users/<id>/favorites', 'POST', f'/api/users/{reader_id}/favorites', 201, headers=reader,
+         json={'book_id': book})
+    call('POST /api/users/<id>/follow', 'POST', f'/api/users/{reader_id}/follow', 201, headers=friend)
+    call('POST /api/batch', 'POST', '/api/batch', 200, headers=reader, json={'operations': [
+        {'op': 'create', 'type': 'review', 'book_id': book_ids[1], 'rating': 3, 'comment': 'Fine'},
+        {'op': 'create', 'type': 'reading_list', 'book_id': book_ids[1]},
+    ]})
+    
+    reads = (
+        ('GET /api/books', '/api/books?limit=2'),
+        ('GET /api/books?cursor=', f'/api/books?limit=2&cursor={encode_cursor(book)}'),
+        ('GET /api/books?genre=', f'/api/books?limit=2&genre={tag}+Genre'),
+        ('GET /api/books?author=', f'/api/books?limit=2&author={tag}+Author'),
+        ('GET /api/books?sort=rating', '/api/books?limit=2&sort=rating'),
+        ('GET /api/books?sort=rating&cursor=', f'/api/books?limit=2&sort=rating&cursor={encode_cursor(4.0, book)}'),
+        ('GET /api/books/search', '/api/books/search?q=plan'),
+        ('GET /api/books/most-favorited', '/api/books/most-favorited'),
+        ('GET /api/books/export', '/api/books/export'),
+        ('GET /api/books/<id>', f'/api/books/{book}'),
+        ('GET /api/books/<id>/reviews', f'/api/books/{book}/reviews'),
+        ('GET /api/books/<id>/similar', f'/api/books/{book}/similar'),
+        ('GET /api/reviews/<id>', f'/api/reviews/{review}'),
+        ('GET /api/users', '/api/users'),
+        ('GET /api/users/<id>', f'/api/users/{reader_id}'),
+        ('GET /api/users/<id>/favorites', f'/api/users/{reader_id}/favorites'),
+        ('GET /api/users/<id>/favorites/<book_id>', f'/api/users/{reader_id}/favorites/{book}'),
+        ('GET /api/users/<id>/recommendations', f'/api/users/{reader_id}/recommendations'),
+        ('GET /api/clubs', '/api/clubs'),
+        ('GET /api/clubs/<id>', f'/api/clubs/{club_id}'),
+        ('GET /api/clubs/<id>/members', f'/api/clubs/{club_id}/members'),
+    )
+    for name, path in reads:
+        call(name, 'GET', path, 200, headers=club)
+    call('GET /api/reading-list', 'GET', '/api/reading-list', 200, headers=reader)
+    call('GET /api/reading-list/<id>', 'GET', f'/api/reading-list/{item}', 200, headers=reader)
+    call('GET /api/feed', 'GET', '/api/feed', 200, headers=friend)
+    call('GET /api/feed?cursor=', 'GET', f'/api/feed?cursor={encode_cursor(2 ** 31)}', 200, headers=friend)
+    
+    call('PUT /api/books/<id>', 'PUT', f'/api/books/{book}', 200, headers=reader, json={'title': 'Plan 0b'})
+    call('PUT /api/reviews/<id>', 'PUT', f'/api/reviews/{review}', 200, headers=reader, json={'rating': 5})
+    call('PATCH /api/reading-list/<id>', 'PATCH', f'/api/reading-list/{item}', 200, headers=reader,
+         json={'status': 'reading'})
+    call('DELETE /api/users/<id>/favorites/<book_id>', 'DELETE', f'/api/users/{reader_id}/favorites/{book}',
+         204, headers=reader)
+    call('DELETE /api/reading-list/<id>', 'DELETE', f'/api/reading-list/{item}', 204, headers=reader)
+    call('DELETE /api/reviews/<id>', 'DELETE', f'/api/reviews/{review}', 204, headers=reader)
+    call('DELETE /api/books/<id>', 'DELETE', f'/api/books/{book_ids[2]}', 204, headers=reader)
+    call('DELETE /api/users/<id>/follow', 'DELETE', f'/api/users/{reader_id}/follow', 204, headers=friend)
+    call('POST /api/logout', 'POST', '/api/logout', 200, headers=friend)
+    call('GET /api/feed (logged out)', 'GET', '/api/feed', 401, headers=friend)
+    call('DELETE /api/users/<id>', 'DELETE', f'/api/users/{reader_id}', 204, headers=reader)
+    call('job worker (claim)', claim_job)
+
+@contextlib.contextmanager
+def rolled_back_session(app):
+    """Run db.session on one connection whose transaction is rolled back on exit."""
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    if connection.dialect.name == 'sqlite':
+        # pysqlite opens its transaction lazily, before the first write; a SAVEPOINT
+        # issued first would open (and its RELEASE commit) a transaction of its own
+        connection.exec_driver_sql('BEGIN')
+    session = Session(bind=connection, join_transaction_mode='create_savepoint')
+    # Every app context gets this session; removing it at teardown only closes it, and a
+    # closed session starts a new savepoint when it is next used
+    registry = db.session.registry
+    db.session.registry = ScopedRegistry(lambda: session, lambda: None)
+    # Bypassed, along with its generations, which would otherwise be bumped outside the transaction
+    saved = {name: app.extensions[name] for name in ('cache', 'cache_generations')}
+    app.extensions['cache'] = NullCache()
+    app.extensions['cache_generations'] = CacheGenerations(app.extensions['cache'])
+    try:
+        yield connection
+    finally:
+        app.extensions.update(saved)
+        session.close()
+        db.session.registry = registry
+        transaction.rollback()
+        connection.close()
+
+def capture_endpoint_statements(app):
+    """Yield (connection, [(endpoint, sql, parameters)]) inside the rolled-back transaction."""
+    statements = []
+    current = [None]
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if current[0] is not None and not executemany:
+            statements.append((current[0], statement, parameters))
+    
+    def call(name, method_or_function, path=None, expected=None, **kwargs):
+        current[0] = name
+        try:
+            if callable(method_or_function):
+                with app.app_context():
+                    return method_or_function()
+            response = client.open(path, method=method_or_function, **kwargs)
+        finally:
+            current[0] = None
+        if response.status_code != expected:
+            raise RuntimeError(f'{name} returned {response.status_code}, expected {expected}: '
+                               f'{response.get_data(as_text=True)[:200]}')
+        return response
+    
+    client = app.test_client()
+    tag = f'plan-check-{secrets.token_hex(4)}'
+    with rolled_back_session(app) as connection:
+        club = Club(name='Query plan check', slug=tag)
+        db.session.add(club)
+        db.session.commit()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            # Outside any app context, so that every request pushes its own and starts with a
+            # fresh g, as it would in a server (g caches the caller's token, among others)
+            contextvars.Context().run(exercise_endpoints, call, club.id, tag)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        yield connection, statements
+
+def table_names():
+    return set(db.metadata.tables) | {'books_fts'}
+
+def sqlite_plan(connection, sql, parameters, tables):
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parameters).all()
+    plan = [row[-1] for row in rows]
+    problems = []
+    for line in plan:
+        words = line.split()
+        # "SCAN books" reads the whole table; "SCAN books USING INDEX ..." walks an index in order
+        if words[0] == 'SCAN' and words[1] in tables and 'USING' not in words and 'VIRTUAL' not in words:
+            problems.append(('scan', words[1], line))
+        elif SQLITE_CLUB_ONLY.match(line):
+            problems.append(('club', words[1], line))
+    return plan, problems
+
+def postgres_plan(connection, sql, parameters, tables):
+    # With sequential scans priced out, any Seq Scan left means no index can serve the query
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    document = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}', parameters).scalar()
+    if isinstance(document, str):
+        document = json.loads(document)
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = on')
+    
+    plan, problems = [], []
+    def walk(node, depth):
+        relation = node.get('Relation Name')
+        line = '  ' * depth + node['Node Type'] + (f' on {relation}' if relation else '')
+        if node.get('Index Cond'):
+            line += f" ({node['Index Cond']})"
+        plan.append(line)
+        if node['Node Type'] == 'Seq Scan' and relation in tables:
+            problems.append(('scan', relation, line.strip()))
+        elif relation and POSTGRES_CLUB_ONLY.match(node.get('Index Cond', '')):
+            problems.append(('club', relation, line.strip()))
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+    walk(document[0]['Plan'], 0)
+    return plan, problems
+
+def club_scoped_tables():
+    return {model.__tablename__ for model in ClubScoped.__subclasses__()}
+
+def allowed(name, kind, table):
+    if kind == 'scan':
+        return table in FULL_SCANS.get(name, ())
+    # Other tables keyed by club (memberships) hold one row per member, not per book
+    return name in CLUB_WALKS or table not in club_scoped_tables()
+
+def check_query_plans(app):
+    """Return [(endpoint, sql, plan_lines, problems)] for every statement the endpoints send."""
+    results = []
+    seen = set()
+    with contextlib.closing(capture_endpoint_statements(app)) as captured:
+        connection, statements = next(captured)
+        explain = postgres_plan if connection.dialect.name == 'postgresql' else sqlite_plan
+        tables = table_names()
+        for name, sql, parameters in statements:
+            if (name, sql) in seen or not sql.lstrip().upper().startswith(EXPLAINED):
+                continue
+            seen.add((name, sql))
+            plan, problems = explain(connection, sql, parameters, tables)
+            problems = [line for kind, table, line in problems if not allowed(name, kind, table)]
+            results.append((name, sql, plan, problems))
+    return results
@@ -0,0 +1,195 @@
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import g, request
+from auth import current_user_id
+from database import request_stats
+from metrics import registry, Counter, IN_FLIGHT
+
+SHED_RESPONSE = ({'error': 'Server is busy, please retry shortly'}, 503, {'Retry-After': '1'})
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+RATE_LIMITED = Counter(registry, 'bookclub_rate_limited_total', 'Requests rejected by a rate limit.',
+                       ('route',))
+SHED = Counter(registry, 'bookclub_load_shed_total', 'Requests rejected by load shedding.', ('reason',))
+
+def parse_rate(rate):
+    """'10/minute' -> (capacity, tokens refilled per second)."""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(second|minute|hour|day)\s*', rate)
+    if match is None:
+        raise ValueError(f'Invalid rate {rate!r}, expected e.g. 10/minute')
+    count = int(match.group(1))
+    return count, count / PERIODS[match.group(2)]
+
+def parse_limits(text):
+    """'POST /api/login=10/minute; GET /api/books=300/minute' -> {route: rate}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in text.split(';'))):
+        route, _, rate = item.rpartition('=')
+        limits[route.strip()] = parse_rate(rate)
+    return limits
+
+def refill(tokens, updated, capacity, rate, now):
+    if tokens is None:
+        return capacity
+    return min(capacity, tokens + (now - updated) * rate)
+
+class MemoryBucketStore:
+    """Token buckets for this worker only; each gunicorn worker enforces its own budget."""
+    
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def take(self, key, capacity, rate, cost=1):
+        """Returns (allowed, tokens left, seconds until cost tokens are available)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (None, None))
+            tokens = refill(tokens, updated, capacity, rate, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                # Least recently seen client; a dropped bucket just starts full again
+                self._buckets.popitem(last=False)
+        return allowed, tokens, 0 if allowed else (cost - tokens) / rate
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file, shared by every worker on the host."""
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+    
+    def _connection(self):
+        # sqlite3 connections must not cross threads or a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Counters, not data: losing the last few on a crash is fine
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute('CREATE TABLE IF NOT EXISTS rate_buckets '
+                               '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+    
+    def take(self, key, capacity, rate, cost=1):
+        # Wall clock rather than monotonic, because other processes read the timestamps
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = refill(*(row or (None, None)), capacity, rate, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            connection.execute('INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                               'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                               (key, tokens, now))
+            if random.random() < 0.001:
+                # Buckets idle for a day are full again anyway
+                connection.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - 86400,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, tokens, 0 if allowed else (cost - tokens) / rate
+
+def create_bucket_store(config):
+    backend = config['RATE_LIMIT_STORAGE']
+    if backend == 'memory':
+        return MemoryBucketStore()
+    if backend == 'sqlite':
+        return SQLiteBucketStore(config['RATE_LIMIT_SQLITE_PATH'])
+    raise ValueError(f'Unknown RATE_LIMIT_STORAGE {backend!r}')
+
+def bucket_key(user_id, remote_addr):
+    # Signed-in clients get their own bucket wherever they connect from
+    return f'user:{user_id}' if user_id is not None else f'ip:{remote_addr}'
+
+def client_key():
+    return bucket_key(current_user_id(), request.remote_addr)
+
+def rate_limit_headers(capacity, remaining):
+    return {'X-RateLimit-Limit': str(capacity), 'X-RateLimit-Remaining': str(int(remaining))}
+
+class RateLimiter:
+    """Load shedding and per-route token buckets, checked by Flask and by asgi.py alike."""
+    
+    def __init__(self, config):
+        self.config = config
+        self.store = create_bucket_store(config) if config['RATE_LIMIT_ENABLED'] else None
+        self.limits = parse_limits(config['RATE_LIMITS'])
+        self.default = self.limits.pop('default', None)
+        # Recent pool wait per request, as an exponentially weighted moving average
+        self.pool_wait = 0.0
+    
+    def shed(self):
+        """SHED_RESPONSE while this worker is overloaded, else None."""
+        max_in_flight = self.config['LOAD_SHED_MAX_IN_FLIGHT']
+        if max_in_flight and IN_FLIGHT.value() > max_in_flight:
+            SHED.inc('in_flight')
+            return SHED_RESPONSE
+        max_pool_wait = self.config['LOAD_SHED_MAX_POOL_WAIT_MS'] / 1000
+        if max_pool_wait and self.pool_wait > max_pool_wait:
+            # Shed requests wait for no connection, so they pull the average back down
+            SHED.inc('pool_wait')
+            return SHED_RESPONSE
+        return None
+    
+    def take(self, route, client):
+        """(429 response or None, (capacity, remaining) for the headers or None) for route.
+        
+        route is 'METHOD /flask/rule'; client is a bucket_key().
+        """
+        if self.store is None:
+            return None, None
+        capacity, rate = self.limits.get(route, self.default or (None, None))
+        if capacity is None:
+            return None, None
+        allowed, remaining, retry_after = self.store.take(f'{route}|{client}', capacity, rate)
+        if not allowed:
+            RATE_LIMITED.inc(route)
+            headers = rate_limit_headers(capacity, 0)
+            headers['Retry-After'] = str(max(1, round(retry_after)))
+            return ({'error': 'Too many requests'}, 429, headers), None
+        return None, (capacity, remaining)
+    
+    def record_pool_wait(self, seconds):
+        self.pool_wait += 0.1 * (seconds - self.pool_wait)
+
+def get_rate_limiter(app):
+    return app.extensions['rate_limiter']
+
+def init_rate_limiting(app):
+    app.extensions['rate_limiter'] = RateLimiter(app.config)
+    
+    @app.before_request
+    def limit_request():
+        if request.url_rule is None or not request.path.startswith('/api/'):
+            return None
+        limiter = get_rate_limiter(app)
+        shed = limiter.shed()
+        if shed is not None:
+            return shed
+        limited, g.rate_limit = limiter.take(f'{request.method} {request.url_rule.rule}', client_key())
+        return limited
+    
+    @app.after_request
+    def finish_rate_limiting(response):
+        if g.get('rate_limit'):
+            response.headers.update(rate_limit_headers(*g.rate_limit))
+        if request.path.startswith('/api/'):
+            get_rate_limiter(app).record_pool_wait(request_stats()['pool_wait_seconds'])
+        return response
@@ -0,0 +1,46 @@
+from sqlalchemy import delete, func, select, update
+from models import db, Book, Review
+
+def apply_rating_change(book_id, rating_delta, count_delta):
+    # A single UPDATE keeps the aggregates consistent under concurrent reviews;
+    # the right-hand sides all see the row as it was before the statement.
+    new_sum = Book.rating_sum + rating_delta
+    new_count = Book.rating_count + count_delta
+    db.session.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            average_rating=func.coalesce(new_sum * 1.0 / func.nullif(new_count, 0), 0)
+        )
+        .execution_options(synchronize_session='fetch')
+    )
+
+def release_user_reviews(user_id):
+    """Delete a user's reviews and take them out of their books' ratings; returns the book ids."""
+    reviews = db.session.execute(select(Review.book_id, Review.rating).where(Review.user_id == user_id)).all()
+    for book_id, rating in reviews:
+        apply_rating_change(book_id, -rating, -1)
+    db.session.execute(delete(Review).where(Review.user_id == user_id))
+    return [book_id for book_id, _ in reviews]
+
+def rebuild_ratings(book_ids=None):
+    rating_sum = select(func.coalesce(func.sum(Review.rating), 0)) \
+        .where(Review.book_id == Book.id).scalar_subquery()
+    rating_count = select(func.count(Review.id)) \
+        .where(Review.book_id == Book.id).scalar_subquery()
+    average_rating = select(func.coalesce(func.avg(Review.rating), 0)) \
+        .where(Review.book_id == Book.id).scalar_subquery()
+    
+    stmt = update(Book).values(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        average_rating=average_rating
+    )
+    if book_ids is not None:
+        stmt = stmt.where(Book.id.in_(book_ids))
+    
+    result = db.session.execute(stmt.execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount
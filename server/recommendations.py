@@ -0,0 +1,93 @@
+import heapq
+import math
+from collections import defaultdict
+from sqlalchemy import delete, insert, select
+from models import db, Review, ReadingListItem, BookSimilarity, UserRecommendation, user_books
+
+TOP_K = 20
+FAVORITE_WEIGHT = 1.0
+
+def rating_weight(rating):
+    # Only positive signals count as "liked": 3 -> 1/3, 4 -> 2/3, 5 -> 1
+    return (rating - 2) / 3 if rating >= 3 else 0.0
+
+def load_preferences():
+    """Return the sparse user x book preference matrix as {user_id: {book_id: weight}}."""
+    preferences = defaultdict(dict)
+    for user_id, book_id, rating in db.session.execute(
+            select(Review.user_id, Review.book_id, Review.rating)).yield_per(10000):
+        weight = rating_weight(rating)
+        if weight > 0:
+            preferences[user_id][book_id] = weight
+    for user_id, book_id in db.session.execute(
+            select(user_books.c.user_id, user_books.c.book_id)).yield_per(10000):
+        row = preferences[user_id]
+        row[book_id] = max(row.get(book_id, 0.0), FAVORITE_WEIGHT)
+    return preferences
+
+def item_similarities(preferences, top_k=TOP_K):
+    """Cosine similarity between books, keeping the top_k neighbors of each.
+    
+    This is the sparse product X^T X of the preference matrix, accumulated one user row at a
+    time, so the cost is proportional to the co-occurring pairs rather than books squared.
+    """
+    dots = defaultdict(lambda: defaultdict(float))
+    norms = defaultdict(float)
+    for row in preferences.values():
+        items = list(row.items())
+        for i, (book_a, weight_a) in enumerate(items):
+            norms[book_a] += weight_a * weight_a
+            for book_b, weight_b in items[i + 1:]:
+                product = weight_a * weight_b
+                dots[book_a][book_b] += product
+                dots[book_b][book_a] += product
+    
+    neighbors = {}
+    for book_a, row in dots.items():
+        norm_a = math.sqrt(norms[book_a])
+        scored = ((dot / (norm_a * math.sqrt(norms[book_b])), book_b) for book_b, dot in row.items())
+        neighbors[book_a] = heapq.nlargest(top_k, scored)
+    return neighbors
+
+def user_scores(preferences, neighbors, exclude, top_k=TOP_K):
+    recommendations = {}
+    for user_id, row in preferences.items():
+        scores = defaultdict(float)
+        for book_id, weight in row.items():
+            for similarity, other_id in neighbors.get(book_id, ()):
+                scores[other_id] += weight * similarity
+        seen = exclude.get(user_id, set()) | row.keys()
+        ranked = heapq.nlargest(top_k, ((s, b) for b, s in scores.items() if b not in seen))
+        if ranked:
+            recommendations[user_id] = ranked
+    return recommendations
+
+def build_recommendations(top_k=TOP_K):
+    """Offline job: recompute the neighbor and per-user tables the endpoints read from."""
+    preferences = load_preferences()
+    neighbors = item_similarities(preferences, top_k)
+    
+    on_reading_list = defaultdict(set)
+    for user_id, book_id in db.session.execute(select(ReadingListItem.user_id, ReadingListItem.book_id)):
+        on_reading_list[user_id].add(book_id)
+    per_user = user_scores(preferences, neighbors, on_reading_list, top_k)
+    
+    # Swap both tables in one transaction so readers never see a half-built set
+    db.session.execute(delete(BookSimilarity))
+    db.session.execute(delete(UserRecommendation))
+    similarity_rows = [
+        {'book_id': book_id, 'rank': rank, 'similar_book_id': other_id, 'score': score}
+        for book_id, ranked in neighbors.items()
+        for rank, (score, other_id) in enumerate(ranked, start=1)
+    ]
+    recommendation_rows = [
+        {'user_id': user_id, 'rank': rank, 'book_id': book_id, 'score': score}
+        for user_id, ranked in per_user.items()
+        for rank, (score, book_id) in enumerate(ranked, start=1)
+    ]
+    if similarity_rows:
+        db.session.execute(insert(BookSimilarity), similarity_rows)
+    if recommendation_rows:
+        db.session.execute(insert(UserRecommendation), recommendation_rows)
+    db.session.commit()
+    return len(similarity_rows), len(recommendation_rows)
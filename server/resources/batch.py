@@ -0,0 +1,30 @@
+from flask_restful import Resource, request
+from models import db
+from batch import apply_batch, MAX_OPERATIONS
+from http_cache import invalidate_book
+from auth import current_user_id
+from tenancy import member_required
+
+class BatchResource(Resource):
+    method_decorators = [member_required]
+    
+    def post(self):
+        data = request.get_json(silent=True)
+        operations = data.get('operations') if isinstance(data, dict) else None
+        
+        if not isinstance(operations, list) or not operations:
+            return {'error': 'operations must be a non-empty list'}, 400
+        if len(operations) > MAX_OPERATIONS:
+            return {'error': f'At most {MAX_OPERATIONS} operations per batch'}, 400
+        
+        try:
+            result, changed_books = apply_batch(current_user_id(), operations, atomic=bool(data.get('atomic')))
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to apply batch'}, 500
+        
+        for book_id in changed_books:
+            invalidate_book(book_id)
+        if data.get('atomic') and result.failed:
+            return result.to_dict(), 400
+        return result.to_dict(), 200
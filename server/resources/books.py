@@ -1,11 +1,155 @@
+import base64
+import binascii
+import io
+from urllib.parse import urlencode
+from flask import Response, stream_with_context
 from flask_restful import Resource, request
 from models import db, Book
+from search import search_books
+from streaming import wants_ndjson, ndjson_response
+from metrics import hot_path
+from feed import forget_book
+from tasks import schedule_image_check
+from tenancy import member_required
+from serialization import records
+from http_cache import (
+    cached_json, book_key, book_list_key, book_version, invalidate_book, invalidate_catalog
+)
+import bulk
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+BOOK_FIELDS = ('id', 'title', 'author', 'genre', 'description', 'image_url',
+               'average_rating', 'rating_count', 'favorite_count', 'created_at', 'updated_at')
+SORT_ORDERS = ('id', 'rating')
+
+def encode_cursor(*values):
+    raw = ','.join(repr(v) for v in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, *types):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split(',')
+        if len(parts) != len(types):
+            return None
+        return tuple(t(p) for t, p in zip(types, parts))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+def parse_fields(raw):
+    if not raw:
+        return BOOK_FIELDS
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in BOOK_FIELDS]
+    if unknown:
+        return None
+    # id is always selected so the next cursor can be built from the last row
+    return ('id',) + tuple(f for f in fields if f != 'id')
+
+def book_list_statement(args, streaming=False):
+    """Build the SELECT behind GET /api/books, shared with the async server in asgi.py.
+    
+    Returns (statement, fields, limit) without the LIMIT applied, or raises ValueError
+    with a message for a 400.
+    """
+    fields = parse_fields(args.get('fields'))
+    if fields is None:
+        raise ValueError(f'fields must be a subset of {", ".join(BOOK_FIELDS)}')
+    
+    sort = args.get('sort', 'id')
+    if sort not in SORT_ORDERS:
+        raise ValueError(f'sort must be one of {", ".join(SORT_ORDERS)}')
+    
+    try:
+        # A streamed response has flat memory use, so it is only limited on request
+        limit = int(args.get('limit', 0 if streaming else DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if not streaming:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    columns = [getattr(Book, f) for f in fields]
+    if sort == 'rating':
+        # The cursor for rating order needs the sort key of the last row
+        columns.append(Book.average_rating.label('sort_key'))
+    statement = db.select(*columns)
+    
+    if args.get('genre'):
+        statement = statement.where(Book.genre == args['genre'])
+    if args.get('author'):
+        statement = statement.where(Book.author == args['author'])
+    
+    if sort == 'rating':
+        if args.get('cursor'):
+            after = decode_cursor(args['cursor'], float, int)
+            if after is None:
+                raise ValueError('Invalid cursor')
+            after_rating, after_id = after
+            # The redundant <= bound is what lets the index start at the cursor; with only
+            # the OR, the page is found by walking down from the club's top-rated book
+            statement = statement.where(Book.average_rating <= after_rating, db.or_(
+                Book.average_rating < after_rating,
+                db.and_(Book.average_rating == after_rating, Book.id < after_id)
+            ))
+        statement = statement.order_by(Book.average_rating.desc(), Book.id.desc())
+    else:
+        if args.get('cursor'):
+            after = decode_cursor(args['cursor'], int)
+            if after is None:
+                raise ValueError('Invalid cursor')
+            statement = statement.where(Book.id > after[0])
+        statement = statement.order_by(Book.id)
+    
+    return statement, fields, limit
+
+def book_list_page(rows, fields, limit, args, path):
+    """Trim the limit + 1 fetched rows to a page and build the next-page headers."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    headers = {}
+    if has_more:
+        last = rows[-1]
+        if args.get('sort') == 'rating':
+            next_cursor = encode_cursor(last.sort_key, last.id)
+        else:
+            next_cursor = encode_cursor(last.id)
+        params = args.to_dict()
+        params['cursor'] = next_cursor
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{path}?{urlencode(params)}>; rel="next"'
+    
+    with hot_path('books.serialize'):
+        # Rows are plain tuples; a sort=rating row carries an extra sort_key that zip drops
+        body = records(rows, fields)
+    return body, 200, headers
 
 class BookListResource(Resource):
     def get(self):
-        books = Book.query.all()
-        return [book.to_dict() for book in books]
+        if wants_ndjson():
+            return self.list_books(streaming=True)
+        return cached_json(book_list_key(), lambda: self.list_books(streaming=False))
     
+    def list_books(self, streaming):
+        try:
+            statement, fields, limit = book_list_statement(request.args, streaming)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        
+        if streaming:
+            if limit > 0:
+                statement = statement.limit(limit)
+            return ndjson_response(statement, lambda row: dict(zip(fields, row)))
+        
+        # Fetch one extra row to find out whether another page exists
+        rows = db.session.execute(statement.limit(limit + 1)).all()
+        return book_list_page(rows, fields, limit, request.args, request.path)
+    
+    @member_required
     def post(self):
         data = request.get_json()
         
@@ -26,17 +170,98 @@ class BookListResource(Resource):
                 image_url=data.get('image_url')
             )
             db.session.add(book)
+            db.session.flush()
+            schedule_image_check(book)
             db.session.commit()
+            invalidate_book(book.id)
             return book.to_dict(), 201
         except Exception as e:
             db.session.rollback()
             return {'error': 'Failed to create book'}, 500
 
+class BookBulkResource(Resource):
+    @member_required
+    def post(self):
+        fmt = request.args.get('format') or bulk.format_from_content_type(request.content_type)
+        if fmt not in bulk.FORMATS:
+            return {'error': 'Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson'}, 415
+        
+        # Parse the body as it arrives instead of buffering the whole upload
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        try:
+            result = bulk.import_books(bulk.read_records(stream, fmt))
+        except UnicodeDecodeError:
+            db.session.rollback()
+            return {'error': 'Body must be UTF-8 encoded'}, 400
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to import books'}, 500
+        finally:
+            # Chunks are committed as they go, so earlier ones may be in even after an error
+            invalidate_catalog()
+        return result.to_dict(), 200
+
+class BookExportResource(Resource):
+    def get(self):
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in bulk.FORMATS:
+            return {'error': 'format must be csv or ndjson'}, 400
+        
+        mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        return Response(stream_with_context(bulk.export_books(fmt)), mimetype=mimetype)
+
+class BookSearchResource(Resource):
+    def get(self):
+        args = request.args
+        q = args.get('q', '').strip()
+        if not q:
+            return {'error': 'q is required'}, 400
+        
+        try:
+            limit = int(args.get('limit', DEFAULT_SEARCH_PAGE_SIZE))
+        except ValueError:
+            return {'error': 'limit must be an integer'}, 400
+        limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+        
+        offset = 0
+        if args.get('cursor'):
+            after = decode_cursor(args['cursor'], int)
+            # A negative OFFSET is an error on Postgres and means no offset on SQLite
+            if after is None or after[0] < 0:
+                return {'error': 'Invalid cursor'}, 400
+            offset = after[0]
+        
+        # Results are ordered by relevance, which has no stable keyset, so the cursor is an offset
+        books = search_books(q, limit + 1, offset)
+        has_more = len(books) > limit
+        books = books[:limit]
+        
+        headers = {}
+        if has_more:
+            next_cursor = encode_cursor(offset + limit)
+            params = args.to_dict()
+            params['cursor'] = next_cursor
+            headers['X-Next-Cursor'] = next_cursor
+            headers['Link'] = f'<{request.path}?{urlencode(params)}>; rel="next"'
+        
+        return [book.to_dict() for book in books], 200, headers
+
 class BookResource(Resource):
     def get(self, id):
-        book = Book.query.get_or_404(id)
-        return book.to_dict()
+        def build():
+            return Book.query.get_or_404(id).to_dict()
+        
+        def current_version():
+            row = db.session.query(Book.updated_at).filter(Book.id == id).first()
+            return book_version(id, row.updated_at) if row else None
+        
+        return cached_json(
+            book_key(id), build,
+            version=lambda payload: book_version(id, payload['updated_at']),
+            current_version=current_version
+        )
     
+    @member_required
     def put(self, id):
         book = Book.query.get_or_404(id)
         data = request.get_json()
@@ -49,14 +274,18 @@ class BookResource(Resource):
             book.author = data.get('author', book.author)
             book.genre = data.get('genre', book.genre)
             book.description = data.get('description', book.description)
-            book.image_url = data.get('image_url', book.image_url)
+            if data.get('image_url', book.image_url) != book.image_url:
+                book.image_url = data['image_url']
+                schedule_image_check(book)
             
             db.session.commit()
+            invalidate_book(id)
             return book.to_dict()
         except Exception as e:
             db.session.rollback()
             return {'error': 'Failed to update book'}, 500
     
+    @member_required
     def patch(self, id):
         book = Book.query.get_or_404(id)
         data = request.get_json()
@@ -73,20 +302,25 @@ class BookResource(Resource):
                 book.genre = data['genre']
             if 'description' in data:
                 book.description = data['description']
-            if 'image_url' in data:
+            if 'image_url' in data and data['image_url'] != book.image_url:
                 book.image_url = data['image_url']
+                schedule_image_check(book)
             
             db.session.commit()
+            invalidate_book(id)
             return book.to_dict()
         except Exception as e:
             db.session.rollback()
             return {'error': 'Failed to update book'}, 500
     
+    @member_required
     def delete(self, id):
         book = Book.query.get_or_404(id)
         try:
+            forget_book(id)
             db.session.delete(book)
             db.session.commit()
+            invalidate_book(id)
             return '', 204
         except Exception as e:
             db.session.rollback()
@@ -0,0 +1,76 @@
+import re
+from flask_restful import Resource, request
+from models import db, Club, ClubMembership, User
+from auth import login_required, current_user_id
+from tenancy import is_member
+
+SLUG = re.compile(r'[a-z0-9][a-z0-9-]{1,49}')
+
+class ClubListResource(Resource):
+    def get(self):
+        return [club.to_dict() for club in Club.query.order_by(Club.id).all()]
+    
+    @login_required
+    def post(self):
+        data = request.get_json(silent=True)
+        
+        if not data or not data.get('name') or not data.get('slug'):
+            return {'error': 'name and slug are required'}, 400
+        if not isinstance(data['slug'], str) or not SLUG.fullmatch(data['slug']):
+            return {'error': 'slug must be 2-50 lowercase letters, digits and dashes'}, 400
+        if Club.query.filter_by(slug=data['slug']).first():
+            return {'error': 'A club with this slug already exists'}, 400
+        
+        try:
+            club = Club(name=str(data['name'])[:100], slug=data['slug'])
+            db.session.add(club)
+            db.session.flush()
+            # The creator is the club's first member
+            db.session.add(ClubMembership(club_id=club.id, user_id=current_user_id(), role='owner'))
+            db.session.commit()
+            return club.to_dict(), 201
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to create club'}, 500
+
+class ClubResource(Resource):
+    def get(self, id):
+        club = Club.query.get_or_404(id)
+        return club.to_dict()
+
+class ClubMembersResource(Resource):
+    def get(self, id):
+        Club.query.get_or_404(id)
+        rows = db.session.query(User.id, User.username, ClubMembership.role) \
+            .join(ClubMembership, ClubMembership.user_id == User.id) \
+            .filter(ClubMembership.club_id == id).order_by(User.id).all()
+        return [{'user_id': user_id, 'username': username, 'role': role} for user_id, username, role in rows]
+    
+    @login_required
+    def post(self, id):
+        Club.query.get_or_404(id)
+        if is_member(current_user_id(), id):
+            return {'message': 'Already a member of this club'}, 200
+        
+        try:
+            membership = ClubMembership(club_id=id, user_id=current_user_id(), role='member')
+            db.session.add(membership)
+            db.session.commit()
+            return {'club_id': id, 'user_id': membership.user_id, 'role': membership.role}, 201
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to join club'}, 500
+
+class ClubMemberResource(Resource):
+    @login_required
+    def delete(self, id, user_id):
+        if user_id != current_user_id():
+            return {'error': 'You can only remove yourself from a club'}, 403
+        membership = ClubMembership.query.get_or_404((id, user_id))
+        try:
+            db.session.delete(membership)
+            db.session.commit()
+            return '', 204
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to leave club'}, 500
@@ -0,0 +1,29 @@
+import os
+from flask import current_app, send_file
+from flask_restful import Resource, request
+from models import Book
+from covers import cover_thumbnail, CoverUnavailable, SIZES, FORMATS
+
+class BookCoverResource(Resource):
+    def get(self, id):
+        size = request.args.get('size', 'medium')
+        if size not in SIZES:
+            return {'error': f"size must be one of {', '.join(SIZES)}"}, 400
+        book = Book.query.get_or_404(id)
+        if not book.image_url:
+            return {'error': 'Book has no cover'}, 404
+        
+        fmt = 'webp' if request.accept_mimetypes['image/webp'] else 'jpeg'
+        try:
+            file, etag = cover_thumbnail(book.image_url, size, fmt)
+        except CoverUnavailable as e:
+            return {'error': str(e)}, e.status
+        
+        # A real file lets the server use sendfile; conditional handles If-None-Match
+        response = send_file(file, mimetype=FORMATS[fmt], etag=etag, conditional=True,
+                             max_age=current_app.config['COVER_MAX_AGE'])
+        if response.status_code == 200:
+            response.content_length = os.fstat(file.fileno()).st_size
+        response.cache_control.public = True
+        response.vary.add('Accept')
+        return response
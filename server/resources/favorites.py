@@ -0,0 +1,105 @@
+from flask import current_app
+from flask_restful import Resource, request
+from models import db, Book, User, user_books
+from favorites import add_favorites, remove_favorites, most_favorited, MAX_BOOK_IDS
+from http_cache import cached_json, invalidate_book
+from cache import generation
+from auth import login_required, current_user_id
+from tenancy import current_club_id
+
+NOT_SELF = ({'error': 'You can only change your own favorites'}, 403)
+
+def parse_book_ids(data):
+    """Accept {"book_id": 1} or {"book_ids": [1, 2]}; returns None when invalid."""
+    if not isinstance(data, dict):
+        return None
+    book_ids = data.get('book_ids', [data['book_id']] if 'book_id' in data else None)
+    if not isinstance(book_ids, list) or not book_ids or len(book_ids) > MAX_BOOK_IDS:
+        return None
+    if not all(isinstance(b, int) and not isinstance(b, bool) for b in book_ids):
+        return None
+    return book_ids
+
+class UserFavoritesResource(Resource):
+    def get(self, id):
+        User.query.get_or_404(id)
+        # Ordering by the user's rows makes SQLite drive the join from user_books; ordering
+        # by Book.id walks every book in the club and probes user_books for each one
+        books = Book.query.join(user_books, user_books.c.book_id == Book.id) \
+            .filter(user_books.c.user_id == id).order_by(user_books.c.book_id).all()
+        return [book.to_dict() for book in books]
+    
+    @login_required
+    def post(self, id):
+        if id != current_user_id():
+            return NOT_SELF
+        book_ids = parse_book_ids(request.get_json(silent=True))
+        if book_ids is None:
+            return {'error': f'book_id or a list of up to {MAX_BOOK_IDS} book_ids is required'}, 400
+        
+        try:
+            added, already, missing = add_favorites(id, book_ids)
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to add favorites'}, 500
+        for book_id in added:
+            invalidate_book(book_id)
+        return {'added': added, 'already_favorited': already, 'not_found': missing}, 201 if added else 200
+    
+    @login_required
+    def delete(self, id):
+        if id != current_user_id():
+            return NOT_SELF
+        data = request.get_json(silent=True)
+        if data is None and request.args.get('book_ids'):
+            try:
+                data = {'book_ids': [int(b) for b in request.args['book_ids'].split(',')]}
+            except ValueError:
+                data = None
+        book_ids = parse_book_ids(data)
+        if book_ids is None:
+            return {'error': f'book_id or a list of up to {MAX_BOOK_IDS} book_ids is required'}, 400
+        
+        try:
+            removed = remove_favorites(id, book_ids)
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to remove favorites'}, 500
+        for book_id in removed:
+            invalidate_book(book_id)
+        return {'removed': removed}, 200
+
+class UserFavoriteResource(Resource):
+    def get(self, id, book_id):
+        favorited = db.session.query(user_books.c.book_id) \
+            .filter(user_books.c.user_id == id, user_books.c.book_id == book_id).first()
+        if favorited is None:
+            return {'error': 'Book is not in favorites'}, 404
+        return {'user_id': id, 'book_id': book_id}
+    
+    @login_required
+    def delete(self, id, book_id):
+        if id != current_user_id():
+            return NOT_SELF
+        try:
+            removed = remove_favorites(id, [book_id])
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to remove favorite'}, 500
+        if not removed:
+            return {'error': 'Book is not in favorites'}, 404
+        invalidate_book(book_id)
+        return '', 204
+
+class MostFavoritedResource(Resource):
+    def get(self):
+        try:
+            limit = max(1, min(int(request.args.get('limit', 10)), 100))
+        except ValueError:
+            return {'error': 'limit must be an integer'}, 400
+        
+        def build():
+            return [book.to_dict() for book in most_favorited(limit)]
+        # Refreshed on a timer rather than on every favorite, which would recompute it constantly
+        key = f"most-favorited:{generation('book-details')}:{current_club_id()}:{limit}"
+        return cached_json(key, build, ttl=current_app.config['LEADERBOARD_TTL'])
@@ -0,0 +1,59 @@
+from urllib.parse import urlencode
+from flask import current_app
+from flask_restful import Resource, request
+from models import db, User
+from feed import feed_page, follow, unfollow
+from resources.books import encode_cursor, decode_cursor
+from auth import login_required, current_user_id
+
+class FeedResource(Resource):
+    method_decorators = [login_required]
+    
+    def get(self):
+        try:
+            limit = max(1, min(int(request.args.get('limit', 20)), current_app.config['FEED_PAGE_MAX']))
+        except ValueError:
+            return {'error': 'limit must be an integer'}, 400
+        before = None
+        if request.args.get('cursor'):
+            before = decode_cursor(request.args['cursor'], int)
+            if before is None:
+                return {'error': 'Invalid cursor'}, 400
+            before = before[0]
+        
+        events = feed_page(current_user_id(), limit + 1, before)
+        headers = {}
+        if len(events) > limit:
+            events = events[:limit]
+            next_cursor = encode_cursor(events[-1]['id'])
+            params = request.args.to_dict()
+            params['cursor'] = next_cursor
+            headers['X-Next-Cursor'] = next_cursor
+            headers['Link'] = f'<{request.path}?{urlencode(params)}>; rel="next"'
+        return events, 200, headers
+
+class FollowResource(Resource):
+    method_decorators = [login_required]
+    
+    def post(self, id):
+        if id == current_user_id():
+            return {'error': 'You cannot follow yourself'}, 400
+        User.query.get_or_404(id)
+        try:
+            created = follow(current_user_id(), id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to follow user'}, 500
+        return {'follower_id': current_user_id(), 'followed_id': id}, 201 if created else 200
+    
+    def delete(self, id):
+        try:
+            removed = unfollow(current_user_id(), id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to unfollow user'}, 500
+        if not removed:
+            return {'error': 'You are not following this user'}, 404
+        return '', 204
@@ -0,0 +1,10 @@
+from flask_restful import Resource
+from models import db
+from database import totals, pool_status
+
+class DatabaseMetricsResource(Resource):
+    def get(self):
+        return {
+            'database': totals.to_dict(),
+            'pool': pool_status(db.engine)
+        }
@@ -1,11 +1,41 @@
 from flask_restful import Resource, request
-from models import db, ReadingListItem, Book
+from sqlalchemy.orm import joinedload
+from models import db, ReadingListItem, Book, ActivityEvent
+from streaming import wants_ndjson, ndjson_response
+from auth import login_required, current_user_id
+from tenancy import member_required
+from metrics import hot_path
+from feed import record_events, READING_LIST_ADD, READING_LIST_STATUS
+
+def reading_list_query():
+    # Scoped to the token's user; to_dict() embeds the book, so load it in the same
+    # SELECT instead of one lazy load per item
+    return ReadingListItem.query \
+        .filter(ReadingListItem.user_id == current_user_id()) \
+        .options(joinedload(ReadingListItem.book))
+
+def get_item_or_404(id):
+    return reading_list_query().filter(ReadingListItem.id == id).first_or_404()
+
+def set_status(item, status):
+    """Change an item's status and tell the user's followers; call before the commit."""
+    if status != item.status:
+        item.status = status
+        record_events([ActivityEvent(
+            user_id=item.user_id, kind=READING_LIST_STATUS, book_id=item.book_id, status=item.status
+        )])
 
 class ReadingListResource(Resource):
+    method_decorators = [login_required]
+    
     def get(self):
-        items = ReadingListItem.query.all()
-        return [item.to_dict() for item in items]
+        if wants_ndjson():
+            return ndjson_response(reading_list_query().order_by(ReadingListItem.id), ReadingListItem.to_dict)
+        items = reading_list_query().all()
+        with hot_path('reading_list.serialize'):
+            return [item.to_dict() for item in items]
     
+    @member_required
     def post(self):
         data = request.get_json()
         
@@ -15,16 +45,21 @@ class ReadingListResource(Resource):
         try:
             book = Book.query.get_or_404(data['book_id'])
             
-            existing_item = ReadingListItem.query.filter_by(book_id=data['book_id']).first()
+            existing_item = ReadingListItem.query.filter_by(
+                user_id=current_user_id(), book_id=data['book_id']
+            ).first()
             if existing_item:
                 return {'message': 'Book already in reading list'}, 400
             
             item = ReadingListItem(
                 book_id=data['book_id'],
-                user_id=1,  # Default user for now
+                user_id=current_user_id(),
                 status=data.get('status', 'want_to_read')
             )
             db.session.add(item)
+            record_events([ActivityEvent(
+                user_id=item.user_id, kind=READING_LIST_ADD, book_id=item.book_id, status=item.status
+            )])
             db.session.commit()
             return item.to_dict(), 201
         except Exception as e:
@@ -32,19 +67,21 @@ class ReadingListResource(Resource):
             return {'error': 'Failed to add book to reading list'}, 500
 
 class ReadingListItemResource(Resource):
+    method_decorators = [login_required]
+    
     def get(self, id):
-        item = ReadingListItem.query.get_or_404(id)
+        item = get_item_or_404(id)
         return item.to_dict()
     
     def put(self, id):
-        item = ReadingListItem.query.get_or_404(id)
+        item = get_item_or_404(id)
         data = request.get_json()
         
         if not data:
             return {'error': 'No data provided'}, 400
             
         try:
-            item.status = data.get('status', item.status)
+            set_status(item, data.get('status', item.status))
             db.session.commit()
             return item.to_dict()
         except Exception as e:
@@ -52,7 +89,7 @@ class ReadingListItemResource(Resource):
             return {'error': 'Failed to update reading list item'}, 500
     
     def patch(self, id):
-        item = ReadingListItem.query.get_or_404(id)
+        item = get_item_or_404(id)
         data = request.get_json()
         
         if not data:
@@ -60,7 +97,7 @@ class ReadingListItemResource(Resource):
             
         try:
             if 'status' in data:
-                item.status = data['status']
+                set_status(item, data['status'])
             
             db.session.commit()
             return item.to_dict()
@@ -69,7 +106,7 @@ class ReadingListItemResource(Resource):
             return {'error': 'Failed to update reading list item'}, 500
     
     def delete(self, id):
-        item = ReadingListItem.query.get_or_404(id)
+        item = ReadingListItem.query.filter_by(id=id, user_id=current_user_id()).first_or_404()
         try:
             db.session.delete(item)
             db.session.commit()
@@ -0,0 +1,38 @@
+from flask_restful import Resource, request
+from models import db, Book, User, BookSimilarity, UserRecommendation
+from recommendations import TOP_K
+
+def parse_limit():
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return None
+    return max(1, min(limit, TOP_K))
+
+class SimilarBooksResource(Resource):
+    def get(self, id):
+        Book.query.get_or_404(id)
+        limit = parse_limit()
+        if limit is None:
+            return {'error': 'limit must be an integer'}, 400
+        
+        rows = db.session.query(Book, BookSimilarity.score) \
+            .join(BookSimilarity, BookSimilarity.similar_book_id == Book.id) \
+            .filter(BookSimilarity.book_id == id) \
+            .order_by(BookSimilarity.rank) \
+            .limit(limit).all()
+        return [{**book.to_dict(), 'score': score} for book, score in rows]
+
+class UserRecommendationsResource(Resource):
+    def get(self, id):
+        User.query.get_or_404(id)
+        limit = parse_limit()
+        if limit is None:
+            return {'error': 'limit must be an integer'}, 400
+        
+        rows = db.session.query(Book, UserRecommendation.score) \
+            .join(UserRecommendation, UserRecommendation.book_id == Book.id) \
+            .filter(UserRecommendation.user_id == id) \
+            .order_by(UserRecommendation.rank) \
+            .limit(limit).all()
+        return [{**book.to_dict(), 'score': score} for book, score in rows]
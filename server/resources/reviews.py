@@ -1,11 +1,24 @@
 from flask_restful import Resource, request
-from models import db, Review, Book
+from models import db, Review, Book, ActivityEvent
+from ratings import apply_rating_change
+from http_cache import cached_json, reviews_key, invalidate_book
+from auth import login_required, current_user_id
+from tenancy import member_required
+from metrics import hot_path
+from feed import record_events, REVIEW
+from tasks import schedule_recommendations
+
+NOT_OWNER = ({'error': 'You can only change your own reviews'}, 403)
 
 class ReviewListResource(Resource):
     def get(self, book_id):
-        reviews = Review.query.filter_by(book_id=book_id).all()
-        return [review.to_dict() for review in reviews]
+        def build():
+            reviews = Review.query.filter_by(book_id=book_id).all()
+            with hot_path('reviews.serialize'):
+                return [review.to_dict() for review in reviews]
+        return cached_json(reviews_key(book_id), build)
     
+    @member_required
     def post(self, book_id):
         book = Book.query.get_or_404(book_id)
         data = request.get_json()
@@ -18,13 +31,21 @@ class ReviewListResource(Resource):
             if rating < 1 or rating > 5:
                 return {'error': 'Rating must be between 1 and 5'}, 400
                 
+            if Review.query.filter_by(book_id=book_id, user_id=current_user_id()).first():
+                return {'error': 'You have already reviewed this book'}, 400
+            
             review = Review(
                 book_id=book_id,
+                user_id=current_user_id(),
                 rating=rating,
                 comment=data['comment']
             )
             db.session.add(review)
+            apply_rating_change(book_id, rating, 1)
+            record_events([ActivityEvent(user_id=current_user_id(), kind=REVIEW, book_id=book_id, rating=rating)])
+            schedule_recommendations()
             db.session.commit()
+            invalidate_book(book_id)
             return review.to_dict(), 201
         except Exception as e:
             db.session.rollback()
@@ -35,8 +56,11 @@ class ReviewResource(Resource):
         review = Review.query.get_or_404(id)
         return review.to_dict()
     
+    @login_required
     def put(self, id):
         review = Review.query.get_or_404(id)
+        if review.user_id != current_user_id():
+            return NOT_OWNER
         data = request.get_json()
         
         if not data:
@@ -47,19 +71,26 @@ class ReviewResource(Resource):
                 rating = int(data['rating'])
                 if rating < 1 or rating > 5:
                     return {'error': 'Rating must be between 1 and 5'}, 400
+                if rating != review.rating:
+                    apply_rating_change(review.book_id, rating - review.rating, 0)
+                    schedule_recommendations()
                 review.rating = rating
                 
             if 'comment' in data:
                 review.comment = data['comment']
             
             db.session.commit()
+            invalidate_book(review.book_id)
             return review.to_dict()
         except Exception as e:
             db.session.rollback()
             return {'error': 'Failed to update review'}, 500
     
+    @login_required
     def patch(self, id):
         review = Review.query.get_or_404(id)
+        if review.user_id != current_user_id():
+            return NOT_OWNER
         data = request.get_json()
         
         if not data:
@@ -70,22 +101,33 @@ class ReviewResource(Resource):
                 rating = int(data['rating'])
                 if rating < 1 or rating > 5:
                     return {'error': 'Rating must be between 1 and 5'}, 400
+                if rating != review.rating:
+                    apply_rating_change(review.book_id, rating - review.rating, 0)
+                    schedule_recommendations()
                 review.rating = rating
                 
             if 'comment' in data:
                 review.comment = data['comment']
             
             db.session.commit()
+            invalidate_book(review.book_id)
             return review.to_dict()
         except Exception as e:
             db.session.rollback()
             return {'error': 'Failed to update review'}, 500
     
+    @login_required
     def delete(self, id):
         review = Review.query.get_or_404(id)
+        if review.user_id != current_user_id():
+            return NOT_OWNER
         try:
+            book_id = review.book_id
+            apply_rating_change(book_id, -review.rating, -1)
+            schedule_recommendations()
             db.session.delete(review)
             db.session.commit()
+            invalidate_book(book_id)
             return '', 204
         except Exception as e:
             db.session.rollback()
@@ -1,10 +1,33 @@
 from flask_restful import Resource, request
-from models import db, User
+from models import db, Book, User, ClubMembership, ReadingListItem
+from passwords import HashingBusy
+from favorites import release_user_favorites
+from ratings import release_user_reviews
+from feed import forget_user
+from streaming import wants_ndjson, ndjson_response
+from metrics import hot_path
+from serialization import records, json_response
+from auth import issue_token, revoke_token, login_required, current_claims, current_user_id
+from tenancy import current_club_id, club_scope
+from http_cache import invalidate_book
+from tasks import schedule_recommendations
+
+BUSY_RESPONSE = ({'error': 'Too many logins in progress, please retry shortly'}, 503, {'Retry-After': '1'})
+NOT_SELF = ({'error': 'You can only change your own account'}, 403)
+
+# Same keys as User.to_dict(), selected as plain columns for the list endpoint
+USER_FIELDS = ('id', 'username', 'email', 'created_at')
+
+def user_rows():
+    return db.session.query(*[getattr(User, f) for f in USER_FIELDS]).order_by(User.id)
 
 class UserListResource(Resource):
     def get(self):
-        users = User.query.all()
-        return [user.to_dict() for user in users]
+        if wants_ndjson():
+            return ndjson_response(user_rows(), lambda row: dict(zip(USER_FIELDS, row)))
+        rows = user_rows().all()
+        with hot_path('users.serialize'):
+            return json_response(records(rows, USER_FIELDS))
     
     def post(self):
         data = request.get_json()
@@ -23,8 +46,14 @@ class UserListResource(Resource):
             )
             user.set_password(data['password'])
             db.session.add(user)
+            db.session.flush()
+            # Signing up joins the club the request was made in
+            db.session.add(ClubMembership(club_id=current_club_id(), user_id=user.id))
             db.session.commit()
             return user.to_dict(), 201
+        except HashingBusy:
+            db.session.rollback()
+            return BUSY_RESPONSE
         except Exception as e:
             db.session.rollback()
             return {'error': 'Failed to create user'}, 500
@@ -34,7 +63,10 @@ class UserResource(Resource):
         user = User.query.get_or_404(id)
         return user.to_dict()
     
+    @login_required
     def put(self, id):
+        if id != current_user_id():
+            return NOT_SELF
         user = User.query.get_or_404(id)
         data = request.get_json()
         
@@ -51,7 +83,10 @@ class UserResource(Resource):
             db.session.rollback()
             return {'error': 'Failed to update user'}, 500
     
+    @login_required
     def patch(self, id):
+        if id != current_user_id():
+            return NOT_SELF
         user = User.query.get_or_404(id)
         data = request.get_json()
         
@@ -70,10 +105,28 @@ class UserResource(Resource):
             db.session.rollback()
             return {'error': 'Failed to update user'}, 500
     
+    @login_required
     def delete(self, id):
+        if id != current_user_id():
+            return NOT_SELF
         user = User.query.get_or_404(id)
-        db.session.delete(user)
-        db.session.commit()
+        try:
+            # A user's reviews, lists and favorites span every club, not just this request's
+            with club_scope(None):
+                book_ids = set(release_user_reviews(id)) | set(release_user_favorites(id))
+                ReadingListItem.query.filter_by(user_id=id).delete()
+                forget_user(id)
+                ClubMembership.query.filter_by(user_id=id).delete()
+                books = db.session.query(Book.id, Book.club_id).filter(Book.id.in_(book_ids)).all()
+                if books:
+                    schedule_recommendations()
+                db.session.delete(user)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to delete user'}, 500
+        for book_id, club_id in books:
+            invalidate_book(book_id, club_id)
         return '', 204
 
 class LoginResource(Resource):
@@ -84,7 +137,22 @@ class LoginResource(Resource):
             return {'error': 'Email and password are required'}, 400
             
         user = User.query.filter_by(email=data['email']).first()
-        if not user or not user.check_password(data['password']):
-            return {'error': 'Invalid email or password'}, 401
+        try:
+            if not user or not user.check_password(data['password']):
+                return {'error': 'Invalid email or password'}, 401
+            
+            # Upgrade hashes made with older parameters while we have the plain password
+            if user.password_needs_rehash():
+                user.set_password(data['password'])
+                db.session.commit()
+        except HashingBusy:
+            db.session.rollback()
+            return BUSY_RESPONSE
         
-        return {'user': user.to_dict(), 'message': 'Login successful'}, 200
\ No newline at end of file
+        return {'user': user.to_dict(), 'token': issue_token(user), 'message': 'Login successful'}, 200
+
+class LogoutResource(Resource):
+    @login_required
+    def post(self):
+        revoke_token(current_claims())
+        return {'message': 'Logged out'}, 200
\ No newline at end of file
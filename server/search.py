@@ -0,0 +1,113 @@
+import re
+from sqlalchemy import event, select, text
+from models import db, Book
+from tenancy import current_club_id
+
+# External-content FTS5 table: the index stores only tokens, the text stays in books.
+# Triggers keep it in sync with every insert/update/delete, including bulk writes.
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, description,
+        content='books', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author, description ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+        INSERT INTO books_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END""",
+    "INSERT INTO books_fts(books_fts) VALUES ('rebuild')",
+]
+
+# A generated column is maintained by Postgres itself, so it can never drift from the row.
+POSTGRES_DDL = [
+    """ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(author, '')), 'B') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH = text("""
+    SELECT books.* FROM books_fts
+    JOIN books ON books.id = books_fts.rowid
+    WHERE books_fts MATCH :query AND (:club_id IS NULL OR books.club_id = :club_id)
+    ORDER BY bm25(books_fts, 10.0, 5.0, 1.0), books.id
+    LIMIT :limit OFFSET :offset
+""")
+
+POSTGRES_SEARCH = text("""
+    SELECT books.* FROM books, plainto_tsquery('english', :query) AS query
+    WHERE books.search_vector @@ query AND (:club_id IS NULL OR books.club_id = :club_id)
+    ORDER BY ts_rank(books.search_vector, query) DESC, books.id
+    LIMIT :limit OFFSET :offset
+""")
+
+def install_search_index(connection):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_DDL
+    elif dialect == 'postgresql':
+        statements = POSTGRES_DDL
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+@event.listens_for(Book.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+def fts5_query(q):
+    # Quote every term so user input can't inject FTS5 syntax; the last term
+    # is a prefix match so partially typed words still find results.
+    terms = re.findall(r'\w+', q)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def like_search(q, limit, offset):
+    pattern = f'%{q}%'
+    return Book.query.filter(db.or_(
+        Book.title.ilike(pattern),
+        Book.author.ilike(pattern),
+        Book.description.ilike(pattern)
+    )).order_by(Book.id).limit(limit).offset(offset).all()
+
+def search_books(q, limit, offset=0):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        query = fts5_query(q)
+        if query is None:
+            return []
+        statement = SQLITE_SEARCH
+    elif dialect == 'postgresql':
+        query = q
+        statement = POSTGRES_SEARCH
+    else:
+        return like_search(q, limit, offset)
+    
+    # Raw SQL is not scoped by tenancy.py, so it filters to the current club itself
+    statement = statement.bindparams(query=query, limit=limit, offset=offset, club_id=current_club_id())
+    return db.session.execute(select(Book).from_statement(statement)).scalars().all()
+
+def uninstall_search_index(connection):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('books_fts_insert', 'books_fts_delete', 'books_fts_update'):
+            connection.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+        connection.execute(text('DROP TABLE IF EXISTS books_fts'))
+    elif dialect == 'postgresql':
+        connection.execute(text('DROP INDEX IF EXISTS ix_books_search_vector'))
+        connection.execute(text('ALTER TABLE books DROP COLUMN IF EXISTS search_vector'))
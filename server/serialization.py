@@ -0,0 +1,64 @@
+import gzip
+import json
+from datetime import date
+from flask import Response, current_app, request
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements-fast.txt
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements-fast.txt
+    brotli = None
+
+JSON_MIMETYPE = 'application/json'
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def dumps(payload):
+    """Encode to JSON bytes. Datetimes come out as isoformat(), the same as to_dict()."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+def records(rows, fields):
+    """Plain row tuples to dicts; the encoder handles datetimes, so nothing else is touched."""
+    return [dict(zip(fields, row)) for row in rows]
+
+def compress(body):
+    """Return {encoding: bytes} for the encodings worth sending for this body."""
+    config = current_app.config
+    if len(body) < config['COMPRESS_MIN_BYTES']:
+        return {}
+    encoded = {'gzip': gzip.compress(body, compresslevel=config['COMPRESS_GZIP_LEVEL'])}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(body, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return encoded
+
+def negotiate(variants, accept_encodings=None):
+    """Pick the best of the precompressed variants the client accepts, or None for identity."""
+    if not variants:
+        return None
+    if accept_encodings is None:
+        accept_encodings = request.accept_encodings
+    return accept_encodings.best_match([e for e in ('br', 'gzip') if e in variants])
+
+def encoded_response(body, variants=None, status=200, headers=None):
+    if variants is None:
+        variants = compress(body)
+    encoding = negotiate(variants)
+    response = Response(variants[encoding] if encoding else body, status=status,
+                        mimetype=JSON_MIMETYPE, headers=headers)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if variants:
+        response.vary.add('Accept-Encoding')
+    return response
+
+def json_response(payload, status=200, headers=None):
+    return encoded_response(dumps(payload), status=status, headers=headers)
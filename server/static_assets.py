@@ -0,0 +1,163 @@
+import gzip
+import mimetypes
+import os
+import re
+import threading
+from flask import Response, abort, request, send_file
+from werkzeug.security import safe_join
+from http_cache import make_etag
+from serialization import negotiate
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements-fast.txt
+    brotli = None
+
+# Build tools put a content hash in asset names (main.3f2a1c9e.js), so a name never changes content
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{8,}(\.chunk)?\.\w+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = {'.html', '.js', '.mjs', '.css', '.map', '.json', '.svg', '.txt', '.xml', '.ico', '.webmanifest'}
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+def precompressed_variants(path):
+    """{encoding: path} for the .br/.gz files written next to path by precompress_folder."""
+    return {encoding: path + suffix for encoding, suffix in SUFFIXES.items() if os.path.isfile(path + suffix)}
+
+def precompress_folder(folder, min_bytes):
+    """Write .gz (and, with brotli installed, .br) next to every compressible file in folder.
+    
+    Runs once at build time, so both use their slowest, smallest settings. Variants that
+    are up to date or would not be smaller are skipped. Returns the number written.
+    """
+    encoders = {'gzip': lambda body: gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders['br'] = lambda body: brotli.compress(body, quality=11)
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE or os.path.getsize(path) < min_bytes:
+                continue
+            body = None
+            for encoding, encode in encoders.items():
+                target = path + SUFFIXES[encoding]
+                if os.path.isfile(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                if body is None:
+                    with open(path, 'rb') as f:
+                        body = f.read()
+                encoded = encode(body)
+                if len(encoded) >= len(body):
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(encoded)
+                written += 1
+    return written
+
+class ShellCache:
+    """index.html and its compressed variants held in memory, reloaded when the file changes."""
+    
+    def __init__(self, path):
+        self.path = path
+        self._entry = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entry
+        if entry is None or entry['key'] != key:
+            with self._lock:
+                if self._entry is None or self._entry['key'] != key:
+                    self._entry = self.load(key)
+                entry = self._entry
+        return entry
+    
+    def load(self, key):
+        with open(self.path, 'rb') as f:
+            body = f.read()
+        variants = {}
+        for encoding, path in precompressed_variants(self.path).items():
+            with open(path, 'rb') as f:
+                variants[encoding] = f.read()
+        # Not precompressed (e.g. in development): compress once here instead
+        if 'gzip' not in variants:
+            variants['gzip'] = gzip.compress(body, compresslevel=9)
+        if 'br' not in variants and brotli is not None:
+            variants['br'] = brotli.compress(body, quality=11)
+        return {'key': key, 'body': body, 'variants': variants, 'etag': make_etag(body)}
+
+def init_static(app):
+    """Serve the React build: hashed assets with long-lived caching, index.html for client routes.
+    
+    Replaces Flask's static route. Requests under /api/ never reach the filesystem.
+    """
+    folder = app.config['STATIC_FOLDER'] or os.path.join(app.root_path, 'static')
+    shell = ShellCache(os.path.join(folder, 'index.html'))
+    # Fingerprinted files never change, so where they live (and how they are encoded) is
+    # looked up once per name
+    assets = {}
+    
+    def serve_shell():
+        entry = shell.get()
+        if entry is None:
+            return {'error': 'The client has not been built'}, 404
+        if request.if_none_match.contains(entry['etag']):
+            response = Response(status=304)
+        else:
+            encoding = negotiate(entry['variants'])
+            response = Response(entry['variants'][encoding] if encoding else entry['body'], mimetype='text/html')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    def find_asset(filename):
+        asset = assets.get(filename)
+        if asset is not None:
+            return asset
+        path = safe_join(folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        asset = (path, precompressed_variants(path), FINGERPRINTED.search(filename) is not None)
+        if asset[2]:
+            assets[filename] = asset
+        return asset
+    
+    @app.route('/')
+    def serve():
+        return serve_shell()
+    
+    @app.route('/<path:filename>', endpoint='static')
+    def serve_static(filename):
+        if filename.startswith('api/'):
+            abort(404)
+        asset = find_asset(filename)
+        if asset is None:
+            # Client-side routes have no file extension; a missing script or image is a real 404
+            if '.' in filename.rsplit('/', 1)[-1]:
+                abort(404)
+            return serve_shell()
+        
+        path, variants, immutable = asset
+        encoding = negotiate(variants)
+        response = send_file(variants[encoding] if encoding else path,
+                             mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                             conditional=True, etag=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if variants:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE if immutable else 'no-cache'
+        return response
+    
+    @app.errorhandler(404)
+    def not_found(e):
+        if request.path.startswith('/api/'):
+            return {'error': 'Not found'}, 404
+        return e
@@ -0,0 +1,30 @@
+from flask import Response, request, stream_with_context
+from sqlalchemy.sql import Select
+from models import db
+from serialization import dumps
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+YIELD_PER = 1000
+LINES_PER_CHUNK = 200
+
+def wants_ndjson():
+    # Only an explicit Accept opts in; */* and application/json keep the JSON array response
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(query, serialize, headers=None):
+    """Stream a query (or a select()) as newline-delimited JSON, YIELD_PER rows at a time."""
+    def generate():
+        if isinstance(query, Select):
+            rows = db.session.execute(query.execution_options(yield_per=YIELD_PER))
+        else:
+            rows = query.yield_per(YIELD_PER)
+        lines = []
+        for row in rows:
+            lines.append(dumps(serialize(row)))
+            if len(lines) >= LINES_PER_CHUNK:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+    
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE, headers=headers)
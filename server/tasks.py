@@ -0,0 +1,66 @@
+"""Slow work that request handlers hand to the job queue instead of doing inline."""
+import hashlib
+import time
+import urllib.error
+import urllib.request
+from flask import current_app
+from sqlalchemy import select, update
+from models import db, Book
+from jobs import task, enqueue
+from recommendations import build_recommendations
+from http_cache import invalidate_book
+from outbound import UnsafeURL, open_url
+
+IMAGE_CHECK_TIMEOUT = 10
+# Origins answer these for images that are gone for good; anything else is retried
+BROKEN_IMAGE_STATUSES = (404, 410)
+
+@task('refresh_recommendations', max_attempts=3)
+def refresh_recommendations():
+    build_recommendations()
+
+@task('check_book_image', max_attempts=4)
+def check_book_image(book_id, url):
+    """Clear a book's image_url when it definitely no longer points at an image."""
+    if not url.startswith(('http://', 'https://')):
+        broken = True
+    else:
+        request = urllib.request.Request(url, method='HEAD', headers={'User-Agent': 'bookclub-image-check'})
+        try:
+            with open_url(request, timeout=IMAGE_CHECK_TIMEOUT) as response:
+                broken = not response.headers.get('Content-Type', 'image/').startswith('image/')
+        except UnsafeURL:
+            # Never fetched, and never shown either: the cover endpoint refuses it too
+            broken = True
+        except urllib.error.HTTPError as e:
+            if e.code not in BROKEN_IMAGE_STATUSES:
+                raise
+            broken = True
+    if not broken:
+        return
+    # Only if nobody has changed the URL since the check was queued
+    club_id = db.session.scalar(select(Book.club_id).where(Book.id == book_id))
+    cleared = db.session.execute(
+        update(Book).where(Book.id == book_id, Book.image_url == url).values(image_url=None)
+    ).rowcount
+    db.session.commit()
+    if cleared:
+        invalidate_book(book_id, club_id)
+
+def schedule_image_check(book):
+    """Queue a check of book.image_url; call after the book has an id, before the commit."""
+    if book.image_url:
+        digest = hashlib.sha1(book.image_url.encode()).hexdigest()[:16]
+        enqueue('check_book_image', {'book_id': book.id, 'url': book.image_url},
+                idempotency_key=f'check_book_image:{book.id}:{digest}')
+
+def schedule_recommendations():
+    """Queue one recommendation rebuild at the end of the current refresh window.
+    
+    Every write in the same window shares the idempotency key, so a busy hour costs
+    one rebuild rather than one per review.
+    """
+    window = current_app.config['RECOMMENDATIONS_REFRESH_SECONDS']
+    now = time.time()
+    enqueue('refresh_recommendations', idempotency_key=f'refresh_recommendations:{int(now // window)}',
+            delay=window - now % window)
@@ -0,0 +1,110 @@
+"""Clubs: every book, review and reading-list item belongs to exactly one.
+
+An API request works inside one club, named by the X-Club-Id header (or ?club_id=)
+and DEFAULT_CLUB_ID otherwise. While a club is set, every ORM statement on a
+ClubScoped model is filtered to it and new rows are stamped with it, so resources
+never mention club_id. Outside a request (CLI commands, the job worker) no club is
+set and statements see every club; wrap work in club_scope() to act inside one.
+Statements that must see every club during a request pass
+execution_options(all_clubs=True).
+"""
+import contextlib
+from contextvars import ContextVar
+from functools import wraps
+from flask import g, request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, with_loader_criteria
+from auth import login_required, current_user_id
+from cache import get_cache
+from models import db, Club, ClubMembership, ClubScoped
+
+CLUB_HEADER = 'X-Club-Id'
+# Clubs are never deleted, so a club that exists can be remembered for a long time
+KNOWN_CLUB_TTL = 3600
+
+_current_club = ContextVar('current_club', default=None)
+
+def current_club_id():
+    return _current_club.get()
+
+@contextlib.contextmanager
+def club_scope(club_id):
+    token = _current_club.set(club_id)
+    try:
+        yield
+    finally:
+        _current_club.reset(token)
+
+def parse_club_id(raw, default):
+    """The club id a request asked for, default if it named none, or None if it is not an id."""
+    if raw is None or raw == '':
+        return default
+    try:
+        club_id = int(raw)
+    except ValueError:
+        return None
+    return club_id if club_id > 0 else None
+
+def known_club_key(club_id):
+    return f'club:{club_id}'
+
+def club_exists(club_id):
+    cache = get_cache()
+    if cache.get(known_club_key(club_id)):
+        return True
+    if db.session.scalar(select(Club.id).where(Club.id == club_id)) is None:
+        return False
+    cache.set(known_club_key(club_id), True, ttl=KNOWN_CLUB_TTL)
+    return True
+
+def is_member(user_id, club_id):
+    return db.session.get(ClubMembership, (club_id, user_id)) is not None
+
+def member_required(method):
+    """login_required, and the user must also belong to the current club."""
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        if not is_member(current_user_id(), current_club_id()):
+            return {'error': 'Join this club first'}, 403
+        return method(*args, **kwargs)
+    return login_required(wrapper)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _filter_to_club(state):
+    club_id = _current_club.get()
+    if club_id is None or state.execution_options.get('all_clubs'):
+        return
+    # Lazy and column loads inherit the criteria from the statement that loaded the object
+    if state.is_column_load or state.is_relationship_load:
+        return
+    if state.is_select or state.is_update or state.is_delete:
+        state.statement = state.statement.options(with_loader_criteria(
+            ClubScoped, lambda cls: cls.club_id == club_id, include_aliases=True
+        ))
+
+@event.listens_for(Session, 'before_flush')
+def _stamp_club(session, flush_context, instances):
+    club_id = _current_club.get()
+    for obj in session.new:
+        if isinstance(obj, ClubScoped) and obj.club_id is None:
+            if club_id is None:
+                raise RuntimeError(f'New {type(obj).__name__} has no club_id and no club is set')
+            obj.club_id = club_id
+
+def init_tenancy(app):
+    @app.before_request
+    def enter_club():
+        if not request.path.startswith('/api/'):
+            return None
+        raw = request.headers.get(CLUB_HEADER) or request.args.get('club_id')
+        club_id = parse_club_id(raw, app.config['DEFAULT_CLUB_ID'])
+        if club_id is None or not club_exists(club_id):
+            return {'error': 'Club not found'}, 404
+        g.club_token = _current_club.set(club_id)
+        return None
+    
+    @app.teardown_request
+    def leave_club(exc):
+        token = g.pop('club_token', None)
+        if token is not None:
+            _current_club.reset(token)
@@ -0,0 +1,48 @@
+"""Tests run the app against a migrated SQLite database in a temporary directory."""
+import os
+import secrets
+import sys
+import tempfile
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+# Config reads the environment when it is imported, so this has to come first
+DATA_DIR = tempfile.mkdtemp(prefix='bookclub-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(DATA_DIR, 'test.db')}",
+    'RATE_LIMIT_ENABLED': 'false',
+    'PASSWORD_HASH_WORKERS': '0',
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'COVER_CACHE_DIR': os.path.join(DATA_DIR, 'covers'),
+})
+
+@pytest.fixture(scope='session')
+def app():
+    from flask_migrate import upgrade
+    from app import create_app
+    
+    app = create_app(migrations=True)
+    app.config['TESTING'] = True
+    with app.app_context():
+        # The clubs migration creates the default club
+        upgrade()
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def sign_up(client):
+    """Returns a function that creates a user and returns (user id, headers with its token)."""
+    def sign_up(club_id=None):
+        name = f'user-{secrets.token_hex(4)}'
+        headers = {'X-Club-Id': str(club_id)} if club_id else {}
+        user = client.post('/api/users', headers=headers,
+                           json={'username': name, 'email': f'{name}@example.com', 'password': 'password123'}).json
+        token = client.post('/api/login', json={'email': f'{name}@example.com', 'password': 'password123'}).json['token']
+        return user['id'], {**headers, 'Authorization': f'Bearer {token}'}
+    return sign_up
@@ -0,0 +1,171 @@
+import asyncio
+import gzip
+import json
+from collections import namedtuple
+
+import pytest
+from sqlalchemy import event
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('asgiref')
+
+from asgi import AsyncReads
+from metrics import IN_FLIGHT
+from models import db
+from ratelimit import RateLimiter
+
+# flask: whether the Flask app answered (it adds X-DB-* timing headers, the native handlers don't)
+Response = namedtuple('Response', 'status headers flask body')
+
+@pytest.fixture(scope='module')
+def asgi(app):
+    loop = asyncio.new_event_loop()
+    reads = AsyncReads(app)
+    
+    def call(path, method='GET', headers=None, query=''):
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': query.encode(),
+            'headers': [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            'client': ('203.0.113.7', 50000), 'server': ('testserver', 80),
+        }
+        messages = []
+        
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        
+        async def send(message):
+            messages.append(message)
+        
+        loop.run_until_complete(reads(scope, receive, send))
+        start = messages[0]
+        response_headers = {k.decode(): v.decode() for k, v in start['headers']}
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return Response(start['status'], response_headers, 'x-db-queries' in response_headers, body)
+    
+    yield call
+    loop.run_until_complete(reads.engine.dispose())
+    loop.close()
+
+@pytest.fixture
+def book_id(client, sign_up):
+    _, headers = sign_up()
+    return client.post('/api/books', headers=headers, json={
+        'title': 'Async', 'author': 'Author', 'genre': 'Fiction', 'description': 'Served natively.'
+    }).json['id']
+
+@pytest.fixture
+def limiter(app, monkeypatch):
+    def install(**config):
+        limiter = RateLimiter({**app.config, **config})
+        monkeypatch.setitem(app.extensions, 'rate_limiter', limiter)
+        return limiter
+    return install
+
+def test_reads_are_served_natively(asgi, book_id):
+    for path in ('/api/books', f'/api/books/{book_id}', f'/api/books/{book_id}/reviews'):
+        response = asgi(path)
+        assert (response.status, response.flask) == (200, False)
+
+@pytest.mark.parametrize('case', ['unknown club', 'missing book', 'ndjson', 'other route', 'write', 'bad cursor'])
+def test_other_requests_are_delegated_to_flask(asgi, book_id, case):
+    path, method, headers, query = {
+        'unknown club': ('/api/books', 'GET', {'X-Club-Id': '999999'}, ''),
+        'missing book': ('/api/books/999999', 'GET', {}, ''),
+        'ndjson': ('/api/books', 'GET', {'Accept': 'application/x-ndjson'}, ''),
+        'other route': ('/api/books/search', 'GET', {}, 'q=async'),
+        'write': (f'/api/books/{book_id}', 'DELETE', {}, ''),
+        'bad cursor': ('/api/books', 'GET', {}, 'cursor=not-a-cursor'),
+    }[case]
+    assert asgi(path, method, headers, query).flask
+
+def test_rate_limits_apply_to_native_reads(asgi, limiter):
+    limiter(RATE_LIMIT_ENABLED=True, RATE_LIMIT_STORAGE='memory', RATE_LIMITS='GET /api/books=2/minute')
+    first, second, third = (asgi('/api/books') for _ in range(3))
+    assert first[0] == second[0] == 200
+    assert second.headers['x-ratelimit-remaining'] == '0'
+    assert third.status == 429
+    assert 'retry-after' in third.headers
+    assert not third.flask
+
+def test_native_reads_are_shed_under_load(asgi, limiter):
+    limiter(LOAD_SHED_MAX_IN_FLIGHT=1)
+    assert asgi('/api/books')[0] == 200
+    IN_FLIGHT.inc()
+    try:
+        response = asgi('/api/books')
+    finally:
+        IN_FLIGHT.dec()
+    assert (response.status, response.headers['retry-after'], response.flask) == (503, '1', False)
+
+def test_native_reads_leave_the_sync_engine_alone(app, asgi, book_id):
+    # Cache keys need the generations from the database; they are read over the async engine
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for path in ('/api/books', f'/api/books/{book_id}', f'/api/books/{book_id}/reviews'):
+            response = asgi(path)
+            assert (response.status, response.flask) == (200, False)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert statements == []
+
+def test_native_responses_match_flask(client, asgi, book_id):
+    for path, query in (('/api/books', 'limit=500'), (f'/api/books/{book_id}', ''), (f'/api/books/{book_id}/reviews', '')):
+        native = asgi(path, query=query)
+        flask = client.get(path, query_string=query)
+        assert not native.flask
+        assert json.loads(native.body) == flask.json
+        assert native.headers['etag'] == flask.headers['ETag']
+
+def test_native_pages_carry_the_next_cursor(client, sign_up, asgi, book_id):
+    _, headers = sign_up()
+    client.post('/api/books', headers=headers, json={'title': 'Second', 'author': 'A', 'genre': 'G', 'description': 'D'})
+    response = asgi('/api/books', query='limit=1')
+    assert not response.flask and len(json.loads(response.body)) == 1
+    following = asgi('/api/books', query=f'limit=1&cursor={response.headers["x-next-cursor"]}')
+    assert json.loads(following.body)[0]['id'] > json.loads(response.body)[0]['id']
+    assert 'rel="next"' in response.headers['link']
+
+def test_flask_writes_invalidate_native_reads(client, sign_up, asgi, book_id):
+    _, headers = sign_up()
+    first = asgi(f'/api/books/{book_id}')
+    cached = asgi(f'/api/books/{book_id}', headers={'If-None-Match': first.headers['etag']})
+    assert (cached.status, cached.flask, cached.body) == (304, False, b'')
+    
+    client.patch(f'/api/books/{book_id}', headers=headers, json={'title': 'Renamed'})
+    changed = asgi(f'/api/books/{book_id}', headers={'If-None-Match': first.headers['etag']})
+    assert (changed.status, changed.flask) == (200, False)
+    assert json.loads(changed.body)['title'] == 'Renamed'
+    assert changed.headers['etag'] != first.headers['etag']
+    
+    client.post(f'/api/books/{book_id}/reviews', headers=headers, json={'rating': 4, 'comment': 'Good.'})
+    reviews = json.loads(asgi(f'/api/books/{book_id}/reviews').body)
+    assert [review['rating'] for review in reviews] == [4]
+
+def test_other_clubs_books_are_not_served(client, sign_up, asgi):
+    from models import Club
+    with client.application.app_context():
+        club = Club(name='Async elsewhere', slug='async-elsewhere')
+        db.session.add(club)
+        db.session.commit()
+        club_id = club.id
+    _, headers = sign_up(club_id)
+    other = client.post('/api/books', headers=headers, json={'title': 'Hidden', 'author': 'A', 'genre': 'G',
+                                                             'description': 'D'}).json['id']
+    assert asgi(f'/api/books/{other}', headers={'X-Club-Id': str(club_id)}).status == 200
+    # Not in the default club: the native lookup misses and Flask answers 404
+    response = asgi(f'/api/books/{other}')
+    assert (response.status, response.flask) == (404, True)
+    assert other not in {book['id'] for book in json.loads(asgi('/api/books', query='limit=500').body)}
+
+def test_native_reads_are_compressed(app, asgi, book_id, monkeypatch):
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_BYTES', 10)
+    # A limit no other test uses, so the entry is built (and compressed) here
+    response = asgi('/api/books', headers={'Accept-Encoding': 'gzip'}, query='limit=499')
+    assert (response.headers['content-encoding'], response.headers['vary']) == ('gzip', 'Accept-Encoding')
+    assert isinstance(json.loads(gzip.decompress(response.body)), list)
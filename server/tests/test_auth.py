@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from cache import MemoryCache, NullCache
+from models import db, RevokedToken
+
+def test_logout_revokes_the_token(client, sign_up):
+    _, headers = sign_up()
+    assert client.get('/api/feed', headers=headers).status_code == 200
+    assert client.post('/api/logout', headers=headers).status_code == 200
+    assert client.get('/api/feed', headers=headers).status_code == 401
+
+@pytest.mark.parametrize('cache', [MemoryCache(max_entries=8), NullCache()], ids=['small-lru', 'null'])
+def test_revocation_survives_response_cache_churn(app, client, sign_up, monkeypatch, cache):
+    monkeypatch.setitem(app.extensions, 'cache', cache)
+    _, headers = sign_up()
+    client.post('/api/logout', headers=headers)
+    # Enough distinct reads to push every older entry out of the LRU
+    for n in range(20):
+        assert client.get(f'/api/books?limit={n + 1}').status_code == 200
+    assert client.get('/api/feed', headers=headers).status_code == 401
+
+def test_expired_revocations_are_pruned(app, client, sign_up):
+    with app.app_context():
+        db.session.add(RevokedToken(jti='long-gone', expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+    _, headers = sign_up()
+    client.post('/api/logout', headers=headers)
+    with app.app_context():
+        assert db.session.get(RevokedToken, 'long-gone') is None
@@ -0,0 +1,52 @@
+import pytest
+
+@pytest.fixture
+def reader(client, sign_up):
+    _, headers = sign_up()
+    book = client.post('/api/books', headers=headers, json={
+        'title': 'Batched', 'author': 'Author', 'genre': 'Fiction', 'description': 'In a batch.'
+    }).json
+    return headers, book['id']
+
+def batch(client, headers, operations, **extra):
+    return client.post('/api/batch', headers=headers, json={'operations': operations, **extra})
+
+def statuses(response):
+    return [entry['status'] for entry in response.json['results']]
+
+def test_applies_valid_operations(client, reader):
+    headers, book_id = reader
+    response = batch(client, headers, [
+        {'op': 'create', 'type': 'reading_list', 'book_id': book_id},
+        {'op': 'create', 'type': 'review', 'book_id': book_id, 'rating': 4, 'comment': 'Good'},
+    ])
+    assert response.status_code == 200
+    assert statuses(response) == [201, 201]
+    assert client.get(f'/api/books/{book_id}').json['rating_count'] == 1
+
+@pytest.mark.parametrize('operation', [
+    'x',
+    None,
+    [1],
+    {'op': 'create', 'type': ['review']},
+    {'op': {'create': 1}, 'type': 'review'},
+    {'op': 'create', 'type': 'reading_list', 'book_id': [1]},
+    {'op': 'create', 'type': 'review', 'book_id': {'id': 1}, 'rating': 4, 'comment': 'Good'},
+    {'op': 'update', 'type': 'review', 'id': [1], 'rating': 4},
+    {'op': 'delete', 'type': 'reading_list', 'id': '1'},
+    {'op': 'delete', 'type': 'reading_list', 'id': True},
+], ids=repr)
+def test_malformed_operation_is_a_400_for_that_operation(client, reader, operation):
+    headers, book_id = reader
+    response = batch(client, headers, [operation, {'op': 'create', 'type': 'reading_list', 'book_id': book_id}])
+    assert response.status_code == 200
+    assert statuses(response) == [400, 201]
+    assert response.json['applied'] == 1
+
+def test_malformed_operation_aborts_an_atomic_batch(client, reader):
+    headers, book_id = reader
+    response = batch(client, headers, ['x', {'op': 'create', 'type': 'reading_list', 'book_id': book_id}],
+                     atomic=True)
+    assert response.status_code == 400
+    assert statuses(response) == [400, 424]
+    assert client.get('/api/reading-list', headers=headers).json == []
@@ -0,0 +1,63 @@
+import pytest
+
+from models import db, Club
+from resources.books import encode_cursor
+
+BOOK = {'title': 'Guarded', 'author': 'Author', 'genre': 'Fiction', 'description': 'Members only.'}
+
+@pytest.fixture
+def other_club(app):
+    with app.app_context():
+        club = Club(name='Elsewhere', slug='elsewhere-books')
+        db.session.add(club)
+        db.session.commit()
+        return club.id
+
+@pytest.fixture
+def book(client, sign_up):
+    _, headers = sign_up()
+    return client.post('/api/books', headers=headers, json=BOOK).json['id']
+
+def writes(book_id):
+    return [
+        ('POST', '/api/books', {'json': BOOK}),
+        ('POST', '/api/books/bulk?format=ndjson', {'data': '{"title": "Bulk"}\n'}),
+        ('PUT', f'/api/books/{book_id}', {'json': {'title': 'Changed'}}),
+        ('PATCH', f'/api/books/{book_id}', {'json': {'title': 'Changed'}}),
+        ('DELETE', f'/api/books/{book_id}', {}),
+    ]
+
+def test_book_writes_need_a_token(client, book):
+    for method, path, kwargs in writes(book):
+        assert client.open(path, method=method, **kwargs).status_code == 401, (method, path)
+    assert client.get(f'/api/books/{book}').json['title'] == 'Guarded'
+
+def test_book_writes_need_membership_of_the_club(client, sign_up, book, other_club):
+    # A member of another club only, writing to the default club
+    _, headers = sign_up(other_club)
+    headers = {'Authorization': headers['Authorization']}
+    for method, path, kwargs in writes(book):
+        response = client.open(path, method=method, headers=headers, **kwargs)
+        assert response.status_code == 403, (method, path)
+    assert client.get(f'/api/books/{book}').json['title'] == 'Guarded'
+
+def test_members_can_write_books(client, sign_up, book):
+    _, headers = sign_up()
+    assert client.patch(f'/api/books/{book}', headers=headers, json={'title': 'Changed'}).status_code == 200
+    assert client.delete(f'/api/books/{book}', headers=headers).status_code == 204
+
+@pytest.mark.parametrize('cursor', ['not a cursor', encode_cursor(-1), encode_cursor(1, 2)])
+def test_search_rejects_a_bad_cursor(client, book, cursor):
+    response = client.get('/api/books/search', query_string={'q': 'Guarded', 'cursor': cursor})
+    assert response.status_code == 400
+    assert response.json == {'error': 'Invalid cursor'}
+
+def test_search_cursor_pages_through_results(client, sign_up, book):
+    _, headers = sign_up()
+    client.post('/api/books', headers=headers, json=dict(BOOK, title='Guarded Again'))
+    first = client.get('/api/books/search', query_string={'q': 'Guarded', 'limit': 1})
+    assert first.status_code == 200 and len(first.json) == 1
+    cursor = first.headers['X-Next-Cursor']
+    second = client.get('/api/books/search', query_string={'q': 'Guarded', 'limit': 1, 'cursor': cursor})
+    assert second.status_code == 200 and len(second.json) == 1
+    assert second.json[0]['id'] != first.json[0]['id']
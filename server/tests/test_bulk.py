@@ -0,0 +1,26 @@
+import bulk
+from models import db, Book
+from tenancy import club_scope
+
+def records(*titles):
+    return [(number, {'title': title, 'author': 'Author', 'genre': 'Fiction', 'description': 'Imported.'}, None)
+            for number, title in enumerate(titles, 1)]
+
+def test_imported_books_get_both_timestamps(app):
+    with app.app_context(), club_scope(1):
+        assert bulk.import_books(records('Stamped')).inserted == 1
+        db.session.commit()
+        book = db.session.execute(db.select(Book).where(Book.title == 'Stamped')).scalar_one()
+        assert book.created_at is not None and book.updated_at == book.created_at
+
+def test_copy_path_sends_the_timestamps(app, monkeypatch):
+    # COPY needs Postgres; check what insert_rows hands it instead
+    copied = []
+    monkeypatch.setattr(bulk, 'copy_rows', lambda table, columns, rows: copied.append((columns, rows)))
+    with app.app_context(), club_scope(1):
+        monkeypatch.setattr(db.session.get_bind().dialect, 'name', 'postgresql')
+        bulk.import_books(records('Copied'))
+        db.session.rollback()
+    (columns, rows), = copied
+    assert {'created_at', 'updated_at', 'club_id'} <= set(columns)
+    assert all(row['updated_at'] is not None and row['club_id'] == 1 for row in rows)
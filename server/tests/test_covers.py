@@ -0,0 +1,108 @@
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from covers import CoverUnavailable, fetch_source
+from outbound import UnsafeURL, is_public, open_url, parse_networks
+
+IMAGE = b'\x89PNG\r\n\x1a\n not really a png'
+METADATA_URL = 'http://169.254.169.254/latest/meta-data/'
+
+class Origin(BaseHTTPRequestHandler):
+    """Stands in for a cover host: /cover.png is an image, the others redirect."""
+    
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.path == '/cover.png':
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(IMAGE)))
+            self.end_headers()
+            self.wfile.write(IMAGE)
+        elif self.path == '/to-cover':
+            self.send_response(302)
+            self.send_header('Location', '/cover.png')
+            self.end_headers()
+        elif self.path == '/to-metadata':
+            self.send_response(302)
+            self.send_header('Location', METADATA_URL)
+            self.end_headers()
+        else:
+            self.send_error(404)
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def origin():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Origin)
+    server.paths = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def origin_url(server, path):
+    return f'http://127.0.0.1:{server.server_port}{path}'
+
+def test_loopback_origin_is_refused(app, origin):
+    with app.app_context():
+        with pytest.raises(CoverUnavailable) as error:
+            fetch_source(origin_url(origin, '/cover.png'))
+    assert error.value.status == 404
+    assert origin.paths == []
+
+def test_localhost_name_is_refused(app, origin):
+    with app.app_context():
+        with pytest.raises(UnsafeURL):
+            open_url(urllib.request.Request(f'http://localhost:{origin.server_port}/cover.png'), timeout=5)
+    assert origin.paths == []
+
+def test_allowed_network_is_fetched_and_redirects_are_followed(app, origin, monkeypatch):
+    monkeypatch.setitem(app.config, 'OUTBOUND_ALLOWED_NETWORKS', '127.0.0.1/32')
+    with app.app_context():
+        assert fetch_source(origin_url(origin, '/cover.png')) == IMAGE
+        assert fetch_source(origin_url(origin, '/to-cover')) == IMAGE
+    assert origin.paths == ['/cover.png', '/to-cover', '/cover.png']
+
+def test_redirect_to_internal_address_is_refused(app, origin, monkeypatch):
+    monkeypatch.setitem(app.config, 'OUTBOUND_ALLOWED_NETWORKS', '127.0.0.1/32')
+    with app.app_context():
+        with pytest.raises(CoverUnavailable) as error:
+            fetch_source(origin_url(origin, '/to-metadata'))
+    assert error.value.status == 404
+    assert origin.paths == ['/to-metadata']
+
+@pytest.mark.parametrize('url', ['file:///etc/passwd', 'ftp://example.com/cover.png'])
+def test_other_schemes_are_refused(app, url):
+    with app.app_context():
+        with pytest.raises(UnsafeURL):
+            open_url(urllib.request.Request(url), timeout=5)
+
+def test_image_check_clears_an_internal_url(app, origin):
+    from models import db, Book
+    from tasks import check_book_image
+    
+    url = origin_url(origin, '/cover.png')
+    with app.app_context():
+        book = Book(club_id=app.config['DEFAULT_CLUB_ID'], title='Inside', author='Someone',
+                    genre='Fiction', description='A cover on a private host.', image_url=url)
+        db.session.add(book)
+        db.session.commit()
+        check_book_image(book.id, url)
+        assert db.session.get(Book, book.id).image_url is None
+    assert origin.paths == []
+
+@pytest.mark.parametrize('address', [
+    '10.0.0.1', '127.0.0.1', '169.254.169.254', '100.64.0.1', '198.18.0.1', '192.0.2.1',
+    '0.0.0.0', '224.0.0.1', '::1', 'fd00::1', 'fe80::1%eth0', '2001:db8::1', '::ffff:100.64.0.1',
+])
+def test_internal_addresses_are_not_public(address):
+    assert not is_public(address)
+
+def test_public_and_allowed_addresses():
+    assert is_public('93.184.215.14') and is_public('2606:4700::1111')
+    assert is_public('100.64.0.1', parse_networks('100.64.0.0/10'))
@@ -0,0 +1,33 @@
+from sqlalchemy import text
+
+from models import db
+
+def test_requests_report_their_database_work(client):
+    response = client.get('/api/users')
+    assert int(response.headers['X-DB-Queries']) >= 1
+    assert float(response.headers['X-DB-Time-Ms']) >= 0
+    assert float(response.headers['X-DB-Pool-Wait-Ms']) >= 0
+
+def test_timing_headers_can_be_turned_off(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'DB_TIMING_HEADERS', False)
+    assert 'X-DB-Queries' not in client.get('/api/users').headers
+
+def test_metrics_endpoint_accumulates(client):
+    before = client.get('/api/metrics/db').json
+    client.get('/api/users')
+    after = client.get('/api/metrics/db').json
+    assert after['database']['requests'] >= before['database']['requests'] + 2
+    assert after['database']['queries'] > before['database']['queries']
+    assert after['pool']['class']
+
+def test_sqlite_connections_use_wal(app):
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar().lower() == 'wal'
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT_MS']
+
+def test_pool_checkout_is_timed_after_dispose(app, client):
+    with app.app_context():
+        db.engine.dispose()
+        # dispose() builds a new pool; its connect() must be wrapped again
+        assert db.engine.pool.connect.__name__ == 'timed_connect'
+    assert int(client.get('/api/users').headers['X-DB-Queries']) >= 1
@@ -0,0 +1,70 @@
+import pytest
+
+from favorites import MAX_BOOK_IDS, rebuild_favorite_counts
+from models import db, Book
+
+BOOK = {'author': 'Author', 'genre': 'Fiction', 'description': 'Loved.'}
+
+@pytest.fixture
+def books(client, sign_up):
+    _, headers = sign_up()
+    return [client.post('/api/books', headers=headers, json=dict(BOOK, title=f'Favorite {n}')).json['id']
+            for n in range(3)]
+
+def favorite_count(client, book_id):
+    return client.get(f'/api/books/{book_id}').json['favorite_count']
+
+def test_favorites_keep_the_counts(client, sign_up, books):
+    alice_id, alice = sign_up()
+    bob_id, bob = sign_up()
+    first, second, third = books
+    
+    response = client.post(f'/api/users/{alice_id}/favorites', headers=alice, json={'book_ids': [first, second, 999999]})
+    assert response.status_code == 201
+    assert response.json == {'added': [first, second], 'already_favorited': [], 'not_found': [999999]}
+    client.post(f'/api/users/{bob_id}/favorites', headers=bob, json={'book_id': first})
+    assert [favorite_count(client, book) for book in books] == [2, 1, 0]
+    
+    # Favoriting again changes nothing
+    again = client.post(f'/api/users/{alice_id}/favorites', headers=alice, json={'book_id': first})
+    assert (again.status_code, again.json['already_favorited']) == (200, [first])
+    assert favorite_count(client, first) == 2
+    assert [book['id'] for book in client.get(f'/api/users/{alice_id}/favorites').json] == [first, second]
+    
+    removed = client.delete(f'/api/users/{alice_id}/favorites', headers=alice, json={'book_ids': [second, third]})
+    assert removed.json == {'removed': [second]}
+    assert client.delete(f'/api/users/{bob_id}/favorites/{first}', headers=bob).status_code == 204
+    assert client.delete(f'/api/users/{bob_id}/favorites/{first}', headers=bob).status_code == 404
+    assert [favorite_count(client, book) for book in books] == [1, 0, 0]
+    
+    # Deleting an account takes its favorites out of the counts
+    assert client.delete(f'/api/users/{alice_id}', headers=alice).status_code == 204
+    assert favorite_count(client, first) == 0
+
+def test_only_your_own_favorites(client, sign_up, books):
+    alice_id, _ = sign_up()
+    _, bob = sign_up()
+    assert client.post(f'/api/users/{alice_id}/favorites', headers=bob, json={'book_id': books[0]}).status_code == 403
+    assert client.post(f'/api/users/{alice_id}/favorites', json={'book_id': books[0]}).status_code == 401
+    assert favorite_count(client, books[0]) == 0
+
+@pytest.mark.parametrize('payload', [
+    {}, {'book_ids': []}, {'book_ids': 'all'}, {'book_id': True}, {'book_ids': [1, '2']},
+    {'book_ids': list(range(1, MAX_BOOK_IDS + 2))},
+])
+def test_invalid_book_ids_are_rejected(client, sign_up, payload):
+    user_id, headers = sign_up()
+    assert client.post(f'/api/users/{user_id}/favorites', headers=headers, json=payload).status_code == 400
+
+def test_most_favorited_and_rebuild(app, client, sign_up, books):
+    user_id, headers = sign_up()
+    client.post(f'/api/users/{user_id}/favorites', headers=headers, json={'book_ids': books[1:]})
+    leaders = client.get('/api/books/most-favorited', query_string={'limit': 100}).json
+    assert set(books[1:]) <= {book['id'] for book in leaders}
+    assert books[0] not in {book['id'] for book in leaders}
+    
+    with app.app_context():
+        db.session.get(Book, books[1]).favorite_count = 7
+        db.session.commit()
+        rebuild_favorite_counts()
+        assert db.session.get(Book, books[1]).favorite_count == 1
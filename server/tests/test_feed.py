@@ -0,0 +1,28 @@
+import pytest
+
+@pytest.fixture
+def reader_and_follower(client, sign_up):
+    reader_id, reader = sign_up()
+    _, follower = sign_up()
+    assert client.post(f'/api/users/{reader_id}/follow', headers=follower).status_code == 201
+    book = client.post('/api/books', headers=reader, json={
+        'title': 'Followed', 'author': 'Author', 'genre': 'Fiction', 'description': 'Being read.'
+    }).json
+    item = client.post('/api/reading-list', headers=reader, json={'book_id': book['id']}).json
+    return reader, follower, item
+
+def kinds(client, headers):
+    return [(event['kind'], event.get('status')) for event in client.get('/api/feed', headers=headers).json]
+
+@pytest.mark.parametrize('method', ['PUT', 'PATCH'])
+def test_status_change_reaches_followers(client, reader_and_follower, method):
+    reader, follower, item = reader_and_follower
+    response = client.open(f"/api/reading-list/{item['id']}", method=method, headers=reader,
+                           json={'status': 'reading'})
+    assert response.status_code == 200
+    assert kinds(client, follower) == [('reading_list_status', 'reading'), ('reading_list_add', 'want_to_read')]
+
+def test_unchanged_status_records_nothing(client, reader_and_follower):
+    reader, follower, item = reader_and_follower
+    client.put(f"/api/reading-list/{item['id']}", headers=reader, json={'status': 'want_to_read'})
+    assert kinds(client, follower) == [('reading_list_add', 'want_to_read')]
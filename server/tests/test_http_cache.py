@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import update
+
+from cache import MemoryCache
+from http_cache import invalidate_book, invalidate_catalog
+from models import db, Book
+
+@pytest.fixture
+def book(client, sign_up):
+    _, headers = sign_up()
+    book = client.post('/api/books', headers=headers, json={
+        'title': 'Cached', 'author': 'Author', 'genre': 'Fiction', 'description': 'Served from memory.'
+    }).json
+    return book['id'], headers
+
+@pytest.fixture
+def other_process(app, monkeypatch):
+    """Runs a function as another worker (or the CLI, or the job worker) would: with its own memory cache."""
+    def run(function, *args, **kwargs):
+        own = app.extensions['cache']
+        monkeypatch.setitem(app.extensions, 'cache', MemoryCache())
+        try:
+            return function(*args, **kwargs)
+        finally:
+            monkeypatch.setitem(app.extensions, 'cache', own)
+    return run
+
+def test_conditional_get(client, book):
+    book_id, headers = book
+    first = client.get(f'/api/books/{book_id}')
+    assert first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+    assert client.get(f'/api/books/{book_id}', headers={'If-None-Match': etag}).status_code == 304
+    
+    client.patch(f'/api/books/{book_id}', headers=headers, json={'title': 'Changed'})
+    changed = client.get(f'/api/books/{book_id}', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.json['title'] == 'Changed'
+
+def test_write_in_another_worker_invalidates_this_workers_copy(client, book, other_process):
+    book_id, headers = book
+    assert client.get(f'/api/books/{book_id}').json['title'] == 'Cached'
+    assert book_id in [row['id'] for row in client.get('/api/books?limit=100').json]
+    
+    response = other_process(client.patch, f'/api/books/{book_id}', headers=headers, json={'title': 'Elsewhere'})
+    assert response.status_code == 200
+    assert client.get(f'/api/books/{book_id}').json['title'] == 'Elsewhere'
+    titles = {row['id']: row['title'] for row in client.get('/api/books?limit=100').json}
+    assert titles[book_id] == 'Elsewhere'
+
+@pytest.mark.parametrize('invalidate', ['book', 'catalog'])
+def test_invalidation_outside_a_request_reaches_the_web_workers(app, client, book, other_process, invalidate):
+    # The job worker invalidates one book, the CLI the whole catalog
+    book_id, _ = book
+    assert client.get(f'/api/books/{book_id}').json['title'] == 'Cached'
+    
+    def change_and_invalidate():
+        with app.app_context():
+            db.session.execute(update(Book).where(Book.id == book_id).values(title='Offline'))
+            db.session.commit()
+            if invalidate == 'book':
+                invalidate_book(book_id, app.config['DEFAULT_CLUB_ID'])
+            else:
+                invalidate_catalog()
+    other_process(change_and_invalidate)
+    assert client.get(f'/api/books/{book_id}').json['title'] == 'Offline'
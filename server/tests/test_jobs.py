@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select, update
+
+import jobs
+from jobs import JobFailed, Worker, claim_job, enqueue, prune_jobs, run_job
+from models import db, Club, Job
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    """An empty jobs table and a 'test' task that does what each test tells it to."""
+    calls = []
+    
+    def test_task(action='ok', **payload):
+        calls.append(payload)
+        if action == 'fail':
+            db.session.add(Club(name='Rolled back', slug=f'rolled-back-{len(calls)}'))
+            raise RuntimeError('try again')
+        if action == 'give up':
+            raise JobFailed('no point retrying')
+    
+    monkeypatch.setitem(jobs.TASKS, 'test', (test_task, 3))
+    monkeypatch.setitem(app.config, 'JOB_BACKOFF_SECONDS', 10)
+    with app.app_context():
+        db.session.execute(delete(Job))
+        db.session.commit()
+        yield calls
+        db.session.rollback()
+        db.session.execute(delete(Job))
+        db.session.commit()
+
+def job(job_id):
+    db.session.expire_all()
+    return db.session.get(Job, job_id)
+
+def make_due(job_id, **values):
+    db.session.execute(update(Job).where(Job.id == job_id).values(run_at=datetime.utcnow(), **values))
+    db.session.commit()
+
+def test_successful_job_runs_once(queue):
+    enqueue('test', {'book_id': 7})
+    db.session.commit()
+    claimed = claim_job()
+    assert (claimed.status, claimed.attempts) == ('running', 1)
+    run_job(claimed)
+    assert queue == [{'book_id': 7}]
+    assert (job(claimed.id).status, job(claimed.id).locked_until) == ('done', None)
+    assert claim_job() is None
+
+def test_enqueue_is_part_of_the_callers_transaction(queue):
+    enqueue('test')
+    db.session.rollback()
+    assert claim_job() is None
+
+def test_idempotency_key_enqueues_once(queue):
+    assert enqueue('test', idempotency_key='book:1:check') is True
+    assert enqueue('test', idempotency_key='book:1:check') is False
+    db.session.commit()
+    assert len(db.session.scalars(select(Job)).all()) == 1
+    with pytest.raises(LookupError):
+        enqueue('no-such-task')
+
+def test_failures_retry_with_backoff_until_max_attempts(queue):
+    enqueue('test', {'action': 'fail'})
+    db.session.commit()
+    for attempt in (1, 2):
+        claimed = claim_job()
+        before = datetime.utcnow()
+        run_job(claimed)
+        retried = job(claimed.id)
+        assert (retried.status, retried.attempts) == ('queued', attempt)
+        # JOB_BACKOFF_SECONDS doubled each attempt, with up to half taken off as jitter
+        delay = (retried.run_at - before).total_seconds()
+        assert 10 * 2 ** (attempt - 1) * 0.5 - 1 <= delay <= 10 * 2 ** (attempt - 1) + 1
+        assert 'try again' in retried.last_error
+        # Not due yet
+        assert claim_job() is None
+        make_due(claimed.id)
+    
+    run_job(claim_job())
+    failed = job(claimed.id)
+    assert (failed.status, failed.attempts) == ('failed', 3)
+    assert failed.finished_at is not None
+    # The failed attempts' own writes were rolled back
+    assert db.session.scalar(select(Club).where(Club.name == 'Rolled back')) is None
+
+def test_job_failed_is_not_retried(queue):
+    enqueue('test', {'action': 'give up'})
+    db.session.commit()
+    claimed = claim_job()
+    run_job(claimed)
+    assert (job(claimed.id).status, job(claimed.id).attempts) == ('failed', 1)
+
+def test_expired_leases_are_claimed_again(queue):
+    enqueue('test')
+    db.session.commit()
+    claimed = claim_job()
+    # Its worker died mid-run: nobody else gets it until the lease runs out
+    assert claim_job() is None
+    make_due(claimed.id, locked_until=datetime.utcnow() - timedelta(seconds=1))
+    reclaimed = claim_job()
+    assert (reclaimed.id, reclaimed.attempts) == (claimed.id, 2)
+    run_job(reclaimed)
+    assert job(claimed.id).status == 'done'
+
+def test_lease_expiring_on_the_last_attempt_fails_the_job(queue):
+    enqueue('test')
+    db.session.commit()
+    claimed = claim_job()
+    make_due(claimed.id, attempts=3, locked_until=datetime.utcnow() - timedelta(seconds=1))
+    run_job(claim_job())
+    assert job(claimed.id).status == 'failed'
+    assert 'Lease expired' in job(claimed.id).last_error
+    assert queue == []
+
+def test_backoff_is_capped(app, queue, monkeypatch):
+    monkeypatch.setitem(app.config, 'JOB_BACKOFF_MAX_SECONDS', 60)
+    monkeypatch.setattr(jobs.random, 'uniform', lambda low, high: high)
+    assert [jobs.backoff(attempts) for attempts in (1, 2, 3, 4, 10)] == [10, 20, 40, 60, 60]
+
+def test_worker_drains_due_jobs_and_prunes(app, queue):
+    for number in range(3):
+        enqueue('test', {'number': number})
+    enqueue('test', {'number': 'later'}, delay=3600)
+    db.session.commit()
+    Worker(app).run(once=True)
+    assert sorted(call['number'] for call in queue) == [0, 1, 2]
+    
+    old = datetime.utcnow() - timedelta(hours=app.config['JOB_RETENTION_HOURS'] + 1)
+    db.session.execute(update(Job).where(Job.status == 'done').values(finished_at=old))
+    db.session.commit()
+    assert prune_jobs() == 3
+    assert [row.status for row in db.session.scalars(select(Job))] == ['queued']
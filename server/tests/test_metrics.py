@@ -0,0 +1,59 @@
+import metrics
+from metrics import Counter, Histogram, hot_path
+
+def test_requests_are_counted_by_route_template(client):
+    labels = ('GET', '/api/books/<int:id>', '404')
+    before = metrics.REQUESTS.value(*labels)
+    client.get('/api/books/987654')
+    client.get('/api/books/987655')
+    assert metrics.REQUESTS.value(*labels) == before + 2
+    
+    body = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE bookclub_http_requests_total counter' in body
+    assert 'bookclub_http_requests_total{method="GET",route="/api/books/<int:id>",status="404"}' in body
+    assert 'bookclub_db_queries_per_request_bucket{route="/api/books/<int:id>",le="+Inf"}' in body
+    assert 'bookclub_db_pool_connections{state=' in body
+
+def test_in_flight_returns_to_zero(client):
+    before = metrics.IN_FLIGHT.value()
+    client.get('/api/books')
+    client.get('/api/books/987654')
+    assert metrics.IN_FLIGHT.value() == before
+
+def test_histogram_buckets_are_cumulative():
+    registry = []
+    histogram = Histogram(registry, 'test_seconds', 'Test.', ('section',), buckets=(1, 5))
+    for value in (0.5, 3, 3, 10):
+        histogram.observe(value, 'a')
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{section="a",le="1.0"} 1',
+        'test_seconds_bucket{section="a",le="5.0"} 3',
+        'test_seconds_bucket{section="a",le="+Inf"} 4',
+        'test_seconds_count{section="a"} 4',
+        'test_seconds_sum{section="a"} 16.5',
+    ]
+
+def test_label_values_are_escaped():
+    counter = Counter([], 'test_total', 'Test.', ('route',))
+    counter.inc('a "quoted"\\path\n')
+    assert counter.render()[-1] == 'test_total{route="a \\"quoted\\"\\\\path\\n"} 1.0'
+
+def test_hot_path_records_its_section():
+    with hot_path('tests.section'):
+        pass
+    assert 'bookclub_hot_path_seconds_count{section="tests.section"} 1' in metrics.render_metrics()
+
+def test_profiles_are_opt_in(app, client, monkeypatch):
+    assert 'X-Profile-Id' not in client.get('/api/books', headers={'X-Profile': '1'}).headers
+    
+    monkeypatch.setitem(app.config, 'PROFILING_ENABLED', True)
+    monkeypatch.setitem(app.config, 'PROFILING_INTERVAL_MS', 1)
+    monkeypatch.setitem(app.config, 'PROFILING_MAX_PROFILES', 1)
+    assert 'X-Profile-Id' not in client.get('/api/books').headers
+    first = client.get('/api/books', headers={'X-Profile': '1'}).headers['X-Profile-Id']
+    second = client.get('/api/books', headers={'X-Profile': '1'}).headers['X-Profile-Id']
+    
+    profile = client.get(f'/metrics/profiles/{second}')
+    assert profile.status_code == 200 and profile.mimetype == 'text/plain'
+    # Only PROFILING_MAX_PROFILES are kept
+    assert client.get(f'/metrics/profiles/{first}').status_code == 404
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import passwords
+from passwords import hash_password, verify_password
+
+@pytest.fixture
+def pool(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_WORKERS', 1)
+    with app.app_context():
+        yield
+        executor = passwords._state['executor']
+        if executor is not None:
+            executor.shutdown()
+        passwords._state['executor'] = None
+
+def test_broken_pool_is_replaced(pool):
+    broken = passwords._process_state()['executor']
+    # Kills the pool's only worker, as the OOM killer would
+    with pytest.raises(passwords.BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+    
+    password_hash = hash_password('correct horse')
+    assert verify_password(1, password_hash, 'correct horse')
+    assert passwords._state['executor'] not in (None, broken)
+
+def test_hashes_inline_when_pools_keep_breaking(pool, monkeypatch):
+    def submit(self, fn, *args):
+        raise passwords.BrokenProcessPool('worker died')
+    monkeypatch.setattr(passwords.ProcessPoolExecutor, 'submit', submit)
+    
+    password_hash = hash_password('correct horse')
+    assert not verify_password(1, password_hash, 'wrong horse')
+
+@pytest.mark.parametrize('method, stored, expected', [
+    ('pbkdf2:sha256:600000', 'pbkdf2:sha256:600000', False),
+    ('pbkdf2:sha256:600000', 'pbkdf2:sha256:1000', True),
+    ('pbkdf2:sha256:1000', 'pbkdf2:sha256:600000', False),
+    ('pbkdf2', f'pbkdf2:sha256:{passwords.DEFAULT_PBKDF2_ITERATIONS}', False),
+    ('pbkdf2:sha512:600000', 'pbkdf2:sha256:600000', True),
+    ('scrypt', 'pbkdf2:sha256:600000', True),
+    ('scrypt', 'scrypt:32768:8:1', False),
+    ('scrypt:65536:8:1', 'scrypt:32768:8:1', True),
+    # Never a downgrade
+    ('pbkdf2:sha256:600000', 'scrypt:32768:8:1', False),
+    ('scrypt:32768:8:1', 'scrypt:65536:8:1', False),
+    # Plain digests from old Werkzeug releases
+    ('pbkdf2:sha256:600000', 'sha256', True),
+])
+def test_needs_rehash(app, monkeypatch, method, stored, expected):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', method)
+    with app.app_context():
+        assert passwords.needs_rehash(f'{stored}$salt$digest') is expected
+
+def test_needs_rehash_does_not_hash(app, monkeypatch):
+    # It runs on every login, so it reads the stored prefix instead of hashing to compare
+    def generate_password_hash(*args):
+        raise AssertionError('hashed a password')
+    monkeypatch.setattr(passwords, 'generate_password_hash', generate_password_hash)
+    with app.app_context():
+        assert not passwords.needs_rehash(f"{app.config['PASSWORD_HASH_METHOD']}$salt$digest")
@@ -0,0 +1,8 @@
+from query_plans import check_query_plans
+
+def test_every_endpoint_statement_uses_a_selective_index(app):
+    with app.app_context():
+        results = check_query_plans(app)
+    assert results
+    failures = [(name, ' '.join(sql.split()), problems) for name, sql, plan, problems in results if problems]
+    assert failures == []
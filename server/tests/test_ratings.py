@@ -0,0 +1,53 @@
+from models import db, Book
+from ratings import rebuild_ratings
+
+BOOK = {'title': 'Rated', 'author': 'Author', 'genre': 'Fiction', 'description': 'Reviewed.'}
+
+def rating(client, book_id):
+    book = client.get(f'/api/books/{book_id}').json
+    return book['rating_count'], book['average_rating']
+
+def review(client, headers, book_id, stars):
+    response = client.post(f'/api/books/{book_id}/reviews', headers=headers, json={'rating': stars, 'comment': 'Fine.'})
+    assert response.status_code == 201
+    return response.json['id']
+
+def test_review_writes_keep_the_aggregates_current(client, sign_up):
+    _, alice = sign_up()
+    bob_id, bob = sign_up()
+    book_id = client.post('/api/books', headers=alice, json=BOOK).json['id']
+    assert rating(client, book_id) == (0, 0)
+    
+    first = review(client, alice, book_id, 4)
+    review(client, bob, book_id, 2)
+    assert rating(client, book_id) == (2, 3)
+    
+    client.patch(f'/api/reviews/{first}', headers=alice, json={'rating': 5})
+    assert rating(client, book_id) == (2, 3.5)
+    client.put(f'/api/reviews/{first}', headers=alice, json={'comment': 'Same rating.'})
+    assert rating(client, book_id) == (2, 3.5)
+    
+    client.delete(f'/api/reviews/{first}', headers=alice)
+    assert rating(client, book_id) == (1, 2)
+    # Deleting an account takes its reviews out of the ratings
+    assert client.delete(f'/api/users/{bob_id}', headers=bob).status_code == 204
+    assert rating(client, book_id) == (0, 0)
+
+def test_rejected_review_changes_nothing(client, sign_up):
+    _, headers = sign_up()
+    book_id = client.post('/api/books', headers=headers, json=BOOK).json['id']
+    review(client, headers, book_id, 3)
+    duplicate = client.post(f'/api/books/{book_id}/reviews', headers=headers, json={'rating': 5, 'comment': 'Again.'})
+    assert duplicate.status_code == 400
+    assert rating(client, book_id) == (1, 3)
+
+def test_rebuild_matches_the_reviews(app, client, sign_up):
+    _, headers = sign_up()
+    book_id = client.post('/api/books', headers=headers, json=BOOK).json['id']
+    review(client, headers, book_id, 4)
+    with app.app_context():
+        db.session.get(Book, book_id).rating_sum = 40
+        db.session.commit()
+        assert rebuild_ratings([book_id]) == 1
+        book = db.session.get(Book, book_id)
+        assert (book.rating_sum, book.rating_count, book.average_rating) == (4, 1, 4)
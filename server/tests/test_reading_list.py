@@ -0,0 +1,45 @@
+import contextlib
+
+from sqlalchemy import event
+
+from models import db
+
+@contextlib.contextmanager
+def count_statements(app):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def add_books(client, headers, count):
+    for n in range(count):
+        book = client.post('/api/books', headers=headers, json={
+            'title': f'Listed {n}', 'author': 'Author', 'genre': 'Fiction', 'description': 'On a list.'
+        }).json
+        response = client.post('/api/reading-list', headers=headers, json={'book_id': book['id']})
+        assert response.status_code == 201
+
+def reading_list_statements(app, client, headers, **kwargs):
+    with count_statements(app) as statements:
+        response = client.get('/api/reading-list', headers=headers, **kwargs)
+        # A streamed body runs its queries while it is read
+        response.get_data()
+    assert response.status_code == 200
+    return len(statements)
+
+def test_reading_list_query_count_does_not_grow_with_items(app, client, sign_up):
+    _, headers = sign_up()
+    add_books(client, headers, 1)
+    one = reading_list_statements(app, client, headers)
+    ndjson_one = reading_list_statements(app, client, {**headers, 'Accept': 'application/x-ndjson'})
+    
+    add_books(client, headers, 9)
+    assert len(client.get('/api/reading-list', headers=headers).json) == 10
+    assert reading_list_statements(app, client, headers) == one
+    assert reading_list_statements(app, client, {**headers, 'Accept': 'application/x-ndjson'}) == ndjson_one
@@ -0,0 +1,59 @@
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+
+import serialization
+from serialization import dumps, negotiate, records
+
+BOOK = {'title': 'Serialized', 'author': 'Author', 'genre': 'Fiction', 'description': 'Fast path.'}
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    # orjson is optional; the standard library path has to give the same output
+    if request.param == 'json':
+        monkeypatch.setattr(serialization, 'orjson', None)
+    elif serialization.orjson is None:
+        pytest.skip('orjson is not installed')
+
+def test_dumps_matches_to_dict(encoder):
+    moment = datetime(2024, 5, 1, 12, 30, 15, 250)
+    assert json.loads(dumps({'at': moment, 'none': None, 'n': 1.5})) == {
+        'at': moment.isoformat(), 'none': None, 'n': 1.5
+    }
+    assert records([(1, 'a'), (2, 'b')], ('id', 'name')) == [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]
+
+def test_list_rows_match_the_detail_response(client, sign_up, encoder):
+    user_id, headers = sign_up()
+    book_id = client.post('/api/books', headers=headers, json=BOOK).json['id']
+    detail = client.get(f'/api/books/{book_id}').json
+    listed = next(book for book in client.get('/api/books', query_string={'limit': 500}).json if book['id'] == book_id)
+    assert listed == {key: detail[key] for key in listed}
+    
+    detail = client.get(f'/api/users/{user_id}').json
+    listed = next(user for user in client.get('/api/users').json if user['id'] == user_id)
+    assert listed == {key: detail[key] for key in listed}
+
+def test_large_lists_are_compressed(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_BYTES', 10)
+    plain = client.get('/api/users')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+    
+    compressed = client.get('/api/users', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(compressed.get_data())) == plain.json
+
+def test_small_bodies_are_sent_as_is(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_BYTES', 10 ** 9)
+    response = client.get('/api/users', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_negotiate_prefers_what_the_client_accepts(app):
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip;q=0.5, br'}):
+        assert negotiate({'gzip': b'', 'br': b''}) == 'br'
+        assert negotiate({'gzip': b''}) == 'gzip'
+        assert negotiate({}) is None
+    with app.test_request_context(headers={'Accept-Encoding': 'identity'}):
+        assert negotiate({'gzip': b''}) is None
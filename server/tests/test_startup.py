@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(args, database):
+    """Runs python with args in a fresh interpreter against its own database file; returns stdout."""
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{database}'}
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    result = subprocess.run([sys.executable, *args], cwd=SERVER_DIR, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+@pytest.fixture
+def database(tmp_path):
+    return tmp_path / 'startup.db'
+
+def test_importing_and_building_the_app_touch_no_database(database):
+    output = run(['-c', 'import sys, app; print(hasattr(app, "app")); app.create_app(); print("alembic" in sys.modules)'],
+                 database)
+    # No module-level app, no create_all, and Alembic stays out of web workers
+    assert output.split() == ['False', 'False']
+    assert not database.exists()
+
+def test_migrations_build_the_models_schema(database):
+    # flask db check fails if autogenerate finds any difference from the models
+    for command in ('upgrade', 'check'):
+        run(['-m', 'flask', '--app', 'app', 'db', command], database)
@@ -0,0 +1,74 @@
+import gzip
+import os
+
+import pytest
+
+import config
+from static_assets import IMMUTABLE, precompress_folder
+
+SCRIPT = b'console.log("bookclub");\n' * 200
+SHELL = b'<!doctype html><div id="root"></div>' + b'<!-- padding -->' * 100
+
+def write(path, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(body)
+
+@pytest.fixture
+def build(tmp_path):
+    write(tmp_path / 'index.html', SHELL)
+    write(tmp_path / 'static' / 'js' / 'main.3f2a1c9e.js', SCRIPT)
+    write(tmp_path / 'robots.txt', b'User-agent: *\n')
+    return tmp_path
+
+@pytest.fixture
+def static_client(app, build, monkeypatch):
+    # A second app over the same (migrated) database, serving the build above
+    from app import create_app
+    
+    precompress_folder(str(build), min_bytes=256)
+    monkeypatch.setattr(config.Config, 'STATIC_FOLDER', str(build))
+    return create_app().test_client()
+
+def test_fingerprinted_assets_are_immutable_and_precompressed(static_client):
+    response = static_client.get('/static/js/main.3f2a1c9e.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'javascript' in response.mimetype
+    assert gzip.decompress(response.get_data()) == SCRIPT
+    
+    plain = static_client.get('/static/js/main.3f2a1c9e.js')
+    assert 'Content-Encoding' not in plain.headers and plain.get_data() == SCRIPT
+
+def test_other_files_are_revalidated(static_client):
+    response = static_client.get('/robots.txt')
+    assert (response.status_code, response.headers['Cache-Control']) == (200, 'no-cache')
+    assert 'Content-Encoding' not in response.headers
+
+def test_client_routes_get_the_shell(static_client, build):
+    response = static_client.get('/books/3', headers={'Accept-Encoding': 'gzip'})
+    assert (response.status_code, response.headers['Cache-Control']) == (200, 'no-cache')
+    assert gzip.decompress(response.get_data()) == SHELL
+    etag = response.headers['ETag']
+    assert static_client.get('/', headers={'If-None-Match': etag}).status_code == 304
+    
+    # A new build is picked up without a restart
+    write(build / 'index.html', SHELL + b'<!-- rebuilt -->')
+    os.utime(build / 'index.html', ns=(0, os.stat(build / 'index.html').st_mtime_ns + 10 ** 9))
+    assert static_client.get('/', headers={'If-None-Match': etag}).status_code == 200
+
+def test_missing_files_and_api_paths_are_404(static_client):
+    assert static_client.get('/static/js/missing.0badc0de.js').status_code == 404
+    response = static_client.get('/api/not-a-route')
+    assert (response.status_code, response.json) == (404, {'error': 'Not found'})
+
+def test_precompress_skips_small_fresh_and_incompressible_files(build):
+    write(build / 'static' / 'noise.js', os.urandom(4096))
+    written = precompress_folder(str(build), min_bytes=256)
+    assert os.path.isfile(build / 'static' / 'js' / 'main.3f2a1c9e.js.gz')
+    assert not os.path.exists(build / 'robots.txt.gz')
+    assert not os.path.exists(build / 'static' / 'noise.js.gz')
+    assert written >= 2
+    assert precompress_folder(str(build), min_bytes=256) == 0
@@ -0,0 +1,56 @@
+import json
+
+import streaming
+
+NDJSON = {'Accept': 'application/x-ndjson'}
+BOOK = {'author': 'Author', 'genre': 'Fiction', 'description': 'Streamed.'}
+
+def lines(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    body = response.get_data(as_text=True)
+    assert body.endswith('\n')
+    return [json.loads(line) for line in body.splitlines()]
+
+def add_books(client, headers, count):
+    for number in range(count):
+        client.post('/api/books', headers=headers, json=dict(BOOK, title=f'Streamed {number}'))
+
+def test_books_stream_past_the_page_size(client, sign_up, monkeypatch):
+    # Several chunks, and more rows than one page of the JSON response
+    monkeypatch.setattr(streaming, 'LINES_PER_CHUNK', 2)
+    _, headers = sign_up()
+    add_books(client, headers, 5)
+    page = client.get('/api/books', query_string={'limit': 2})
+    assert 'X-Next-Cursor' in page.headers
+    
+    books = lines(client.get('/api/books', headers=NDJSON))
+    assert len(books) >= 5
+    assert [book['id'] for book in books] == sorted(book['id'] for book in books)
+    assert {f'Streamed {number}' for number in range(5)} <= {book['title'] for book in books}
+
+def test_streamed_books_honour_limit_and_fields(client, sign_up):
+    _, headers = sign_up()
+    add_books(client, headers, 3)
+    books = lines(client.get('/api/books', headers=NDJSON, query_string={'limit': 2, 'fields': 'title'}))
+    assert len(books) == 2
+    assert all(set(book) == {'id', 'title'} for book in books)
+
+def test_json_stays_the_default(client):
+    for headers in ({}, {'Accept': '*/*'}, {'Accept': 'application/json, application/x-ndjson'}):
+        response = client.get('/api/books', headers=headers)
+        assert response.mimetype == 'application/json' and isinstance(response.json, list)
+
+def test_users_and_reading_list_stream(client, sign_up):
+    user_id, headers = sign_up()
+    users = lines(client.get('/api/users', headers=NDJSON))
+    assert user_id in {user['id'] for user in users}
+    assert all(set(user) == {'id', 'username', 'email', 'created_at'} for user in users)
+    
+    book_id = client.post('/api/books', headers=headers, json=dict(BOOK, title='Listed')).json['id']
+    client.post('/api/reading-list', headers=headers, json={'book_id': book_id})
+    _, stranger = sign_up()
+    client.post('/api/reading-list', headers=stranger, json={'book_id': book_id})
+    items = lines(client.get('/api/reading-list', headers={**headers, **NDJSON}))
+    assert [(item['user_id'], item['book_id']) for item in items] == [(user_id, book_id)]
@@ -0,0 +1,54 @@
+"""Run queued background jobs (see jobs.py).
+
+    python worker.py --threads 2 --metrics-port 9101
+
+Stops after the jobs in progress on SIGTERM or Ctrl-C.
+"""
+import argparse
+import logging
+import signal
+import threading
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+from app import create_app
+from jobs import Worker
+from metrics import render_metrics
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port):
+    """Job counts and latencies live in this process, so it exposes its own /metrics."""
+    def metrics_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain; version=0.0.4')])
+        return [render_metrics().encode()]
+    server = make_server('0.0.0.0', port, metrics_app, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+def main():
+    parser = argparse.ArgumentParser(description='Run queued background jobs.')
+    parser.add_argument('--threads', type=int, default=1, help='Jobs to run at the same time.')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics on this port.')
+    parser.add_argument('--once', action='store_true', help='Exit once no job is due.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    
+    app = create_app()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    workers = [Worker(app) for _ in range(args.threads)]
+    
+    def stop(signum, frame):
+        for worker in workers:
+            worker.stop()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    threads = [threading.Thread(target=worker.run, args=(args.once,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+if __name__ == '__main__':
+    main()